@@ -0,0 +1,369 @@
+"""
+Event-study backtest
+
+Checks whether sentiment before an earnings report says anything about
+volatility after it. For every (ticker, report date) event the study
+measures:
+- realized volatility over the BACKTEST_PRE_BARS sessions before the event
+  and the BACKTEST_POST_BARS sessions after it
+- the event-day return
+- the return over the post window
+- sentiment over the BACKTEST_SENTIMENT_DAYS calendar days before the event
+
+Event day 0 is the first session on or after the report date. It is left out
+of both volatility windows, so its jump only shows up in the event return.
+
+Windows for every event are gathered into (event x bar) arrays with a single
+fancy-indexing step, and each array is fed to the volatility engine once.
+Tickers are sharded across a process pool. Each worker loads its own shard's
+bars and scores its own documents, so nothing large crosses between
+processes. Everything runs offline. Bars come from the local OHLCV store
+(or CSV files with --prices). Events come from a CSV with --events, or from
+the stored earnings calendar stepped back by quarters. Sentiment comes from
+the CSV's sentiment column or from the corpus, scored with the sentiment
+model.
+
+The report gives:
+- the vol-change distribution, log(post / pre) in total and by sentiment tercile
+- hit rates: low sentiment predicting rising volatility, and sentiment
+  predicting the direction of the event return
+- rank information coefficients, pooled and per quarter
+
+Usage:
+    python backtest.py AAPL,MSFT|all [--from 2015-01-01] [--to 2024-12-31]
+        [--events events.csv] [--prices DIR] [--pre 21] [--post 21]
+        [--estimator close_to_close] [--workers N] [--out events.csv]
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Sequence
+
+from coldstart import lazy_import
+from volatility import ESTIMATORS, annualize, estimate_volatility
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+BACKTEST_PRE_BARS = int(os.getenv("BACKTEST_PRE_BARS", "21"))
+BACKTEST_POST_BARS = int(os.getenv("BACKTEST_POST_BARS", "21"))
+BACKTEST_SENTIMENT_DAYS = int(os.getenv("BACKTEST_SENTIMENT_DAYS", "7"))
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+BACKTEST_SHARD_SIZE = int(os.getenv("BACKTEST_SHARD_SIZE", "25"))
+# Sentiment within this distance of neutral (0.5) makes no prediction for hit rates
+BACKTEST_NEUTRAL_BAND = float(os.getenv("BACKTEST_NEUTRAL_BAND", "0.025"))
+# Events a quarter needs before its cross-sectional IC is counted
+MIN_EVENTS_PER_QUARTER = 10
+
+COLUMNS = ("ticker", "event_date", "pre_vol", "post_vol", "vol_change", "event_return",
+           "post_return", "sentiment", "documents")
+# Array dtype of each column that is not float
+COLUMN_DTYPES = {"ticker": "str", "event_date": "datetime64[D]", "documents": "int"}
+
+def load_events(path: str, tickers: Optional[Sequence[str]], start: date, end: date) -> pd.DataFrame:
+    """Events from a CSV with ticker and date columns, plus an optional sentiment column in [0, 1]"""
+    frame = pd.read_csv(path)
+    frame.columns = [c.strip().lower() for c in frame.columns]
+    frame = frame.rename(columns={"event_date": "date", "earnings_date": "date", "symbol": "ticker"})
+    frame["ticker"] = frame["ticker"].astype(str).str.strip().str.upper()
+    frame["date"] = pd.to_datetime(frame["date"]).dt.date
+    if tickers is not None:
+        frame = frame[frame["ticker"].isin(tickers)]
+    frame = frame[(frame["date"] >= start) & (frame["date"] <= end)]
+    columns = ["ticker", "date"] + (["sentiment"] if "sentiment" in frame else [])
+    return frame[columns].drop_duplicates(["ticker", "date"]).reset_index(drop=True)
+
+def calendar_events(tickers: Sequence[str], start: date, end: date) -> pd.DataFrame:
+    """Past report dates approximated from each ticker's stored next report, stepping back in quarters"""
+    from earnings_calendar import earnings_calendar
+    from forecast import quarterly_dates
+
+    rows = []
+    for ticker in tickers:
+        entry = earnings_calendar.get(ticker)
+        for day in quarterly_dates(entry and entry.get("earnings_date"), start, end):
+            if day <= end.isoformat():
+                rows.append((ticker, date.fromisoformat(day)))
+    return pd.DataFrame(rows, columns=["ticker", "date"])
+
+def load_bars(ticker: str, start: date, prices_dir: Optional[str] = None) -> pd.DataFrame:
+    """Daily OHLC bars from `start`, from <prices_dir>/<TICKER>.csv or the local OHLCV store"""
+    if prices_dir is not None:
+        path = os.path.join(prices_dir, f"{ticker}.csv")
+        if not os.path.isfile(path):
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close"], index=pd.DatetimeIndex([], name="Date"))
+        frame = pd.read_csv(path, index_col=0, parse_dates=True)
+        return frame[frame.index >= pd.Timestamp(start)].sort_index()
+
+    from ohlcv_store import ohlcv_store
+
+    if ohlcv_store is None:
+        raise ValueError("The OHLCV store is disabled; pass --prices DIR or set OHLCV_STORE_ENABLED=1")
+    return ohlcv_store.read(ticker, start=start)
+
+def sentiment_series(ticker: str, start: date, end: date):
+    """(document dates, sentiment_score per document) for the ticker's corpus documents"""
+    from corpus import get_corpus
+    from sentiment import get_scorer
+
+    dates, texts = [], []
+    for doc in get_corpus().documents(ticker, start, end):
+        dates.append(doc["date"])
+        texts.append(doc["text"])
+    scores = (np.asarray(get_scorer().score(texts), dtype=float) + 1) / 2 if texts else np.empty(0)
+    return np.array(dates, dtype="datetime64[D]"), scores
+
+def window_mean(times: np.ndarray, values: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+    """(mean, count) of values with start <= time < end for each window; times must be sorted"""
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    lo = np.searchsorted(times, starts, side="left")
+    hi = np.searchsorted(times, ends, side="left")
+    counts = hi - lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, (cumulative[hi] - cumulative[lo]) / counts, np.nan)
+    return means, counts
+
+def run_shard(task: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Worker: every event of a shard of tickers, as arrays in COLUMNS order"""
+    pre, post = task["pre"], task["post"]
+    start, end = task["start"], task["end"]
+    # Calendar days that surely cover the window bars around the date range
+    bars_from = start - timedelta(days=pre * 2 + 10)
+
+    o_parts, h_parts, l_parts, c_parts = [], [], [], []
+    positions, event_tickers, event_dates, sentiments, documents = [], [], [], [], []
+    offset = 0
+    for ticker, events in task["events"].items():
+        bars = load_bars(ticker, bars_from, task["prices_dir"])
+        bars = bars[bars.index <= pd.Timestamp(end + timedelta(days=post * 2 + 10))]
+        if len(bars) < pre + post + 2:
+            continue
+        days = bars.index.to_numpy(dtype="datetime64[D]")
+        event_days = np.array([d.isoformat() for d in events["date"]], dtype="datetime64[D]")
+        index = np.searchsorted(days, event_days, side="left")
+        # Full windows only: an anchor bar before the pre window and `post` bars after the event
+        usable = (index - pre - 1 >= 0) & (index + post < len(days))
+        if not usable.any():
+            continue
+
+        if "sentiment" in events:
+            sentiment = events["sentiment"].to_numpy(dtype=float)
+            count = np.where(np.isfinite(sentiment), 1, 0)
+        elif task["corpus"]:
+            lookback = np.timedelta64(task["sentiment_days"], "D")
+            doc_days, scores = sentiment_series(ticker, start - timedelta(days=task["sentiment_days"]), end)
+            sentiment, count = window_mean(doc_days, scores, event_days - lookback, event_days)
+        else:
+            sentiment, count = np.full(len(events), np.nan), np.zeros(len(events), dtype=int)
+
+        for part, field in ((o_parts, "Open"), (h_parts, "High"), (l_parts, "Low"), (c_parts, "Close")):
+            part.append(bars[field].to_numpy(dtype=float))
+        positions.append(index[usable] + offset)
+        event_tickers.extend([ticker] * int(usable.sum()))
+        event_dates.append(event_days[usable])
+        sentiments.append(sentiment[usable])
+        documents.append(count[usable])
+        offset += len(days)
+
+    if not positions:
+        return {column: np.empty(0, dtype=COLUMN_DTYPES.get(column, float)) for column in COLUMNS}
+
+    o, h, l, c = (np.concatenate(parts) for parts in (o_parts, h_parts, l_parts, c_parts))
+    events_at = np.concatenate(positions)
+
+    def window_vol(first: np.ndarray, bars: int) -> np.ndarray:
+        # (event x bar) windows of bars + 1 rows; the first is only the previous close
+        rows = first[:, None] + np.arange(bars + 1)
+        wo, wh, wl, wc = o[rows], h[rows], l[rows], c[rows]
+        wo[:, 0] = wh[:, 0] = wl[:, 0] = np.nan
+        daily = estimate_volatility(wo, wh, wl, wc, estimators=(task["estimator"],), min_bars=bars // 2 + 1)
+        return annualize(daily[task["estimator"]])
+
+    pre_vol = window_vol(events_at - pre - 1, pre)
+    post_vol = window_vol(events_at, post)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "ticker": np.array(event_tickers),
+            "event_date": np.concatenate(event_dates),
+            "pre_vol": pre_vol,
+            "post_vol": post_vol,
+            "vol_change": np.log(post_vol / pre_vol),
+            "event_return": np.log(c[events_at] / c[events_at - 1]),
+            "post_return": np.log(c[events_at + post] / c[events_at]),
+            "sentiment": np.concatenate(sentiments),
+            "documents": np.concatenate(documents),
+        }
+
+def _rank_ic(x: pd.Series, y: pd.Series) -> float:
+    """Spearman correlation: Pearson correlation of ranks"""
+    valid = x.notna() & y.notna()
+    if valid.sum() < 3:
+        return float("nan")
+    return float(np.corrcoef(x[valid].rank(), y[valid].rank())[0, 1])
+
+def _quantiles(values: pd.Series, signed: bool = True) -> Dict[str, Optional[float]]:
+    values = values.dropna()
+    if values.empty:
+        return {"count": 0}
+    q = np.quantile(values, [0.05, 0.25, 0.5, 0.75, 0.95])
+    return {
+        "count": int(len(values)),
+        "mean": round(float(values.mean()), 4),
+        "p05": round(float(q[0]), 4), "p25": round(float(q[1]), 4), "median": round(float(q[2]), 4),
+        "p75": round(float(q[3]), 4), "p95": round(float(q[4]), 4),
+        **({"share_rising": round(float((values > 0).mean()), 4)} if signed else {}),
+    }
+
+def summarize(events: pd.DataFrame, neutral_band: float = BACKTEST_NEUTRAL_BAND) -> Dict[str, Any]:
+    """Distributions, hit rates and information coefficients over the event table"""
+    events = events[np.isfinite(events["vol_change"])]
+    report: Dict[str, Any] = {
+        "events": int(len(events)),
+        "tickers": int(events["ticker"].nunique()),
+        "first_event": str(events["event_date"].min()) if len(events) else None,
+        "last_event": str(events["event_date"].max()) if len(events) else None,
+        "vol_change": _quantiles(events["vol_change"]),
+        "abs_event_return": _quantiles(events["event_return"].abs(), signed=False),
+    }
+    scored = events[events["sentiment"].notna()]
+    report["events_with_sentiment"] = int(len(scored))
+    if len(scored) < 3:
+        return report
+
+    # Terciles of sentiment; ties can leave a bucket empty
+    terciles = pd.qcut(scored["sentiment"].rank(method="first"), 3, labels=["low", "mid", "high"])
+    report["vol_change_by_sentiment"] = {
+        str(bucket): _quantiles(group["vol_change"]) for bucket, group in scored.groupby(terciles, observed=True)
+    }
+
+    signal = scored["sentiment"] - 0.5
+    decided = scored[signal.abs() > neutral_band]
+    decided_signal = signal[signal.abs() > neutral_band]
+    report["hit_rate"] = {
+        "events": int(len(decided)),
+        # Low sentiment calls for rising volatility, high sentiment for falling
+        "vol_direction": round(float(((decided_signal < 0) == (decided["vol_change"] > 0)).mean()), 4)
+        if len(decided) else None,
+        "vol_base_rate": round(float((decided["vol_change"] > 0).mean()), 4) if len(decided) else None,
+        "return_direction": round(float(((decided_signal > 0) == (decided["event_return"] > 0)).mean()), 4)
+        if len(decided) else None,
+        "return_base_rate": round(float((decided["event_return"] > 0).mean()), 4) if len(decided) else None,
+    }
+
+    report["ic"] = {
+        "vol_change": round(_rank_ic(scored["sentiment"], scored["vol_change"]), 4),
+        "post_vol": round(_rank_ic(scored["sentiment"], scored["post_vol"]), 4),
+        "abs_event_return": round(_rank_ic(scored["sentiment"], scored["event_return"].abs()), 4),
+        "event_return": round(_rank_ic(scored["sentiment"], scored["event_return"]), 4),
+        "post_return": round(_rank_ic(scored["sentiment"], scored["post_return"]), 4),
+    }
+    # Cross-sectional IC per calendar quarter: its mean, spread and t-statistic
+    quarters = pd.PeriodIndex(pd.to_datetime(scored["event_date"]), freq="Q")
+    by_quarter = pd.Series({
+        str(quarter): _rank_ic(group["sentiment"], group["vol_change"])
+        for quarter, group in scored.groupby(quarters)
+        if len(group) >= MIN_EVENTS_PER_QUARTER
+    }, dtype=float).dropna()
+    if len(by_quarter) >= 2:
+        report["ic_by_quarter"] = {
+            "quarters": int(len(by_quarter)),
+            "mean": round(float(by_quarter.mean()), 4),
+            "std": round(float(by_quarter.std()), 4),
+            "t_stat": round(float(by_quarter.mean() / by_quarter.std() * np.sqrt(len(by_quarter))), 2)
+            if by_quarter.std() > 0 else None,
+            "share_positive": round(float((by_quarter > 0).mean()), 4),
+        }
+    return report
+
+def run_backtest(tickers: Sequence[str], start: date, end: date, events_path: Optional[str] = None,
+                 prices_dir: Optional[str] = None, pre: int = BACKTEST_PRE_BARS, post: int = BACKTEST_POST_BARS,
+                 estimator: str = "close_to_close", sentiment_days: int = BACKTEST_SENTIMENT_DAYS,
+                 workers: int = BACKTEST_WORKERS, corpus: bool = True):
+    """(event table, report) for the universe over start..end"""
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unknown volatility estimator: {estimator}")
+    if events_path is not None:
+        events = load_events(events_path, tickers, start, end)
+    else:
+        events = calendar_events(tickers, start, end)
+    if corpus and "sentiment" not in events:
+        from corpus import CORPUS_PATH
+        corpus = os.path.exists(CORPUS_PATH)
+
+    by_ticker = {ticker: group.reset_index(drop=True) for ticker, group in events.groupby("ticker")}
+    names = sorted(by_ticker)
+    shards = [
+        {
+            "events": {t: by_ticker[t] for t in names[i:i + BACKTEST_SHARD_SIZE]},
+            "start": start, "end": end, "pre": pre, "post": post, "estimator": estimator,
+            "prices_dir": prices_dir, "corpus": corpus, "sentiment_days": sentiment_days,
+        }
+        for i in range(0, len(names), BACKTEST_SHARD_SIZE)
+    ]
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            results = list(executor.map(run_shard, shards))
+    else:
+        results = [run_shard(shard) for shard in shards]
+
+    # Shards where no ticker had a full window add nothing
+    results = [r for r in results if len(r["ticker"])]
+    table = pd.DataFrame({
+        column: np.concatenate([r[column] for r in results]) if results
+        else np.empty(0, dtype=COLUMN_DTYPES.get(column, float))
+        for column in COLUMNS
+    })
+    if len(table):
+        table["event_date"] = pd.to_datetime(table["event_date"]).dt.date
+        table = table.sort_values(["event_date", "ticker"]).reset_index(drop=True)
+    report = summarize(table)
+    report.update({"estimator": estimator, "pre_bars": pre, "post_bars": post,
+                   "sentiment_days": sentiment_days, "input_events": int(len(events))})
+    return table, report
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print(__doc__)
+        return
+
+    def option(name: str, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    start = date.fromisoformat(option("--from", (date.today() - timedelta(days=10 * 365)).isoformat()))
+    end = date.fromisoformat(option("--to", date.today().isoformat()))
+    events_path = option("--events")
+    prices_dir = option("--prices")
+
+    if args[0].lower() == "all":
+        if events_path is not None:
+            tickers = sorted(load_events(events_path, None, start, end)["ticker"].unique())
+        elif prices_dir is not None:
+            tickers = sorted(os.path.splitext(name)[0].upper() for name in os.listdir(prices_dir)
+                             if name.endswith(".csv"))
+        else:
+            from ohlcv_store import ohlcv_store
+            tickers = ohlcv_store.tickers() if ohlcv_store is not None else []
+    else:
+        from batch import parse_tickers
+        tickers = parse_tickers([args[0]])
+
+    started = time.perf_counter()
+    table, report = run_backtest(
+        tickers, start, end, events_path=events_path, prices_dir=prices_dir,
+        pre=int(option("--pre", BACKTEST_PRE_BARS)), post=int(option("--post", BACKTEST_POST_BARS)),
+        estimator=option("--estimator", "close_to_close"),
+        workers=int(option("--workers", BACKTEST_WORKERS)),
+    )
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    if option("--out"):
+        table.to_csv(option("--out"), index=False)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Batch analysis
+
+Bulk OHLCV downloads for many tickers at once (chunked yfinance downloads,
+with Polygon.io grouped-daily bars filling in names yfinance missed) and a
+single vectorized pass that computes the quote and volatility fields of
+analyze_stock for the whole universe using the volatility engine.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import warnings
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import http_client
+from circuit_breaker import circuit_breakers
+from coldstart import lazy_import
+from rate_limit import rate_limiter
+from ticker_context import HISTORY_PERIOD
+from volatility import MIN_BARS, annualize, estimate_volatility, frames_to_arrays
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+yf = lazy_import("yfinance")
+
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "200"))
+BATCH_MAX_TICKERS = int(os.getenv("BATCH_MAX_TICKERS", "1000"))
+# Grouped-daily requests cover the whole market per call; fetch enough sessions
+# for the volatility estimate, not just the two a quote needs
+POLYGON_GROUPED_DAYS = int(os.getenv("POLYGON_GROUPED_DAYS", str(MIN_BARS + 1)))
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+def parse_tickers(raw: Iterable[str]) -> List[str]:
+    """Normalize ticker input (lists and/or comma-separated strings), keeping order"""
+    seen = {}
+    for item in raw:
+        for ticker in str(item).split(","):
+            ticker = ticker.strip().upper()
+            if ticker:
+                seen.setdefault(ticker, None)
+    return list(seen)
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _empty_panel(tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    return {field: pd.DataFrame(columns=tickers, dtype=float) for field in FIELDS}
+
+def download_yfinance_panel(tickers: List[str], period: str = HISTORY_PERIOD) -> Dict[str, pd.DataFrame]:
+    """Daily bars as {field: DataFrame(dates x tickers)}, one yf.download call per chunk"""
+    parts = {field: [] for field in FIELDS}
+    for chunk in _chunks(tickers, BATCH_CHUNK_SIZE):
+        if not rate_limiter.acquire_sync("yfinance"):
+            print(f"Skipping yfinance batch of {len(chunk)}: rate limit budget exhausted")
+            continue
+        try:
+            data = yf.download(
+                chunk, period=period, group_by="column", auto_adjust=True,
+                actions=False, threads=True, progress=False,
+            )
+        except Exception as e:
+            print(f"Error downloading yfinance batch: {e}")
+            continue
+        if data is None or data.empty:
+            continue
+        if not isinstance(data.columns, pd.MultiIndex):
+            # Older yfinance returns flat columns for a single ticker
+            data.columns = pd.MultiIndex.from_product([data.columns, chunk])
+        for field in FIELDS:
+            if field in data.columns.get_level_values(0):
+                parts[field].append(data[field])
+
+    panel = _empty_panel(tickers)
+    for field, frames in parts.items():
+        if frames:
+            panel[field] = pd.concat(frames, axis=1).reindex(columns=tickers).astype(float)
+    return panel
+
+async def _polygon_grouped_day(day: date, api_key: str) -> Optional[List[Dict[str, Any]]]:
+    """All US stock bars for one session, [] for a non-trading day, None on failure"""
+    breaker = circuit_breakers.get("polygon")
+    if not breaker.allow():
+        print(f"Skipping Polygon grouped-daily for {day}: circuit open")
+        return None
+    if not await rate_limiter.acquire("polygon"):
+        print(f"Skipping Polygon grouped-daily for {day}: rate limit budget exhausted")
+        breaker.release()
+        return None
+    try:
+        url = f"https://api.polygon.io/v2/aggs/grouped/locale/us/market/stocks/{day.isoformat()}"
+        data = await http_client.get_json(url, params={"adjusted": "true", "apiKey": api_key})
+    except Exception as e:
+        print(f"Error getting Polygon grouped data for {day}: {e}")
+        breaker.record_failure()
+        return None
+    breaker.record_success()
+    if data is None:
+        return None
+    return data.get("results") or []
+
+async def download_polygon_grouped(tickers: List[str], api_key: str,
+                                   days: int = POLYGON_GROUPED_DAYS) -> Dict[str, pd.DataFrame]:
+    """Daily bars for the most recent sessions from Polygon.io grouped-daily requests"""
+    wanted = set(tickers)
+    rows: Dict[str, Dict[str, Dict[str, float]]] = {field: {} for field in FIELDS}
+    day = date.today()
+    sessions = 0
+    attempts = 0
+    # Request the missing sessions concurrently; holidays come back empty, so
+    # keep stepping back (a bounded number of times) until enough are found
+    while sessions < days and attempts < days + 5:
+        batch_days = []
+        while len(batch_days) < days - sessions:
+            day -= timedelta(days=1)
+            if day.weekday() < 5:
+                batch_days.append(day)
+        attempts += len(batch_days)
+        responses = await asyncio.gather(*(_polygon_grouped_day(d, api_key) for d in batch_days))
+
+        for session_day, results in zip(batch_days, responses):
+            if results is None:
+                # Failed or rate limited: stop rather than burn more quota
+                attempts = days + 5
+                continue
+            if not results:
+                continue
+            sessions += 1
+            stamp = pd.Timestamp(session_day)
+            for result in results:
+                ticker = result.get("T")
+                if ticker not in wanted:
+                    continue
+                for field, key in zip(FIELDS, ("o", "h", "l", "c", "v")):
+                    rows[field].setdefault(stamp, {})[ticker] = float(result.get(key, np.nan))
+
+    panel = _empty_panel(tickers)
+    for field, by_date in rows.items():
+        if by_date:
+            panel[field] = pd.DataFrame.from_dict(by_date, orient="index").sort_index().reindex(columns=tickers)
+    return panel
+
+def compute_batch_metrics(panel: Dict[str, pd.DataFrame], tickers: List[str],
+                          estimator: str = "close_to_close") -> Dict[str, Dict[str, Any]]:
+    """Quote and volatility fields for every ticker in one pass"""
+    close_frame = panel["Close"].reindex(columns=tickers)
+    close = close_frame.to_numpy(dtype=float)
+    if close.size == 0:
+        return {}
+
+    valid = ~np.isnan(close)
+    counts = valid.sum(axis=0)
+    # Price change is measured against the previous available close
+    filled = close_frame.ffill().to_numpy(dtype=float)
+    prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), filled[:-1]])
+    daily_vol = estimate_volatility(*frames_to_arrays(panel, tickers), estimators=(estimator,))[estimator]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        avg_volume = np.nanmean(panel["Volume"].reindex(columns=tickers).to_numpy(dtype=float), axis=0)
+
+    cols = np.arange(close.shape[1])
+    last = close.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    price = close[last, cols]
+    prev_price = prev_close[last, cols]
+    change = price - prev_price
+    change_pct = np.where(prev_price > 0, change / prev_price * 100, 0.0)
+
+    def at_last(field: str) -> np.ndarray:
+        return panel[field].reindex(index=close_frame.index, columns=tickers).to_numpy(dtype=float)[last, cols]
+
+    high, low, open_, volume = at_last("High"), at_last("Low"), at_last("Open"), at_last("Volume")
+
+    metrics = {}
+    for i, ticker in enumerate(tickers):
+        # Same minimums as the single-ticker path: 2 bars for a quote, MIN_BARS for volatility
+        if counts[i] < 2:
+            continue
+        has_vol = counts[i] >= MIN_BARS and not np.isnan(daily_vol[i])
+        metrics[ticker] = {
+            "price": float(price[i]),
+            "price_change": float(change[i]),
+            "price_change_percent": float(change_pct[i]),
+            "volume": int(np.nan_to_num(volume[i])),
+            "avg_volume": int(np.nan_to_num(avg_volume[i])),
+            "high": float(np.nan_to_num(high[i])),
+            "low": float(np.nan_to_num(low[i])),
+            "open": float(np.nan_to_num(open_[i])),
+            # Too few bars for an estimate is unknown, not zero volatility
+            "annualized_volatility": round(float(annualize(daily_vol[i])), 2) if has_vol else None,
+            "daily_volatility": round(float(daily_vol[i] * 100), 2) if has_vol else None,
+        }
+    return metrics
+
+async def fetch_batch_metrics(tickers: List[str], polygon_api_key: Optional[str] = None,
+                              estimator: str = "close_to_close") -> Dict[str, Dict[str, Any]]:
+    """Bulk-download bars for tickers and compute their metrics, tagging each with its source"""
+    panel = await asyncio.to_thread(download_yfinance_panel, tickers)
+    metrics = compute_batch_metrics(panel, tickers, estimator)
+    for values in metrics.values():
+        values["source"] = "Yahoo Finance"
+
+    missing = [ticker for ticker in tickers if ticker not in metrics]
+    if missing and polygon_api_key:
+        polygon_panel = await download_polygon_grouped(missing, polygon_api_key)
+        polygon_metrics = compute_batch_metrics(polygon_panel, missing, estimator)
+        for values in polygon_metrics.values():
+            values["source"] = "Polygon.io"
+        metrics.update(polygon_metrics)
+    return metrics
@@ -0,0 +1,245 @@
+"""
+In-process quote cache
+
+Bounded LRU cache with per-kind TTLs sitting in front of the market data
+helpers in main.py. Data fetched outside the regular session stays fresh until
+the next open, and expired entries are served stale while a background
+refresh runs so a popular ticker never waits on an upstream call. Concurrent
+misses for the same key share a single upstream call.
+"""
+import asyncio
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from market_hours import is_market_open, seconds_until_next_open
+from singleflight import inflight
+
+# Fresh lifetime per kind of data, in seconds
+DEFAULT_TTLS = {
+    "quote": 60,
+    "earnings": 6 * 60 * 60,
+    "volatility": 15 * 60,
+    "options": 5 * 60,
+    "implied_vol": 5 * 60,
+    "surface": 5 * 60,
+}
+
+CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "1024"))
+# How long past expiry an entry may still be served while it is refreshed
+CACHE_STALE_SECONDS = float(os.getenv("QUOTE_CACHE_STALE_SECONDS", "300"))
+CACHE_ENABLED = os.getenv("QUOTE_CACHE_ENABLED", "1") != "0"
+
+def _ttls_from_env() -> Dict[str, float]:
+    """Per-kind TTLs, overridable with QUOTE_CACHE_TTL_<KIND>"""
+    return {
+        kind: float(os.getenv(f"QUOTE_CACHE_TTL_{kind.upper()}", default))
+        for kind, default in DEFAULT_TTLS.items()
+    }
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+class QuoteCache:
+    """Thread-safe LRU cache with TTL expiry and stale-while-revalidate"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttls: Optional[Dict[str, float]] = None,
+                 stale_seconds: float = CACHE_STALE_SECONDS):
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._refreshing = set()
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "refresh_errors": 0}
+
+    def ttl_for(self, kind: str) -> float:
+        """Fresh lifetime for a kind of data, extended to the next open when the market is closed"""
+        ttl = self.ttls.get(kind, DEFAULT_TTLS["quote"])
+        if not is_market_open():
+            ttl = max(ttl, seconds_until_next_open())
+        return ttl
+
+    def _lookup(self, kind: str, key: Hashable, refresh: Callable[[], None]) -> Tuple[bool, Any]:
+        """Return (found, value), kicking off refresh() when the entry is stale"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry.fresh_until:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return True, entry.value
+                if now < entry.stale_until:
+                    self._entries.move_to_end(key)
+                    self._stats["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        refresh()
+                    return True, entry.value
+            self._stats["misses"] += 1
+        return False, None
+
+    def get_or_load(self, kind: str, key: Hashable, loader: Callable[[], Any],
+                    refresh_loader: Optional[Callable[[], Any]] = None,
+                    cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return the cached value for key, calling loader on a miss"""
+        def refresh():
+            thread = threading.Thread(
+                target=self._refresh,
+                args=(kind, key, refresh_loader or loader, cacheable),
+                daemon=True,
+            )
+            thread.start()
+
+        found, value = self._lookup(kind, key, refresh)
+        if found:
+            return value
+
+        def load():
+            value = loader()
+            self.set(kind, key, value, cacheable)
+            return value
+
+        return inflight.do_sync(key, load)
+
+    async def aget_or_load(self, kind: str, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                           refresh_loader: Optional[Callable[[], Awaitable[Any]]] = None,
+                           cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Async variant of get_or_load for coroutine loaders"""
+        def refresh():
+            task = asyncio.get_running_loop().create_task(
+                self._arefresh(kind, key, refresh_loader or loader, cacheable)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        found, value = self._lookup(kind, key, refresh)
+        if found:
+            return value
+
+        async def load():
+            value = await loader()
+            self.set(kind, key, value, cacheable)
+            return value
+
+        return await inflight.do(key, load)
+
+    def set(self, kind: str, key: Hashable, value: Any,
+            cacheable: Optional[Callable[[Any], bool]] = None) -> None:
+        """Store a value unless the cacheable predicate rejects it"""
+        if cacheable is not None and not cacheable(value):
+            return
+
+        now = time.monotonic()
+        ttl = self.ttl_for(kind)
+        entry = _Entry(value, now + ttl, now + ttl + self.stale_seconds)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _refresh(self, kind: str, key: Hashable, loader: Callable[[], Any],
+                 cacheable: Optional[Callable[[Any], bool]]) -> None:
+        try:
+            self.set(kind, key, loader(), cacheable)
+        except Exception as e:
+            print(f"Error refreshing cache entry {key}: {e}")
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _arefresh(self, kind: str, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                        cacheable: Optional[Callable[[Any], bool]]) -> None:
+        try:
+            self.set(kind, key, await loader(), cacheable)
+        except Exception as e:
+            print(f"Error refreshing cache entry {key}: {e}")
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, ticker: Optional[str] = None) -> None:
+        """Drop every entry, or only those for one ticker"""
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+                return
+            ticker = ticker.upper()
+            for key in [k for k in self._entries if k[1] == ticker]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, **self._stats}
+
+quote_cache = QuoteCache(ttls=_ttls_from_env())
+
+def _cache_key(kind: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[Any, ...]:
+    ticker, rest = str(args[0]).upper(), args[1:]
+    return (kind, ticker, rest, tuple(sorted(kwargs.items())))
+
+def cached(kind: str, cacheable: Optional[Callable[[Any], bool]] = None,
+           ignore: Tuple[str, ...] = ()):
+    """Cache a ticker-keyed data helper under the given kind.
+
+    The first positional argument must be the ticker. Keyword arguments named
+    in ``ignore`` are left out of the key and are not forwarded to background
+    refreshes. Coroutine functions are supported. Concurrent calls with the
+    same key are coalesced even when caching is disabled.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key_kwargs = {k: v for k, v in kwargs.items() if k not in ignore}
+                key = _cache_key(kind, args, key_kwargs)
+                if not CACHE_ENABLED:
+                    return await inflight.do(key, lambda: func(*args, **kwargs))
+
+                return await quote_cache.aget_or_load(
+                    kind,
+                    key,
+                    lambda: func(*args, **kwargs),
+                    refresh_loader=lambda: func(*args, **key_kwargs),
+                    cacheable=cacheable,
+                )
+
+            async_wrapper.uncached = func
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key_kwargs = {k: v for k, v in kwargs.items() if k not in ignore}
+            key = _cache_key(kind, args, key_kwargs)
+            if not CACHE_ENABLED:
+                return inflight.do_sync(key, lambda: func(*args, **kwargs))
+
+            return quote_cache.get_or_load(
+                kind,
+                key,
+                lambda: func(*args, **kwargs),
+                refresh_loader=lambda: func(*args, **key_kwargs),
+                cacheable=cacheable,
+            )
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
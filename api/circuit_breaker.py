@@ -0,0 +1,153 @@
+"""
+Per-provider circuit breakers
+
+A breaker watches one upstream's call outcomes. After too many consecutive
+failures, or a high failure rate over the recent window, it opens and calls
+to that provider are skipped instantly instead of each waiting out its
+timeout. Once the cool-down has passed the breaker goes half-open and lets a
+few probe calls through: a successful probe closes it again, a failed one
+re-opens it for another cool-down.
+
+Settings apply to every provider and can be overridden per provider, e.g.
+CIRCUIT_COOLDOWN=30 and CIRCUIT_FMP_COOLDOWN=120.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_SETTINGS = {
+    "FAILURE_THRESHOLD": 5,   # consecutive failures that open the breaker
+    "FAILURE_RATE": 0.5,      # failure rate over the window that opens it
+    "WINDOW": 20,             # recent calls considered for the failure rate
+    "MIN_CALLS": 10,          # calls in the window before the rate applies
+    "COOLDOWN": 30.0,         # seconds open before probing
+    "HALF_OPEN_PROBES": 1,    # concurrent probe calls while half-open
+}
+
+def _setting(provider: str, key: str) -> Any:
+    default = DEFAULT_SETTINGS[key]
+    value = os.getenv(f"CIRCUIT_{provider.upper()}_{key}", os.getenv(f"CIRCUIT_{key}", default))
+    return type(default)(value)
+
+class CircuitBreaker:
+    """Thread-safe closed / open / half-open breaker for one provider"""
+
+    def __init__(self, name: str, failure_threshold: int, failure_rate: float, window: int,
+                 min_calls: int, cooldown: float, half_open_probes: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._opens = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name: str) -> "CircuitBreaker":
+        return cls(
+            name,
+            failure_threshold=_setting(name, "FAILURE_THRESHOLD"),
+            failure_rate=_setting(name, "FAILURE_RATE"),
+            window=_setting(name, "WINDOW"),
+            min_calls=_setting(name, "MIN_CALLS"),
+            cooldown=_setting(name, "COOLDOWN"),
+            half_open_probes=_setting(name, "HALF_OPEN_PROBES"),
+        )
+
+    def _open(self) -> None:
+        if self.state != OPEN:
+            print(f"Circuit for {self.name} opened; probing again in {self.cooldown:.0f}s")
+            self._opens += 1
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; a True while half-open claims a probe slot"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._outcomes.append(True)
+            self._consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                print(f"Circuit for {self.name} closed after a successful probe")
+                self.state = CLOSED
+                self._outcomes.clear()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            self._consecutive_failures += 1
+            failures = self._outcomes.count(False)
+            if (
+                self.state == HALF_OPEN
+                or self._consecutive_failures >= self.failure_threshold
+                or (len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate)
+            ):
+                self._open()
+
+    def release(self) -> None:
+        """Give back a probe slot for a call that ended without an outcome (cancelled)"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(self.cooldown - (time.monotonic() - self._opened_at), 0.0), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_rate": round(self._outcomes.count(False) / len(self._outcomes), 3) if self._outcomes else 0.0,
+                "retry_in_seconds": retry_in,
+                "opens": self._opens,
+                "rejected": self._rejected,
+            }
+
+class CircuitBreakers:
+    """Registry of breakers, created from the environment on first use"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = self._breakers[provider] = CircuitBreaker.from_env(provider)
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in sorted(breakers.items())}
+
+circuit_breakers = CircuitBreakers()
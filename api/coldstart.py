@@ -0,0 +1,158 @@
+"""
+Cold-start helpers
+
+Serverless entry points pay for every import on each cold start, even for
+/health. This module provides:
+
+- lazy_import: a module proxy that imports on first attribute access and
+  records how long the import took
+- load_env: loads .env only when one exists, without importing dotenv otherwise
+- warmup: optional pre-import and client initialisation (VOLA_WARMUP=1)
+- an import-time report measured in a fresh interpreter with -X importtime
+
+Usage:
+    python coldstart.py [module ...] [--top N] [--budget-ms MS]
+
+The report exits with status 1 when an entry point's total import time is over
+the budget, so it can be used as a regression check.
+"""
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+VOLA_WARMUP = os.getenv("VOLA_WARMUP", "0") == "1"
+
+# Heavy modules worth importing ahead of the first request when warming up
+WARMUP_MODULES = ("numpy", "pandas", "yfinance", "httpx", "textblob.en.sentiments")
+
+_API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_timings: Dict[str, float] = {}
+_timings_lock = threading.Lock()
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            elapsed = time.perf_counter() - start
+            with _timings_lock:
+                _timings.setdefault(self.__name__, elapsed)
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self) -> List[str]:
+        return dir(self._load())
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return the module if it is already loaded, otherwise a lazy proxy for it"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+def lazy_import_stats() -> Dict[str, float]:
+    """Milliseconds spent importing each lazily loaded module so far"""
+    with _timings_lock:
+        return {name: round(seconds * 1000, 1) for name, seconds in _timings.items()}
+
+def load_env() -> None:
+    """Load a .env file from the API directory or cwd, importing dotenv only if one exists"""
+    for folder in (_API_DIR, os.getcwd()):
+        path = os.path.join(folder, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
+
+def warmup(modules: Iterable[str] = WARMUP_MODULES,
+           initializers: Iterable[Callable[[], Any]] = ()) -> Dict[str, float]:
+    """Import heavy modules and run initializers up front; returns ms per step"""
+    report = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Warmup could not import {name}: {e}")
+            continue
+        report[name] = round((time.perf_counter() - start) * 1000, 1)
+        with _timings_lock:
+            _timings.setdefault(name, report[name] / 1000)
+    for init in initializers:
+        start = time.perf_counter()
+        try:
+            init()
+        except Exception as e:
+            print(f"Warmup initializer {getattr(init, '__name__', init)} failed: {e}")
+            continue
+        report[getattr(init, "__name__", repr(init))] = round((time.perf_counter() - start) * 1000, 1)
+    return report
+
+def import_time_report(module: str, cwd: str = _API_DIR) -> Dict[str, Any]:
+    """Import cost of `module` measured in a fresh interpreter with -X importtime.
+
+    Returns the total in milliseconds plus per-module rows of
+    (name, self_ms, cumulative_ms, depth), heaviest cumulative first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # One space after the separator, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+
+    total = next((cumulative for name, _, cumulative, _ in rows if name == module), 0.0)
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return {"module": module, "total_ms": round(total, 1), "modules": rows}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    top, budget = 15, None
+    if "--top" in args:
+        i = args.index("--top")
+        top = int(args[i + 1])
+        del args[i:i + 2]
+    if "--budget-ms" in args:
+        i = args.index("--budget-ms")
+        budget = float(args[i + 1])
+        del args[i:i + 2]
+    modules = args or ["index", "standalone"]
+
+    status = 0
+    for module in modules:
+        report = import_time_report(module)
+        over = budget is not None and report["total_ms"] > budget
+        status = 1 if over else status
+        suffix = f" (over budget of {budget:.0f} ms)" if over else ""
+        print(f"{module}: {report['total_ms']:.1f} ms{suffix}")
+        for name, self_ms, cumulative_ms, depth in report["modules"][:top]:
+            print(f"  {cumulative_ms:9.1f} ms cumulative {self_ms:8.1f} ms self  {'  ' * depth}{name}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Text corpus
+
+SQLite store of ingested documents (news, call transcripts, filings) indexed
+by (ticker, date). Document text is zlib-compressed, and reads are generators
+that decompress one row at a time, so scanning a ticker's history never
+holds more than one document in memory. Each document is keyed by the hash
+of its raw bytes and by the hash of its normalized text, so re-ingesting the
+same files, or the same article in a different wrapper, is skipped. Files
+that parsed to nothing usable (too short, or no ticker) are recorded by raw
+hash in a manifest, so re-runs skip them without parsing them again.
+
+Usage:
+    python corpus.py stats
+    python corpus.py show AAPL [from] [to]
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+CORPUS_PATH = os.getenv(
+    "CORPUS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "corpus.sqlite3")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    published_at TEXT,
+    kind TEXT NOT NULL,
+    title TEXT,
+    source TEXT NOT NULL,
+    raw_hash TEXT NOT NULL UNIQUE,
+    content_hash TEXT NOT NULL UNIQUE,
+    length INTEGER NOT NULL,
+    text BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_ticker_date ON documents (ticker, date);
+CREATE TABLE IF NOT EXISTS skipped (
+    raw_hash TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    skipped_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+FIELDS = ("ticker", "date", "published_at", "kind", "title", "source", "raw_hash", "content_hash")
+
+class Corpus:
+    """Compressed documents with a (ticker, date) index"""
+
+    def __init__(self, path: str = CORPUS_PATH):
+        self.path = path
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def existing(self, hashes: Sequence[str]) -> Set[str]:
+        """The given hashes that are already stored, as raw or content hashes"""
+        found: Set[str] = set()
+        hashes = list(hashes)
+        conn = self._connect()
+        try:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 400):
+                chunk = hashes[start:start + 400]
+                marks = ", ".join("?" * len(chunk))
+                for raw_hash, content_hash in conn.execute(
+                    f"SELECT raw_hash, content_hash FROM documents "
+                    f"WHERE raw_hash IN ({marks}) OR content_hash IN ({marks})",
+                    chunk + chunk,
+                ):
+                    found.update((raw_hash, content_hash))
+        finally:
+            conn.close()
+        return found & set(hashes)
+
+    def skipped(self, hashes: Sequence[str], statuses: Sequence[str]) -> Set[str]:
+        """The given raw hashes recorded as skipped with one of the statuses"""
+        found: Set[str] = set()
+        hashes = list(hashes)
+        status_marks = ", ".join("?" * len(statuses))
+        conn = self._connect()
+        try:
+            for start in range(0, len(hashes), 400):
+                chunk = hashes[start:start + 400]
+                found.update(row[0] for row in conn.execute(
+                    f"SELECT raw_hash FROM skipped WHERE raw_hash IN ({', '.join('?' * len(chunk))}) "
+                    f"AND status IN ({status_marks})",
+                    chunk + list(statuses),
+                ))
+        finally:
+            conn.close()
+        return found
+
+    def skip(self, entries: Iterable[Tuple[str, str, str]]) -> None:
+        """Record (raw hash, source, status) of files that produced no document"""
+        now = time.time()
+        rows = [(raw_hash, source, status, now) for raw_hash, source, status in entries]
+        if not rows:
+            return
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO skipped VALUES (?, ?, ?, ?)", rows)
+            finally:
+                conn.close()
+
+    def add(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """Insert documents in one transaction, ignoring hashes already stored; returns rows added"""
+        rows = [
+            (*(doc.get(field) for field in FIELDS), len(doc["text"]),
+             zlib.compress(doc["text"].encode("utf-8"), 6))
+            for doc in documents
+        ]
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    before = conn.total_changes
+                    conn.executemany(
+                        f"INSERT OR IGNORE INTO documents ({', '.join(FIELDS)}, length, text) "
+                        f"VALUES ({', '.join('?' * (len(FIELDS) + 2))})",
+                        rows,
+                    )
+                    added = conn.total_changes - before
+                    # Files recorded as skipped by an earlier run and now parsed
+                    conn.executemany("DELETE FROM skipped WHERE raw_hash = ?", [(row[6],) for row in rows])
+                    return added
+            finally:
+                conn.close()
+
+    def documents(self, ticker: Optional[str], start: Optional[date] = None, end: Optional[date] = None,
+                  newest_first: bool = False, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """A ticker's documents (every ticker's for None) dated from start to end inclusive, decompressed lazily"""
+        query = f"SELECT {', '.join(FIELDS)}, text FROM documents WHERE 1 = 1"
+        params: list = []
+        if ticker is not None:
+            query += " AND ticker = ?"
+            params.append(ticker.upper())
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(start.isoformat())
+        if end is not None:
+            query += " AND date <= ?"
+            params.append(end.isoformat())
+        query += f" ORDER BY date {'DESC' if newest_first else 'ASC'}, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect()
+        try:
+            for row in conn.execute(query, params):
+                doc = dict(zip(FIELDS, row))
+                doc["text"] = zlib.decompress(row[-1]).decode("utf-8")
+                yield doc
+        finally:
+            conn.close()
+
+    def tickers(self) -> Dict[str, Tuple[str, str]]:
+        """(first date, last date) of each ticker's documents"""
+        conn = self._connect()
+        try:
+            return {
+                ticker: (first, last) for ticker, first, last in conn.execute(
+                    "SELECT ticker, MIN(date), MAX(date) FROM documents GROUP BY ticker ORDER BY ticker"
+                )
+            }
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            documents, tickers, chars, stored = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT ticker), COALESCE(SUM(length), 0), "
+                "COALESCE(SUM(LENGTH(text)), 0) FROM documents"
+            ).fetchone()
+            first, last = conn.execute("SELECT MIN(date), MAX(date) FROM documents").fetchone()
+            skipped = conn.execute("SELECT COUNT(*) FROM skipped").fetchone()[0]
+        finally:
+            conn.close()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {
+            "path": self.path,
+            "documents": documents,
+            "tickers": tickers,
+            "first_date": first,
+            "last_date": last,
+            "text_chars": chars,
+            "compressed_bytes": stored,
+            "skipped_files": skipped,
+            "bytes": size,
+        }
+
+_corpus: Optional[Corpus] = None
+_corpus_lock = threading.Lock()
+
+def get_corpus() -> Corpus:
+    """The process-wide corpus, opened on first use"""
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = Corpus()
+    return _corpus
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "stats":
+        print(get_corpus().stats())
+    elif command == "show" and len(sys.argv) > 2:
+        start = date.fromisoformat(sys.argv[3]) if len(sys.argv) > 3 else None
+        end = date.fromisoformat(sys.argv[4]) if len(sys.argv) > 4 else None
+        started = time.perf_counter()
+        count = 0
+        for doc in get_corpus().documents(sys.argv[2], start, end):
+            count += 1
+            print(f"{doc['date']}  {doc['kind']:<10}  {(doc['title'] or doc['text'][:80])!r}")
+        print(f"{count} documents in {time.perf_counter() - started:.2f}s")
+    else:
+        print(__doc__)
+
+if __name__ == "__main__":
+    main()
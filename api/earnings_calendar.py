@@ -0,0 +1,349 @@
+"""
+Earnings calendar
+
+Locally persisted next-earnings dates with two in-memory indexes: a hash
+index by ticker for /api/earnings/{ticker} and a date-sorted index for range
+queries (/api/earnings/upcoming). Entries live in SQLite so they survive
+restarts, and the whole calendar is refreshed in bulk on a schedule: one FMP
+earnings-calendar request covers every reporting name over the horizon, and
+tickers FMP does not cover (EARNINGS_UNIVERSE and names looked up recently)
+are refreshed one by one through the provider router. The database is read
+on first use, so importing the module costs no I/O.
+
+Usage:
+    python earnings_calendar.py stats
+    python earnings_calendar.py refresh
+"""
+import asyncio
+import bisect
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import http_client
+from circuit_breaker import circuit_breakers
+from rate_limit import rate_limiter
+
+EARNINGS_STORE_ENABLED = os.getenv("EARNINGS_STORE_ENABLED", "1") != "0"
+EARNINGS_STORE_PATH = os.getenv(
+    "EARNINGS_STORE_PATH", os.path.join(tempfile.gettempdir(), "vola_earnings.sqlite3")
+)
+EARNINGS_REFRESH_SECONDS = float(os.getenv("EARNINGS_REFRESH_SECONDS", str(6 * 60 * 60)))
+# Per-ticker entries older than this are re-fetched on lookup
+EARNINGS_MAX_AGE = float(os.getenv("EARNINGS_MAX_AGE", str(24 * 60 * 60)))
+# Days ahead covered by the bulk calendar request
+EARNINGS_HORIZON_DAYS = int(os.getenv("EARNINGS_HORIZON_DAYS", "90"))
+EARNINGS_REFRESH_CONCURRENCY = int(os.getenv("EARNINGS_REFRESH_CONCURRENCY", "4"))
+# Tickers always kept fresh by the bulk refresh, in addition to those looked up
+EARNINGS_UNIVERSE = [t.strip().upper() for t in os.getenv("EARNINGS_UNIVERSE", "").split(",") if t.strip()]
+# Looked-up tickers stay in the bulk refresh this long after their last lookup
+EARNINGS_RECENT_SECONDS = float(os.getenv("EARNINGS_RECENT_SECONDS", str(7 * 24 * 60 * 60)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS earnings (
+    ticker TEXT PRIMARY KEY,
+    earnings_date TEXT,
+    time TEXT,
+    eps_estimate REAL,
+    source TEXT,
+    refreshed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+COLUMNS = ("ticker", "earnings_date", "time", "eps_estimate", "source", "refreshed_at")
+
+# Per-ticker fetch: (ticker) -> {"next_earnings": "YYYY-MM-DD" | "N/A", ...} or None
+TickerFetch = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+
+def parse_date(value: Any) -> Optional[str]:
+    """ISO date string from a provider value, None for N/A or unparseable values"""
+    try:
+        return date.fromisoformat(str(value)[:10]).isoformat()
+    except ValueError:
+        return None
+
+def earnings_data(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The /api/earnings/{ticker} payload for a calendar entry"""
+    next_earnings = entry.get("earnings_date") or "N/A"
+    data = {"next_earnings": next_earnings, "earnings_date": next_earnings}
+    if entry.get("time"):
+        data["time"] = entry["time"]
+    if entry.get("eps_estimate") is not None:
+        data["eps_estimate"] = entry["eps_estimate"]
+    return data
+
+class EarningsCalendar:
+    """Earnings dates indexed by ticker and by date, persisted to SQLite"""
+
+    def __init__(self, path: Optional[str] = EARNINGS_STORE_PATH):
+        self.path = path
+        self._by_ticker: Dict[str, Dict[str, Any]] = {}
+        self._by_date: List[Tuple[str, str]] = []  # sorted (earnings_date, ticker)
+        self._looked_up: Dict[str, float] = {}  # ticker -> last lookup time, in memory only
+        self._lock = threading.Lock()
+        self.last_bulk_refresh = 0.0
+        # The file is checked and read on first use, not at import
+        self._load_lock = threading.Lock()
+        self._loaded = path is None
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _load(self) -> None:
+        """Build the indexes from the database; a corrupt file is moved aside (it is only a cache)"""
+        try:
+            conn = self._connect()
+            try:
+                if conn.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+                    raise sqlite3.DatabaseError("quick_check failed")
+                conn.executescript(SCHEMA)
+                rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM earnings").fetchall()
+                meta = conn.execute("SELECT value FROM meta WHERE key = 'last_bulk_refresh'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError as e:
+            backup = f"{self.path}.corrupt-{int(time.time())}"
+            print(f"Earnings calendar at {self.path} is unreadable ({e}); moving it to {backup}")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.path + suffix):
+                    os.replace(self.path + suffix, backup + suffix)
+            return self._load()
+        with self._lock:
+            for row in rows:
+                self._index(dict(zip(COLUMNS, row)))
+        self.last_bulk_refresh = meta[0] if meta else 0.0
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        # Caller holds the lock
+        previous = self._by_ticker.get(entry["ticker"])
+        if previous is not None and previous["earnings_date"]:
+            key = (previous["earnings_date"], entry["ticker"])
+            i = bisect.bisect_left(self._by_date, key)
+            if i < len(self._by_date) and self._by_date[i] == key:
+                del self._by_date[i]
+        self._by_ticker[entry["ticker"]] = entry
+        if entry["earnings_date"]:
+            bisect.insort(self._by_date, (entry["earnings_date"], entry["ticker"]))
+
+    def upsert(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Index and persist entries (one transaction); returns how many were written"""
+        self._ensure_loaded()
+        now = time.time()
+        rows = []
+        with self._lock:
+            for entry in entries:
+                entry = {column: entry.get(column) for column in COLUMNS}
+                entry["ticker"] = entry["ticker"].upper()
+                entry["refreshed_at"] = entry["refreshed_at"] or now
+                self._index(entry)
+                rows.append(tuple(entry[column] for column in COLUMNS))
+        if self.path is not None and rows:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO earnings VALUES ({', '.join('?' * len(COLUMNS))})", rows
+                    )
+            finally:
+                conn.close()
+        return len(rows)
+
+    def get(self, ticker: str) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        with self._lock:
+            return self._by_ticker.get(ticker.upper())
+
+    def is_fresh(self, entry: Optional[Dict[str, Any]], today: Optional[date] = None) -> bool:
+        if entry is None or time.time() - entry["refreshed_at"] > EARNINGS_MAX_AGE:
+            return False
+        # A date that has passed means the next one is now known upstream
+        return entry["earnings_date"] is None or entry["earnings_date"] >= (today or date.today()).isoformat()
+
+    def between(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """Entries reporting from start to end inclusive, ordered by date then ticker"""
+        self._ensure_loaded()
+        with self._lock:
+            lo = bisect.bisect_left(self._by_date, (start.isoformat(), ""))
+            hi = bisect.bisect_left(self._by_date, ((end + timedelta(days=1)).isoformat(), ""))
+            return [self._by_ticker[ticker] for _, ticker in self._by_date[lo:hi]]
+
+    async def lookup(self, ticker: str, fetch: TickerFetch) -> Dict[str, Any]:
+        """The ticker's entry from the index, fetched through `fetch` when missing or stale"""
+        ticker = ticker.upper()
+        with self._lock:
+            self._looked_up[ticker] = time.time()
+        return await self._lookup(ticker, fetch)
+
+    async def _lookup(self, ticker: str, fetch: TickerFetch) -> Dict[str, Any]:
+        entry = self.get(ticker)
+        if self.is_fresh(entry):
+            return entry
+        data = await fetch(ticker)
+        if data is None:
+            # Keep serving what we had when the upstream is unavailable
+            return entry or {"ticker": ticker, "earnings_date": None}
+        fresh = {
+            "ticker": ticker,
+            "earnings_date": parse_date(data.get("next_earnings")),
+            "source": data.get("source"),
+        }
+        self.upsert([fresh])
+        return self.get(ticker)
+
+    def _mark_bulk_refresh(self) -> None:
+        self.last_bulk_refresh = time.time()
+        if self.path is not None:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta VALUES ('last_bulk_refresh', ?)", (self.last_bulk_refresh,)
+                    )
+            finally:
+                conn.close()
+
+    async def refresh(self, fetch: TickerFetch, fmp_api_key: Optional[str] = None,
+                      tickers: Iterable[str] = EARNINGS_UNIVERSE) -> Dict[str, int]:
+        """Bulk refresh: one FMP calendar request, then per-ticker fetches for the rest"""
+        self._ensure_loaded()
+        covered = set()
+        bulk = 0
+        if fmp_api_key:
+            start = date.today()
+            entries = await fetch_fmp_calendar(fmp_api_key, start, start + timedelta(days=EARNINGS_HORIZON_DAYS))
+            if entries is not None:
+                # Only the nearest upcoming report per ticker
+                nearest: Dict[str, Dict[str, Any]] = {}
+                for entry in entries:
+                    current = nearest.get(entry["ticker"])
+                    if current is None or entry["earnings_date"] < current["earnings_date"]:
+                        nearest[entry["ticker"]] = entry
+                bulk = self.upsert(nearest.values())
+                covered = set(nearest)
+
+        # Past bulk pulls leave many names in the index; only the configured
+        # universe and recently looked-up tickers are worth one request each
+        cutoff = time.time() - EARNINGS_RECENT_SECONDS
+        with self._lock:
+            self._looked_up = {t: at for t, at in self._looked_up.items() if at >= cutoff}
+            recent = list(self._looked_up)
+        remaining = [
+            t for t in dict.fromkeys([*tickers, *recent])
+            if t not in covered and not self.is_fresh(self.get(t))
+        ]
+        semaphore = asyncio.Semaphore(EARNINGS_REFRESH_CONCURRENCY)
+
+        async def refresh_one(ticker: str) -> bool:
+            async with semaphore:
+                try:
+                    await self._lookup(ticker, fetch)
+                    return True
+                except Exception as e:
+                    print(f"Error refreshing earnings for {ticker}: {e}")
+                    return False
+
+        refreshed = sum(await asyncio.gather(*(refresh_one(t) for t in remaining)))
+        self._mark_bulk_refresh()
+        return {"bulk": bulk, "per_ticker": refreshed, "entries": len(self._by_ticker)}
+
+    async def refresh_periodically(self, fetch: TickerFetch, fmp_api_key: Optional[str] = None) -> None:
+        """Run the bulk refresh every EARNINGS_REFRESH_SECONDS, starting when the store is due"""
+        self._ensure_loaded()
+        while True:
+            due_in = self.last_bulk_refresh + EARNINGS_REFRESH_SECONDS - time.time()
+            if due_in > 0:
+                await asyncio.sleep(due_in)
+            try:
+                print(f"Refreshed earnings calendar: {await self.refresh(fetch, fmp_api_key)}")
+            except Exception as e:
+                print(f"Error refreshing earnings calendar: {e}")
+                await asyncio.sleep(min(EARNINGS_REFRESH_SECONDS, 300))
+
+    def stats(self) -> Dict[str, Any]:
+        if self.path is not None and os.path.exists(self.path):
+            self._ensure_loaded()
+        with self._lock:
+            return {
+                "tickers": len(self._by_ticker),
+                "dated": len(self._by_date),
+                "last_bulk_refresh": self.last_bulk_refresh or None,
+                "path": self.path,
+            }
+
+async def fetch_fmp_calendar(api_key: str, start: date, end: date) -> Optional[List[Dict[str, Any]]]:
+    """Every earnings report between start and end from one FMP request, None on failure"""
+    breaker = circuit_breakers.get("fmp")
+    if not breaker.allow():
+        print("Skipping FMP earnings calendar: circuit open")
+        return None
+    if not await rate_limiter.acquire("fmp"):
+        print("Skipping FMP earnings calendar: rate limit budget exhausted")
+        breaker.release()
+        return None
+    try:
+        data = await http_client.get_json(
+            "https://financialmodelingprep.com/api/v3/earning_calendar",
+            params={"from": start.isoformat(), "to": end.isoformat(), "apikey": api_key},
+        )
+    except Exception as e:
+        print(f"Error getting FMP earnings calendar: {e}")
+        breaker.record_failure()
+        return None
+    breaker.record_success()
+    if not isinstance(data, list):
+        return None
+
+    entries = []
+    for item in data:
+        earnings_date = parse_date(item.get("date"))
+        if not item.get("symbol") or earnings_date is None:
+            continue
+        entries.append({
+            "ticker": item["symbol"].upper(),
+            "earnings_date": earnings_date,
+            "time": item.get("time"),
+            "eps_estimate": item.get("epsEstimated"),
+            "source": "Financial Modeling Prep",
+        })
+    return entries
+
+earnings_calendar = EarningsCalendar(EARNINGS_STORE_PATH if EARNINGS_STORE_ENABLED else None)
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "refresh":
+        from providers import data_router
+
+        async def run():
+            try:
+                return await earnings_calendar.refresh(data_router.earnings, os.getenv("FMP_API_KEY"))
+            finally:
+                await http_client.shutdown()
+
+        print(asyncio.run(run()))
+    elif command == "stats":
+        print(earnings_calendar.stats())
+    else:
+        print(__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Forecast features
+
+Builds the volatility-forecast feature matrix from (ticker x time) OHLCV
+arrays, the same layout the volatility engine and batch analysis use. Every
+feature is computed for every bar at once. Rolling estimator windows are
+zero-copy sliding views that are fed to estimate_volatility as extra rows.
+This lets training build a full history panel and inference build the last
+row for a whole universe with the same code.
+
+Features (annualized percentages for volatilities, log returns):
+    vol_<estimator>_<n>   realized volatility over the last n bars
+    ret_<n>               log return over the last n bars
+    volume_ratio          log of 5-bar over 63-bar average volume
+    days_to_earnings      calendar days until the next report (NaN if unknown)
+    sentiment             sentiment_score in [0, 1] (NaN if no documents)
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+from coldstart import lazy_import
+from volatility import annualize, estimate_volatility
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+VOL_HORIZONS = (5, 10, 21, 63)
+VOL_ESTIMATORS = ("close_to_close", "parkinson", "yang_zhang")
+RETURN_HORIZONS = (1, 5, 21)
+VOLUME_SHORT, VOLUME_LONG = 5, 63
+
+# Bars needed before the first complete feature row
+LOOKBACK = max(*VOL_HORIZONS, *RETURN_HORIZONS, VOLUME_LONG) + 1
+# Window elements per estimate_volatility call; bounds memory for long panels
+WINDOW_CHUNK = 2_000_000
+
+FEATURE_NAMES = (
+    *(f"vol_{estimator}_{n}" for estimator in VOL_ESTIMATORS for n in VOL_HORIZONS),
+    *(f"ret_{n}" for n in RETURN_HORIZONS),
+    "volume_ratio",
+    "days_to_earnings",
+    "sentiment",
+)
+
+def rolling_volatility(open_, high, low, close, window: int,
+                       estimators: Sequence[str] = VOL_ESTIMATORS) -> Dict[str, np.ndarray]:
+    """Annualized volatility over the `window` bars ending at each bar, (ticker x time) per estimator"""
+    arrays = [np.atleast_2d(np.asarray(a, dtype=float)) for a in (open_, high, low, close)]
+    tickers, steps = arrays[0].shape
+    result = {name: np.full((tickers, steps), np.nan) for name in estimators}
+    if steps < window:
+        return result
+    # (ticker, window start, bar) views; each window becomes one row for the engine
+    views = [np.lib.stride_tricks.sliding_window_view(a, window, axis=1) for a in arrays]
+    per_ticker = steps - window + 1
+    rows = max(1, WINDOW_CHUNK // (per_ticker * window))
+    for start in range(0, tickers, rows):
+        chunk = [v[start:start + rows].reshape(-1, window) for v in views]
+        daily = estimate_volatility(*chunk, estimators=estimators, min_bars=max(2, window // 2))
+        for name, values in daily.items():
+            result[name][start:start + rows, window - 1:] = annualize(values).reshape(-1, per_ticker)
+    return result
+
+def _trailing_mean(values: np.ndarray, n: int) -> np.ndarray:
+    """Mean of the available values in the n bars ending at each bar"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= n:
+        windows = np.lib.stride_tricks.sliding_window_view(values, n, axis=1)
+        counts = np.sum(~np.isnan(windows), axis=-1)
+        out[:, n - 1:] = np.where(counts > 0, np.nansum(windows, axis=-1) / np.maximum(counts, 1), np.nan)
+    return out
+
+def days_until(dates: np.ndarray, events: Sequence[str]) -> np.ndarray:
+    """Calendar days from each date (datetime64[D]) to the next event on or after it, NaN if none"""
+    if not len(events):
+        return np.full(len(dates), np.nan)
+    events = np.sort(np.array(events, dtype="datetime64[D]"))
+    index = np.searchsorted(events, dates)
+    found = index < len(events)
+    days = np.full(len(dates), np.nan)
+    days[found] = (events[index[found]] - dates[found]).astype(float)
+    return days
+
+def build_features(open_, high, low, close, volume, dates,
+                   earnings_dates: Optional[List[Sequence[str]]] = None,
+                   sentiment: Optional[np.ndarray] = None) -> np.ndarray:
+    """(ticker x time x feature) matrix in FEATURE_NAMES order.
+
+    ``dates`` is one calendar shared by every ticker or a (ticker x time)
+    array; ``earnings_dates`` holds each ticker's known report dates;
+    ``sentiment`` is a (ticker x time) array or a per-ticker vector applied
+    to every bar.
+    Rows before LOOKBACK bars of history are partly NaN.
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=float))
+    volume = np.atleast_2d(np.asarray(volume, dtype=float))
+    tickers, steps = close.shape
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    columns: List[np.ndarray] = []
+
+    by_window = {n: rolling_volatility(open_, high, low, close, n) for n in VOL_HORIZONS}
+    for estimator in VOL_ESTIMATORS:
+        for n in VOL_HORIZONS:
+            columns.append(by_window[n][estimator])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_close = np.log(close)
+        for n in RETURN_HORIZONS:
+            ret = np.full(close.shape, np.nan)
+            ret[:, n:] = log_close[:, n:] - log_close[:, :-n]
+            columns.append(ret)
+        columns.append(np.log(_trailing_mean(volume, VOLUME_SHORT) / _trailing_mean(volume, VOLUME_LONG)))
+
+    if earnings_dates is None:
+        columns.append(np.full(close.shape, np.nan))
+    else:
+        columns.append(np.stack([
+            days_until(dates if dates.ndim == 1 else dates[i], events) for i, events in enumerate(earnings_dates)
+        ]))
+
+    if sentiment is None:
+        columns.append(np.full(close.shape, np.nan))
+    else:
+        sentiment = np.asarray(sentiment, dtype=float)
+        columns.append(np.broadcast_to(sentiment[:, None] if sentiment.ndim == 1 else sentiment, close.shape))
+
+    return np.stack(columns, axis=-1)
+
+def forward_volatility(open_, high, low, close, horizon: int) -> np.ndarray:
+    """Realized close-to-close volatility over the `horizon` bars after each bar (the training target)"""
+    close = np.atleast_2d(np.asarray(close, dtype=float))
+    # A window of horizon + 1 closes ending at t + horizon covers the returns t+1 .. t+horizon
+    trailing = rolling_volatility(open_, high, low, close, horizon + 1, ("close_to_close",))["close_to_close"]
+    target = np.full(close.shape, np.nan)
+    target[:, :-horizon] = trailing[:, horizon:]
+    return target
+
+def panel_arrays(frames: Dict[str, pd.DataFrame], tickers: Sequence[str]):
+    """(open, high, low, close, volume, dates) from per-ticker OHLCV frames aligned on a common calendar"""
+    fields = ("Open", "High", "Low", "Close", "Volume")
+    panel = {
+        field: pd.concat({t: frames[t][field] for t in tickers}, axis=1).sort_index()
+        for field in fields
+    }
+    dates = panel["Close"].index.to_numpy(dtype="datetime64[D]")
+    return (*(panel[field].to_numpy(dtype=float).T for field in fields), dates)
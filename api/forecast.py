@@ -0,0 +1,350 @@
+"""
+Volatility forecasting
+
+Predicts realized volatility over the next FORECAST_HORIZON trading days from
+the features in features.py. Models are trained offline by this module's CLI
+and written as versioned artifacts:
+
+    FORECAST_MODEL_DIR/<version>/model.joblib    fitted estimator (uncompressed)
+    FORECAST_MODEL_DIR/<version>/metadata.json   features, horizon, metrics
+    FORECAST_MODEL_DIR/LATEST                    version served by default
+
+The API loads one model per process on first use, with joblib memory-mapping
+the estimator's arrays so workers share pages instead of copies. Concurrent
+requests are micro-batched into a single predict call, and the batch
+endpoints predict a whole universe in one call.
+
+Models predict log volatility, so errors are relative. Historical earnings
+dates are approximated by stepping back in quarters from the calendar's next
+report. Training rows have no sentiment yet, and tree models treat it as
+missing.
+
+Usage:
+    python forecast.py train AAPL,MSFT,NVDA [--days 1095] [--model gbm|ridge|xgboost]
+    python forecast.py info
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from coldstart import lazy_import
+from features import FEATURE_NAMES, LOOKBACK, VOL_HORIZONS, build_features, forward_volatility, panel_arrays
+from model_registry import ModelNotFound, latest_version, new_version, set_latest
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+joblib = lazy_import("joblib")
+
+FORECAST_MODEL_DIR = os.getenv(
+    "FORECAST_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "forecast")
+)
+# Pin a version instead of following LATEST
+FORECAST_MODEL_VERSION = os.getenv("FORECAST_MODEL_VERSION")
+FORECAST_HORIZON = int(os.getenv("FORECAST_HORIZON", "21"))
+# Calendar days of history fetched per ticker for inference (LOOKBACK bars plus holidays)
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "130"))
+# Tickers whose inputs are fetched at once by the batch endpoints and training CLI
+FORECAST_CONCURRENCY = int(os.getenv("FORECAST_CONCURRENCY", "8"))
+FORECAST_BATCH_WINDOW_MS = float(os.getenv("FORECAST_BATCH_WINDOW_MS", "5"))
+FORECAST_MAX_BATCH = int(os.getenv("FORECAST_MAX_BATCH", "4096"))
+
+MODEL_TYPES = ("gbm", "ridge", "xgboost")
+# Share of the most recent dates held out to report validation metrics
+VALIDATION_SHARE = 0.2
+QUARTER_DAYS = 91
+
+class ForecastModel:
+    """A loaded artifact: estimator plus the metadata it was trained with"""
+
+    def __init__(self, estimator: Any, metadata: Dict[str, Any]):
+        if tuple(metadata["features"]) != FEATURE_NAMES:
+            raise ValueError(
+                f"Model {metadata['version']} was trained on different features; retrain it"
+            )
+        self.estimator = estimator
+        self.metadata = metadata
+        self.version = metadata["version"]
+        self.horizon = metadata["horizon"]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Annualized volatility (percent) for each feature row"""
+        if len(features) == 0:
+            return np.empty(0)
+        return np.exp(self.estimator.predict(np.asarray(features, dtype=float)))
+
+def load_model(version: Optional[str] = None, directory: str = FORECAST_MODEL_DIR) -> ForecastModel:
+    version = version or latest_version(directory)
+    if version is None:
+        raise ModelNotFound(f"No forecast model in {directory}; train one with python forecast.py train")
+    path = os.path.join(directory, version)
+    if not os.path.isdir(path):
+        raise ModelNotFound(f"Forecast model version {version} not found in {directory}")
+    with open(os.path.join(path, "metadata.json"), encoding="utf-8") as f:
+        metadata = json.load(f)
+    # Arrays inside the estimator are mapped read-only rather than copied into each process
+    return ForecastModel(joblib.load(os.path.join(path, "model.joblib"), mmap_mode="r"), metadata)
+
+_model: Optional[ForecastModel] = None
+_model_lock = threading.Lock()
+
+def get_forecast_model() -> ForecastModel:
+    """The process-wide forecast model, loaded on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model(FORECAST_MODEL_VERSION)
+    return _model
+
+class ForecastBatcher:
+    """Collects feature rows from concurrent requests and predicts them in one call"""
+
+    def __init__(self, window_ms: float = FORECAST_BATCH_WINDOW_MS, max_batch: int = FORECAST_MAX_BATCH):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        return self._queue
+
+    async def predict(self, features: np.ndarray) -> np.ndarray:
+        """Forecasts for a (rows x features) matrix, predicted with the next micro-batch"""
+        future = asyncio.get_running_loop().create_future()
+        await self._ensure_worker().put((features, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.window
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            try:
+                stacked = np.vstack([features for features, _ in pending])
+                predictions = await asyncio.to_thread(lambda: get_forecast_model().predict(stacked))
+                self.batches += 1
+                self.rows += len(stacked)
+                offset = 0
+                for features, future in pending:
+                    if not future.done():
+                        future.set_result(predictions[offset:offset + len(features)])
+                    offset += len(features)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        model = _model
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "model_version": model.version if model is not None else None,
+        }
+
+forecast_batcher = ForecastBatcher()
+
+def latest_features(frames: Sequence[pd.DataFrame], next_earnings: Sequence[Optional[str]],
+                    sentiment: Sequence[Optional[float]]) -> np.ndarray:
+    """One feature row per ticker from its most recent LOOKBACK bars.
+
+    Each ticker keeps its own bar dates, so days_to_earnings is counted from
+    its last bar exactly as in training.
+    """
+    if not frames:
+        return np.empty((0, len(FEATURE_NAMES)))
+    fields = ("Open", "High", "Low", "Close", "Volume")
+    arrays = {field: np.full((len(frames), LOOKBACK), np.nan) for field in fields}
+    dates = np.full((len(frames), LOOKBACK), np.datetime64("NaT"), dtype="datetime64[D]")
+    for i, frame in enumerate(frames):
+        tail = frame.tail(LOOKBACK)
+        for field in fields:
+            arrays[field][i, LOOKBACK - len(tail):] = tail[field].to_numpy(dtype=float)
+        dates[i, LOOKBACK - len(tail):] = tail.index.to_numpy(dtype="datetime64[D]")
+    return build_features(
+        *(arrays[field] for field in fields), dates,
+        earnings_dates=[[report] if report else [] for report in next_earnings],
+        sentiment=np.array([np.nan if s is None else s for s in sentiment], dtype=float),
+    )[:, -1, :]
+
+def quarterly_dates(next_report: Optional[str], start: date, end: date) -> List[str]:
+    """Report dates from `start` to one quarter past `end`, stepping back in quarters from the next report"""
+    if next_report is None:
+        return []
+    anchor = date.fromisoformat(next_report)
+    while anchor > end + timedelta(days=QUARTER_DAYS):
+        anchor -= timedelta(days=QUARTER_DAYS)
+    dates = []
+    while anchor >= start:
+        dates.append(anchor.isoformat())
+        anchor -= timedelta(days=QUARTER_DAYS)
+    return dates
+
+def training_set(frames: Dict[str, pd.DataFrame], earnings: Dict[str, Optional[str]],
+                 horizon: int = FORECAST_HORIZON):
+    """(X, log target, dates) rows for every ticker and bar with a full feature window and a known target"""
+    tickers = list(frames)
+    open_, high, low, close, volume, dates = panel_arrays(frames, tickers)
+    start, end = dates[0].astype(date), dates[-1].astype(date)
+    features = build_features(
+        open_, high, low, close, volume, dates,
+        earnings_dates=[quarterly_dates(earnings.get(t), start, end) for t in tickers],
+    )
+    target = forward_volatility(open_, high, low, close, horizon)
+    # Rows need the longest volatility window; other features may be missing
+    anchor = FEATURE_NAMES.index(f"vol_close_to_close_{max(VOL_HORIZONS)}")
+    usable = np.isfinite(target) & (target > 0) & np.isfinite(features[..., anchor])
+    row_dates = np.broadcast_to(dates, target.shape)
+    return features[usable], np.log(target[usable]), row_dates[usable]
+
+def make_estimator(kind: str):
+    if kind == "gbm":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05, l2_regularization=1.0)
+    if kind == "ridge":
+        from sklearn.impute import SimpleImputer
+        from sklearn.linear_model import Ridge
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+        return make_pipeline(
+            SimpleImputer(strategy="median", keep_empty_features=True), StandardScaler(), Ridge(alpha=1.0)
+        )
+    if kind == "xgboost":
+        if importlib.util.find_spec("xgboost") is None:
+            raise ValueError("xgboost is not installed")
+        from xgboost import XGBRegressor
+        return XGBRegressor(n_estimators=400, max_depth=4, learning_rate=0.05, subsample=0.8)
+    raise ValueError(f"Unknown model type: {kind} (expected one of {', '.join(MODEL_TYPES)})")
+
+def _rmse(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.sqrt(np.mean((a - b) ** 2)))
+
+def train(frames: Dict[str, pd.DataFrame], earnings: Dict[str, Optional[str]], kind: str = "gbm",
+          horizon: int = FORECAST_HORIZON, directory: str = FORECAST_MODEL_DIR) -> Dict[str, Any]:
+    """Fit, validate on the most recent dates, refit on everything and write a new version"""
+    X, y, row_dates = training_set(frames, earnings, horizon)
+    if len(y) < 100:
+        raise ValueError(f"Only {len(y)} training rows; fetch more history or tickers")
+    # Features never observed in training (e.g. sentiment before a corpus exists) become a
+    # constant, which every model type accepts and none can split on
+    X[:, np.isnan(X).all(axis=0)] = 0.0
+
+    # Hold out the last dates, leaving a horizon-long gap so targets do not overlap
+    split = np.quantile(row_dates.astype("int64"), 1 - VALIDATION_SHARE).astype("datetime64[D]")
+    train_rows = row_dates < split - np.timedelta64(int(horizon * 7 / 5) + 1, "D")
+    valid_rows = row_dates >= split
+    estimator = make_estimator(kind)
+    estimator.fit(X[train_rows], y[train_rows])
+    predicted = estimator.predict(X[valid_rows])
+    # Baseline: next month's volatility equals the last month's
+    baseline = np.log(np.clip(X[valid_rows, FEATURE_NAMES.index("vol_close_to_close_21")], 1e-6, None))
+    metrics = {
+        "validation_rows": int(valid_rows.sum()),
+        "rmse_log": round(_rmse(predicted, y[valid_rows]), 4),
+        "mae_log": round(float(np.mean(np.abs(predicted - y[valid_rows]))), 4),
+        "baseline_rmse_log": round(_rmse(np.where(np.isfinite(baseline), baseline, y[valid_rows].mean()),
+                                         y[valid_rows]), 4),
+    }
+
+    estimator = make_estimator(kind)
+    estimator.fit(X, y)
+
+    version = new_version()
+    path = os.path.join(directory, version)
+    os.makedirs(path, exist_ok=True)
+    # Uncompressed so load_model can memory-map the arrays
+    joblib.dump(estimator, os.path.join(path, "model.joblib"))
+    metadata = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "model": kind,
+        "horizon": horizon,
+        "features": list(FEATURE_NAMES),
+        "target": "log annualized close-to-close volatility (percent) over the next horizon bars",
+        "tickers": sorted(frames),
+        "rows": int(len(y)),
+        "train_end": str(row_dates.max()),
+        "metrics": metrics,
+    }
+    with open(os.path.join(path, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    set_latest(directory, version)
+    return metadata
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["info"]:
+        try:
+            print(json.dumps(load_model(FORECAST_MODEL_VERSION).metadata, indent=2))
+        except ModelNotFound as e:
+            print(e)
+        return
+    if args[:1] != ["train"] or len(args) < 2:
+        print(__doc__)
+        return
+
+    from batch import parse_tickers
+    from earnings_calendar import earnings_calendar
+    from providers import data_router
+    import http_client
+
+    tickers = parse_tickers([args[1]])
+    days = int(args[args.index("--days") + 1]) if "--days" in args else 3 * 365
+    kind = args[args.index("--model") + 1] if "--model" in args else "gbm"
+
+    async def fetch():
+        semaphore = asyncio.Semaphore(FORECAST_CONCURRENCY)
+
+        async def one(ticker):
+            async with semaphore:
+                hist, entry = await asyncio.gather(
+                    data_router.history(ticker, days),
+                    earnings_calendar.lookup(ticker, data_router.earnings),
+                )
+                return ticker, hist, entry.get("earnings_date")
+
+        try:
+            return await asyncio.gather(*(one(t) for t in tickers))
+        finally:
+            await http_client.shutdown()
+
+    start = time.perf_counter()
+    results = asyncio.run(fetch())
+    frames = {t: hist for t, hist, _ in results if hist is not None and len(hist) > LOOKBACK + FORECAST_HORIZON}
+    earnings = {t: next_report for t, _, next_report in results}
+    skipped = sorted(set(tickers) - set(frames))
+    if skipped:
+        print(f"Skipping tickers without enough history: {', '.join(skipped)}")
+    if not frames:
+        return
+    metadata = train(frames, earnings, kind)
+    print(f"Trained {metadata['model']} model {metadata['version']} on {metadata['rows']} rows "
+          f"in {time.perf_counter() - start:.1f}s: {metadata['metrics']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+HTTP caching headers
+
+ASGI middleware that lets the Netlify/Vercel edge absorb repeat traffic. For
+successful GET JSON responses on the data endpoints it adds:
+
+- a weak ETag computed from the body with every ``timestamp`` field removed,
+  so responses that differ only in when they were generated match
+- a 304 Not Modified answer when the request's If-None-Match matches
+- Cache-Control / CDN-Cache-Control with s-maxage and stale-while-revalidate
+  chosen per endpoint and per market session (data goes stale quickly while
+  the market is open and barely changes once it has closed)
+
+Failed analyses (``"success": false``) are marked no-store. Streaming
+responses (NDJSON, SSE) pass through untouched. HEAD requests are answered
+by running the GET and dropping the body, so they carry the same ETag.
+"""
+import hashlib
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from market_hours import market_session
+from serialization import dumps, loads
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "1") != "0"
+
+# (browser max-age, edge s-maxage, stale-while-revalidate) in seconds
+Policy = Tuple[int, int, int]
+
+CACHE_POLICIES: Dict[str, Dict[str, Policy]] = {
+    "/api/analyze": {
+        "regular": (0, 30, 30),
+        "pre": (0, 60, 120),
+        "post": (0, 60, 120),
+        "closed": (60, 900, 3600),
+    },
+    "/api/surface": {
+        "regular": (0, 60, 60),
+        "pre": (0, 300, 600),
+        "post": (0, 300, 600),
+        "closed": (60, 900, 3600),
+    },
+    "/api/options": {
+        "regular": (0, 60, 60),
+        "pre": (0, 300, 600),
+        "post": (0, 300, 600),
+        "closed": (60, 900, 3600),
+    },
+    "/api/forecast": {
+        "regular": (0, 300, 600),
+        "pre": (0, 300, 600),
+        "post": (0, 900, 3600),
+        "closed": (300, 3600, 3600),
+    },
+    "/api/earnings": {
+        "regular": (300, 3600, 86400),
+        "pre": (300, 3600, 86400),
+        "post": (300, 3600, 86400),
+        "closed": (300, 21600, 86400),
+    },
+    "/api/sentiment": {
+        "regular": (60, 300, 600),
+        "pre": (60, 300, 600),
+        "post": (60, 300, 600),
+        "closed": (300, 3600, 3600),
+    },
+}
+
+def policy_for(path: str, session: Optional[str] = None) -> Optional[Policy]:
+    for prefix, policies in CACHE_POLICIES.items():
+        if path == prefix or path.startswith(prefix + "/"):
+            return policies[session or market_session()]
+    return None
+
+def cache_control(policy: Policy) -> str:
+    max_age, s_maxage, swr = policy
+    return f"public, max-age={max_age}, s-maxage={s_maxage}, stale-while-revalidate={swr}"
+
+def cdn_cache_control(policy: Policy) -> str:
+    # CDN-Cache-Control is only read by the edge, so max-age is the edge TTL
+    _, s_maxage, swr = policy
+    return f"public, max-age={s_maxage}, stale-while-revalidate={swr}"
+
+def _without_timestamps(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _without_timestamps(v) for k, v in value.items() if k != "timestamp"}
+    if isinstance(value, list):
+        return [_without_timestamps(v) for v in value]
+    return value
+
+def compute_etag(payload: Any) -> str:
+    """Weak ETag of a decoded JSON payload, ignoring timestamp fields"""
+    digest = hashlib.sha1(dumps(_without_timestamps(payload)).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def merge_vary(headers: List[Tuple[bytes, bytes]], field: bytes) -> List[Tuple[bytes, bytes]]:
+    """headers with `field` added to a single Vary header, keeping any fields already listed"""
+    fields: List[bytes] = []
+    for key, value in headers:
+        if key.lower() == b"vary":
+            fields += [f.strip() for f in value.split(b",") if f.strip()]
+    if b"*" in fields:
+        fields = [b"*"]
+    elif field.lower() not in {f.lower() for f in fields}:
+        fields.append(field)
+    return [(k, v) for k, v in headers if k.lower() != b"vary"] + [(b"vary", b", ".join(fields))]
+
+class HTTPCacheMiddleware:
+    """Adds ETag and Cache-Control headers and answers conditional GETs"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or not HTTP_CACHE_ENABLED:
+            return await self.app(scope, receive, send)
+        policy = policy_for(scope["path"])
+        if policy is None:
+            return await self.app(scope, receive, send)
+
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        # The ETag is a hash of the GET body, so HEAD runs the GET and drops the body
+        head = scope["method"] == "HEAD"
+        if head:
+            scope = {**scope, "method": "GET"}
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if message["status"] != 200 or not content_type.startswith(b"application/json"):
+                    passthrough = True
+                    return await send(message)
+                start.update(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                if head and message["type"] == "http.response.body":
+                    message = {**message, "body": b""}
+                return await send(message)
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._finish(start, b"".join(chunks), policy, request_headers, send, head)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _finish(self, start, body: bytes, policy: Policy, request_headers: Dict[str, str], send,
+                      head: bool = False) -> None:
+        try:
+            payload = loads(body)
+        except ValueError:
+            payload = None
+
+        headers = [
+            (k, v) for k, v in start.get("headers", [])
+            if k.lower() not in (b"cache-control", b"cdn-cache-control", b"etag")
+        ]
+        if isinstance(payload, dict) and payload.get("success") is False:
+            headers.append((b"cache-control", b"no-store"))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": b"" if head else body})
+            return
+
+        etag = compute_etag(payload) if payload is not None else f'W/"{hashlib.sha1(body).hexdigest()[:32]}"'
+        headers += [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", cache_control(policy).encode("latin-1")),
+            (b"cdn-cache-control", cdn_cache_control(policy).encode("latin-1")),
+        ]
+        headers = merge_vary(headers, b"Accept")
+
+        if etag_matches(request_headers.get("if-none-match", ""), etag):
+            not_modified = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"content-type")]
+            await send({"type": "http.response.start", "status": 304, "headers": not_modified})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if head else body})
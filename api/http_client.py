@@ -0,0 +1,87 @@
+"""
+Shared HTTP client
+
+One pooled, keep-alive ``httpx.AsyncClient`` for every vendor REST call
+(Polygon.io, FMP). The client is opened on app startup and closed on
+shutdown; transient failures are retried with exponential backoff.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import os
+from typing import Any, Dict, Optional
+
+from coldstart import lazy_import
+
+httpx = lazy_import("httpx")
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.25"))
+# HTTP/2 is negotiated per host and needs the optional h2 package
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        headers={"User-Agent": "VOLA-Engine/1.0"},
+    )
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client, created on first use if startup has not run"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+async def startup() -> None:
+    get_client()
+
+async def shutdown() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def get_json(url: str, params: Optional[Dict[str, Any]] = None,
+                   retries: int = HTTP_RETRIES) -> Any:
+    """GET url and return the decoded JSON body.
+
+    Connection errors, timeouts and retryable status codes (429, 5xx) are
+    retried with exponential backoff; the last error is raised once retries
+    run out. Any other non-200 status (a rejected key, a moved endpoint, a
+    204 without a body) is raised at once, so callers record it against the
+    provider's circuit breaker instead of mistaking it for an empty answer.
+    """
+    client = get_client()
+    for attempt in range(retries + 1):
+        try:
+            response = await client.get(url, params=params)
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                # raise_for_status() lets other 2xx codes through, and they carry no JSON to return
+                raise httpx.HTTPStatusError(
+                    f"Unexpected status {response.status_code} for {url}",
+                    request=response.request, response=response,
+                )
+        await asyncio.sleep(HTTP_BACKOFF * (2 ** attempt))
+    return None
@@ -20,7 +20,8 @@ except ImportError as e:
 
 from fastapi import HTTPException
 from datetime import datetime
-import random
+
+from sentiment import analyze_sentiment
 
 # Add sentiment analysis endpoint
 @app.get("/api/sentiment/{ticker}")
@@ -29,34 +30,7 @@ async def get_sentiment_analysis(ticker: str):
     ticker = ticker.upper()
     
     try:
-        # For now, return mock sentiment data
-        # In a real implementation, you would integrate with a sentiment analysis service
-        # like Google Cloud Natural Language API, AWS Comprehend, or a custom NLP model
-        
-        # Mock sentiment data based on stock performance
-        sentiment_options = [
-            {
-                "overall_sentiment": "Positive",
-                "sentiment_score": 0.75,
-                "key_phrases": ["strong performance", "growth potential", "market leader"],
-                "risk_indicators": []
-            },
-            {
-                "overall_sentiment": "Neutral",
-                "sentiment_score": 0.50,
-                "key_phrases": ["stable performance", "market average", "steady growth"],
-                "risk_indicators": ["moderate volatility"]
-            },
-            {
-                "overall_sentiment": "Negative",
-                "sentiment_score": 0.25,
-                "key_phrases": ["declining performance", "market concerns", "volatility"],
-                "risk_indicators": ["high volatility", "earnings risk"]
-            }
-        ]
-        
-        # Randomly select sentiment (in real implementation, this would be based on actual analysis)
-        sentiment_data = random.choice(sentiment_options)
+        sentiment_data = await analyze_sentiment(ticker)
         
         return {
             "success": True,
@@ -65,6 +39,8 @@ async def get_sentiment_analysis(ticker: str):
             "sentiment_score": sentiment_data["sentiment_score"],
             "key_phrases": sentiment_data["key_phrases"],
             "risk_indicators": sentiment_data["risk_indicators"],
+            "document_count": sentiment_data["document_count"],
+            "story_count": sentiment_data["story_count"],
             "timestamp": datetime.now().isoformat()
         }
         
@@ -77,6 +53,8 @@ async def get_sentiment_analysis(ticker: str):
             "sentiment_score": 0.0,
             "key_phrases": [],
             "risk_indicators": [],
+            "document_count": 0,
+            "story_count": 0,
             "timestamp": datetime.now().isoformat()
         }
 
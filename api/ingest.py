@@ -0,0 +1,313 @@
+"""
+Document ingestion
+
+Reads news articles, earnings-call transcripts and filings from a directory
+or an archive (.zip, .tar, .tar.gz, .tgz) and writes them to the corpus
+(corpus.py). The pipeline streams end to end:
+
+- Sources are read one at a time by a generator. Tar archives are read in
+  stream mode, and members are never extracted to disk.
+- Documents are sent to a process pool in bounded batches. At most two
+  batches are in flight, so memory does not grow with the input size.
+- Each batch is checked against the corpus before parsing. Files whose raw
+  hash is already indexed, or was recorded as too short or untagged by an
+  earlier run, are skipped, so re-runs only parse new documents. Untagged
+  files are retried when --ticker is given, and --retry-skipped retries
+  every recorded file (after changing INGEST_TICKERS, say).
+
+Workers extract text with BeautifulSoup (HTML) or decode it (plain text),
+normalize it, and tag it with a ticker and a timestamp. The ticker comes
+from, in order:
+- a "Ticker:"/"Symbol:" header
+- a path segment naming one of INGEST_TICKERS (AAPL/..., AAPL_2024-01-05.html);
+  path segments are not used when INGEST_TICKERS is unset
+- an exchange mention such as "(NASDAQ: AAPL)"
+- the most frequent $cashtag
+
+The timestamp comes from, in order:
+- HTML publication meta tags or <time>
+- a "Date:" header
+- a date in the file name
+- the file's modification time
+
+Usage:
+    python ingest.py PATH [--workers N] [--ticker AAPL] [--retry-skipped]
+"""
+import hashlib
+import os
+import re
+import sys
+import tarfile
+import time
+import unicodedata
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AbstractSet, Any, Dict, Iterator, List, Optional, Tuple
+
+from corpus import Corpus, get_corpus
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+# Larger files are skipped; documents shorter than INGEST_MIN_CHARS after cleanup too
+INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", str(20 * 1024 * 1024)))
+INGEST_MIN_CHARS = int(os.getenv("INGEST_MIN_CHARS", "40"))
+# Tickers a path segment may name; upper-case folders like NEWS or Q3 are not tickers
+INGEST_TICKERS = frozenset(t.strip().upper() for t in os.getenv("INGEST_TICKERS", "").split(",") if t.strip())
+
+HTML_EXTENSIONS = (".html", ".htm", ".xhtml")
+TEXT_EXTENSIONS = (".txt", ".md")
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Elements whose text is never article content
+BOILERPLATE_TAGS = ("script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg")
+DATE_META = (
+    "article:published_time", "og:published_time", "pubdate", "publishdate", "date",
+    "dc.date", "dcterms.created", "parsely-pub-date", "sailthru.date",
+)
+
+_HEADER_TICKER = re.compile(r"^\s*(?:ticker|symbol)s?\s*:\s*\$?([A-Za-z][A-Za-z.\-]{0,6})\b", re.I | re.M)
+_HEADER_DATE = re.compile(r"^\s*(?:date|published|posted)\s*:\s*(.+?)\s*$", re.I | re.M)
+_PATH_TICKER = re.compile(r"^([A-Z]{1,5}(?:[.\-][A-Z])?)(?:[_\-\s].*)?$")
+_EXCHANGE_TICKER = re.compile(
+    r"\((?:NASDAQ|NYSE|NYSE American|NYSE Arca|AMEX|OTC|OTCQX|Nasdaq(?:GS|GM|CM)?)\s*:\s*([A-Z][A-Z.]{0,6})\)"
+)
+_CASHTAG = re.compile(r"\$([A-Z]{1,5})\b")
+_NAME_DATE = re.compile(r"((?:19|20)\d{2})[-_]?(0[1-9]|1[0-2])[-_]?(0[1-9]|[12]\d|3[01])")
+_TRANSCRIPT = re.compile(r"transcript|earnings call|conference call", re.I)
+_FILING = re.compile(r"\b(?:10-K|10-Q|8-K|S-1|20-F|6-K|DEF 14A)\b")
+_SPACES = re.compile(r"[ \t\f\v]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%b. %d, %Y", "%d %B %Y", "%Y%m%d", "%m/%d/%Y")
+
+# (name, modification time, raw bytes)
+Source = Tuple[str, float, bytes]
+
+def is_archive(path: str) -> bool:
+    return os.path.isfile(path) and path.lower().endswith(ARCHIVE_SUFFIXES)
+
+def _wanted(name: str) -> bool:
+    base = os.path.basename(name)
+    return not base.startswith(".") and base.lower().endswith(HTML_EXTENSIONS + TEXT_EXTENSIONS)
+
+def iter_sources(path: str) -> Iterator[Source]:
+    """Documents under a directory or inside an archive, read one at a time"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file in sorted(files):
+                full = os.path.join(root, file)
+                if _wanted(file) and os.path.getsize(full) <= INGEST_MAX_BYTES:
+                    with open(full, "rb") as f:
+                        yield os.path.relpath(full, path), os.path.getmtime(full), f.read()
+    elif path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _wanted(info.filename) and info.file_size <= INGEST_MAX_BYTES:
+                    yield info.filename, time.mktime(info.date_time + (0, 0, -1)), archive.read(info)
+    elif is_archive(path):
+        # Stream mode: members are read in order without seeking or an index
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if member.isfile() and _wanted(member.name) and member.size <= INGEST_MAX_BYTES:
+                    yield member.name, float(member.mtime), archive.extractfile(member).read()
+    elif os.path.isfile(path) and _wanted(path):
+        with open(path, "rb") as f:
+            yield os.path.basename(path), os.path.getmtime(path), f.read()
+    else:
+        raise ValueError(f"Not a directory, archive or document: {path}")
+
+def normalize_text(text: str) -> str:
+    """NFKC-normalized text with collapsed whitespace and at most one blank line in a row"""
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = (_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def _html_text(raw: bytes) -> Tuple[str, Optional[str], Optional[datetime]]:
+    """(body text, title, published time) of an HTML document"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(raw, "html.parser")
+    title = soup.title.get_text(" ", strip=True) if soup.title else None
+    published = None
+    for meta in soup.find_all("meta"):
+        key = (meta.get("property") or meta.get("name") or meta.get("itemprop") or "").lower()
+        if key in DATE_META and meta.get("content"):
+            published = parse_timestamp(meta["content"])
+            if published is not None:
+                break
+    if published is None:
+        tag = soup.find("time", attrs={"datetime": True})
+        if tag is not None:
+            published = parse_timestamp(tag["datetime"])
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    body = soup.find("article") or soup.body or soup
+    return body.get_text("\n"), title, published
+
+def find_ticker(name: str, text: str, known: AbstractSet[str] = INGEST_TICKERS) -> Optional[str]:
+    head = text[:2000]
+    match = _HEADER_TICKER.search(head)
+    if match:
+        return match.group(1).upper()
+    parts = name.replace("\\", "/").split("/")
+    for part in reversed(parts[:-1] + [os.path.splitext(parts[-1])[0]]):
+        match = _PATH_TICKER.match(part)
+        if match and match.group(1) in known:
+            return match.group(1)
+    match = _EXCHANGE_TICKER.search(text)
+    if match:
+        return match.group(1)
+    cashtags = Counter(_CASHTAG.findall(text))
+    if cashtags:
+        return cashtags.most_common(1)[0][0]
+    return None
+
+def classify(name: str, title: Optional[str], text: str) -> str:
+    label = f"{name} {title or ''}"
+    if _TRANSCRIPT.search(label) or "\nOperator:" in text[:5000] or text.startswith("Operator:"):
+        return "transcript"
+    if _FILING.search(label) or "SECURITIES AND EXCHANGE COMMISSION" in text[:3000]:
+        return "filing"
+    return "news"
+
+def parse_document(item: Tuple[str, float, bytes, str, Optional[str]]) -> Dict[str, Any]:
+    """Worker: extract, normalize and tag one document. Runs in the process pool."""
+    name, mtime, raw, raw_hash, default_ticker = item
+    try:
+        title = published = None
+        if name.lower().endswith(HTML_EXTENSIONS):
+            text, title, published = _html_text(raw)
+        else:
+            text = raw.decode("utf-8", errors="replace")
+        text = normalize_text(text)
+        if len(text) < INGEST_MIN_CHARS:
+            return {"status": "empty", "source": name, "raw_hash": raw_hash}
+
+        ticker = default_ticker or find_ticker(name, text)
+        if ticker is None:
+            return {"status": "untagged", "source": name, "raw_hash": raw_hash}
+
+        if published is None:
+            match = _HEADER_DATE.search(text[:2000])
+            published = parse_timestamp(match.group(1)) if match else None
+        if published is None:
+            match = _NAME_DATE.search(os.path.basename(name))
+            published = datetime(*map(int, match.groups())) if match else None
+        if published is None:
+            published = datetime.fromtimestamp(mtime, timezone.utc)
+        if title is None:
+            title = text.split("\n", 1)[0][:200]
+
+        return {
+            "status": "ok",
+            "ticker": ticker,
+            "date": published.date().isoformat(),
+            "published_at": published.isoformat(),
+            "kind": classify(name, title, text),
+            "title": title,
+            "source": name,
+            "raw_hash": raw_hash,
+            "content_hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            "text": text,
+        }
+    except Exception as e:
+        return {"status": "failed", "source": name, "error": str(e)}
+
+def _batches(sources: Iterator[Source], size: int) -> Iterator[List[Source]]:
+    batch: List[Source] = []
+    for source in sources:
+        batch.append(source)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def ingest(path: str, corpus: Optional[Corpus] = None, workers: int = INGEST_WORKERS,
+           ticker: Optional[str] = None, batch_size: int = INGEST_BATCH_SIZE,
+           retry_skipped: bool = False) -> Dict[str, Any]:
+    """Parse every new document under `path` into the corpus; returns counts by outcome"""
+    corpus = corpus or get_corpus()
+    # A --ticker tags everything, so files skipped only for lacking a ticker get another go
+    skip_statuses = () if retry_skipped else ("empty",) if ticker else ("empty", "untagged")
+    counts = Counter()
+    start = time.perf_counter()
+    in_flight: deque = deque()
+
+    def drain() -> None:
+        results = [future.result() for future in in_flight.popleft()]
+        documents = []
+        skipped = []
+        for result in results:
+            counts[result["status"]] += 1
+            if result["status"] == "ok":
+                documents.append(result)
+            elif result["status"] == "failed":
+                print(f"Error parsing {result['source']}: {result['error']}")
+            else:
+                skipped.append((result["raw_hash"], result["source"], result["status"]))
+        corpus.skip(skipped)
+        if documents:
+            added = corpus.add(documents)
+            counts["written"] += added
+            # Same text as a stored document (or an earlier one in this run)
+            counts["duplicate"] += len(documents) - added
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in _batches(iter_sources(path), batch_size):
+            counts["seen"] += len(batch)
+            hashed = [(name, mtime, raw, hashlib.sha256(raw).hexdigest()) for name, mtime, raw in batch]
+            hashes = [h for *_, h in hashed]
+            known = corpus.existing(hashes)
+            skipped = corpus.skipped(hashes, skip_statuses) - known if skip_statuses else set()
+            todo = [
+                (name, mtime, raw, h, ticker) for name, mtime, raw, h in hashed
+                if h not in known and h not in skipped
+            ]
+            counts["already_indexed"] += sum(h in known for h in hashes)
+            counts["already_skipped"] += sum(h in skipped for h in hashes)
+            in_flight.append([executor.submit(parse_document, item) for item in todo])
+            # One batch parsing while the next is read; older results are written out
+            while len(in_flight) >= 2:
+                drain()
+        while in_flight:
+            drain()
+
+    counts.pop("ok", None)
+    return {**counts, "seconds": round(time.perf_counter() - start, 2)}
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print(__doc__)
+        return
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else INGEST_WORKERS
+    ticker = args[args.index("--ticker") + 1].upper() if "--ticker" in args else None
+    print(ingest(args[0], workers=workers, ticker=ticker, retry_skipped="--retry-skipped" in args))
+    print(get_corpus().stats())
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,48 @@ VOLA Engine API
 
 This FastAPI application provides endpoints for real-time stock volatility analysis, integrating with Polygon.io, FMP, and yfinance APIs. Optimized for Netlify Functions deployment.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import asyncio
+import math
 import os
-import requests
+import time
 from datetime import datetime, timedelta
-import yfinance as yf
-import pandas as pd
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel
-import time
-import random
 
-# Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
+# Load environment variables before the modules that read them
+from coldstart import VOLA_WARMUP, WARMUP_MODULES, lazy_import, lazy_import_stats, load_env, warmup
+load_env()
+
+from cache import cached, quote_cache
+from ticker_context import HISTORY_DAYS, TickerContext
+from ohlcv_store import OHLCV_COMPACT_INTERVAL, OHLCV_RETENTION_DAYS, ohlcv_store
+from volatility import ESTIMATORS, MIN_BARS, annualize, estimate_volatility
+from racing import race_stats
+from circuit_breaker import circuit_breakers
+from providers import data_router
+from rate_limit import rate_limiter
+from singleflight import inflight
+from batch import BATCH_MAX_TICKERS, fetch_batch_metrics, parse_tickers
+from earnings_calendar import earnings_calendar, earnings_data
+from options import OPTIONS_DIVIDEND_YIELD, OPTIONS_RISK_FREE_RATE, iv_payload, solve_chain
+from vol_surface import VolSurface
+from features import FEATURE_NAMES
+from forecast import (
+    FORECAST_CONCURRENCY, FORECAST_HISTORY_DAYS, ModelNotFound, forecast_batcher, get_forecast_model,
+    latest_features,
+)
+from sentiment import analyze_sentiment, sentiment_stats
+from streaming import STREAM_HEARTBEAT_SECONDS, WatchlistHub
+from serialization import VIEW_PATTERN, FastJSONResponse, dumps, parse_fields, project
+from http_cache import HTTPCacheMiddleware
+import http_client
+
+np = lazy_import("numpy")
 
-app = FastAPI(title="VOLA Engine API", version="1.0.0")
+app = FastAPI(title="VOLA Engine API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -30,20 +55,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETag and Cache-Control headers so the CDN can serve repeat requests
+app.add_middleware(HTTPCacheMiddleware)
+
 # API Keys
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 FMP_API_KEY = os.getenv("FMP_API_KEY")
 
+# Widest range /api/earnings/upcoming will return
+EARNINGS_UPCOMING_MAX_DAYS = int(os.getenv("EARNINGS_UPCOMING_MAX_DAYS", "120"))
+
+DEFAULT_ESTIMATOR = "close_to_close"
+ESTIMATOR_PATTERN = f"^({'|'.join(ESTIMATORS)})$"
+
+# Long-running tasks started with the app, cancelled on shutdown
+background_tasks = set()
+
+async def compact_ohlcv_store_periodically():
+    """Drop expired bars from the local OHLCV store once per interval"""
+    while True:
+        await asyncio.sleep(OHLCV_COMPACT_INTERVAL)
+        try:
+            print(f"Compacted OHLCV store: {await asyncio.to_thread(ohlcv_store.compact)}")
+        except Exception as e:
+            print(f"Error compacting OHLCV store: {e}")
+
+@app.on_event("startup")
+async def startup_event():
+    await http_client.startup()
+    if VOLA_WARMUP:
+        from sentiment import get_scorer
+        print(f"Warmup: {await asyncio.to_thread(warmup, WARMUP_MODULES, [get_scorer, get_forecast_model])}")
+    if ohlcv_store is not None:
+        background_tasks.add(asyncio.create_task(compact_ohlcv_store_periodically()))
+    background_tasks.add(asyncio.create_task(
+        earnings_calendar.refresh_periodically(data_router.earnings, FMP_API_KEY)
+    ))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await watchlist_hub.shutdown()
+    await http_client.shutdown()
+
 class StockRequest(BaseModel):
     ticker: str
 
+class BatchRequest(BaseModel):
+    tickers: List[str]
+
 @app.get("/")
 def read_root():
     return {"message": "VOLA Engine API is running!", "status": "success"}
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "cache": quote_cache.stats(),
+            "provider_race_wins": race_stats.snapshot(),
+            "providers": data_router.snapshot(),
+            "circuit_breakers": circuit_breakers.snapshot(),
+            "streams": watchlist_hub.stats(),
+            "rate_limits": rate_limiter.snapshot(),
+            "inflight": inflight.stats(),
+            "ohlcv_store": ohlcv_store.stats() if ohlcv_store is not None else None,
+            "earnings_calendar": earnings_calendar.stats(),
+            "forecast": forecast_batcher.stats(),
+            "sentiment": sentiment_stats(),
+            "lazy_imports": lazy_import_stats()}
 
 @app.get("/api/test")
 def test_endpoint():
@@ -57,29 +137,88 @@ def generate_analysis_summary(ticker: str, stock_data: dict, volatility_data: di
     next_earnings = earnings_data.get("next_earnings", "N/A")
 
     # Volatility description
-    if volatility > 25:
-        vol_desc = "high"
+    if volatility is None:
+        vol_text = "an undetermined volatility"
+    elif volatility > 25:
+        vol_text = f"a high volatility of {volatility:.1f}%"
     elif volatility > 15:
-        vol_desc = "moderate"
+        vol_text = f"a moderate volatility of {volatility:.1f}%"
     else:
-        vol_desc = "low"
+        vol_text = f"a low volatility of {volatility:.1f}%"
 
     return (
-        f"{ticker} is currently trading at ${price:.2f} with a {vol_desc} volatility of {volatility:.1f}%. "
+        f"{ticker} is currently trading at ${price:.2f} with {vol_text}. "
         f"The stock has a market cap of {market_cap:,} and average volume of {avg_volume:,} shares."
         + (f" Next earnings are expected {next_earnings}." if next_earnings and next_earnings != 'N/A' else "")
     )
 
+def quote_fields(stock_data: dict) -> Dict[str, Any]:
+    return {
+        "current_price": stock_data.get("price", 0),
+        "price_change": stock_data.get("price_change", 0),
+        "price_change_percent": stock_data.get("price_change_percent", 0),
+        "market_cap": stock_data.get("market_cap", 0),
+        "volume": stock_data.get("volume", 0),
+        "avg_volume": stock_data.get("avg_volume", 0),
+        "high": stock_data.get("high", 0),
+        "low": stock_data.get("low", 0),
+        "open": stock_data.get("open", 0),
+    }
+
+def volatility_key(window: int) -> str:
+    """Response key for annualized volatility over a window, e.g. volatility_30d"""
+    return f"volatility_{window}d"
+
+def volatility_fields(volatility_data: dict, window: int, estimator: str) -> Dict[str, Any]:
+    return {
+        volatility_key(window): volatility_data.get("annualized_volatility", 0),
+        "volatility_window": window,
+        "volatility_estimator": estimator,
+        "volatility_rating": volatility_data.get("volatility_rating", "Unknown"),
+    }
+
+def earnings_fields(earnings_data: dict) -> Dict[str, Any]:
+    return {
+        "next_earnings": earnings_data.get("next_earnings", "N/A"),
+        "earnings_date": earnings_data.get("earnings_date", "N/A"),
+    }
+
 @app.get("/api/analyze/{ticker}")
-async def analyze_stock(ticker: str):
-    """Analyze any stock ticker with comprehensive data and improved error handling"""
+async def analyze_stock(request: Request, ticker: str, race: Optional[bool] = None,
+                        window: int = Query(HISTORY_DAYS, ge=5, le=OHLCV_RETENTION_DAYS),
+                        estimator: str = Query(DEFAULT_ESTIMATOR, pattern=ESTIMATOR_PATTERN),
+                        stream: bool = False, fields: Optional[str] = None,
+                        view: str = Query("full", pattern=VIEW_PATTERN)):
+    """Analyze any stock ticker with comprehensive data and improved error handling.
+
+    With ?stream=true (or Accept: application/x-ndjson) each section is sent
+    as a newline-delimited JSON record as soon as it is ready. ?fields= and
+    ?view= limit the response to the requested fields.
+    """
+    selected = parse_fields(fields, view, window)
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            analyze_stock_ndjson(ticker.upper(), race, window, estimator, selected),
+            media_type="application/x-ndjson",
+        )
+    return FastJSONResponse(project(await analyze_stock_data(ticker, race, window, estimator), selected))
+
+async def analyze_stock_data(ticker: str, race: Optional[bool] = None, window: int = HISTORY_DAYS,
+                             estimator: str = DEFAULT_ESTIMATOR) -> Dict[str, Any]:
+    """The full analysis as one response"""
     ticker = ticker.upper()
     
     try:
-        # Get comprehensive stock data
-        stock_data = get_comprehensive_stock_data(ticker)
-        earnings_data = get_earnings_data(ticker)
-        volatility_data = calculate_volatility(ticker)
+        # One context per request so the helpers share a single yfinance fetch
+        ctx = TickerContext(ticker, days=max(window, HISTORY_DAYS))
+
+        # Fetch quote, earnings and volatility concurrently; blocking yfinance
+        # work runs in worker threads so it never stalls the event loop
+        stock_data, earnings_data, volatility_data = await asyncio.gather(
+            get_comprehensive_stock_data(ticker, ctx=ctx, race=race),
+            get_earnings_data(ticker, ctx=ctx),
+            calculate_volatility(ticker, ctx=ctx, window=window, estimator=estimator),
+        )
 
         analysis_summary = generate_analysis_summary(
             ticker, stock_data, volatility_data, earnings_data
@@ -89,19 +228,9 @@ async def analyze_stock(ticker: str):
         formatted_response = {
             "success": True,
             "ticker": ticker,
-            "current_price": stock_data.get("price", 0),
-            "price_change": stock_data.get("price_change", 0),
-            "price_change_percent": stock_data.get("price_change_percent", 0),
-            "market_cap": stock_data.get("market_cap", 0),
-            "volume": stock_data.get("volume", 0),
-            "avg_volume": stock_data.get("avg_volume", 0),
-            "high": stock_data.get("high", 0),
-            "low": stock_data.get("low", 0),
-            "open": stock_data.get("open", 0),
-            "volatility_30d": volatility_data.get("annualized_volatility", 0),
-            "volatility_rating": volatility_data.get("volatility_rating", "Unknown"),
-            "next_earnings": earnings_data.get("next_earnings", "N/A"),
-            "earnings_date": earnings_data.get("earnings_date", "N/A"),
+            **quote_fields(stock_data),
+            **volatility_fields(volatility_data, window, estimator),
+            **earnings_fields(earnings_data),
             "data_source": stock_data.get("source", "Unknown"),
             "timestamp": datetime.now().isoformat(),
             "analysis_summary": analysis_summary,
@@ -129,7 +258,7 @@ async def analyze_stock(ticker: str):
             "high": 0,
             "low": 0,
             "open": 0,
-            "volatility_30d": 0,
+            volatility_key(window): 0,
             "volatility_rating": "Error",
             "next_earnings": "N/A",
             "earnings_date": "N/A",
@@ -152,7 +281,7 @@ async def analyze_stock(ticker: str):
             "high": 0,
             "low": 0,
             "open": 0,
-            "volatility_30d": 0,
+            volatility_key(window): 0,
             "volatility_rating": "Error",
             "next_earnings": "N/A",
             "earnings_date": "N/A",
@@ -161,178 +290,142 @@ async def analyze_stock(ticker: str):
             "analysis_summary": "No analysis available due to unexpected error."
         }
 
-def get_comprehensive_stock_data(ticker: str) -> dict:
-    """Get comprehensive stock data with proper formatting and real API fallback only"""
-    # Try yfinance first (most reliable for Netlify)
-    yf_data = get_yfinance_data(ticker)
-    if yf_data and yf_data.get("price", 0) > 0:
-        return yf_data
-    # Try Polygon.io
-    polygon_data = get_polygon_data(ticker)
-    if polygon_data and polygon_data.get("price", 0) > 0:
-        return polygon_data
-    # Try FMP
-    fmp_data = get_fmp_data(ticker)
-    if fmp_data and fmp_data.get("price", 0) > 0:
-        return fmp_data
-    # If all fail, raise error
-    raise HTTPException(status_code=404, detail=f"No real data found for {ticker}")
-
-def get_yfinance_data(ticker: str) -> Optional[Dict[str, Any]]:
-    """Get data from yfinance with improved error handling"""
-    try:
-        # Add delay to avoid rate limiting
-        time.sleep(random.uniform(0.5, 1.5))
-        
-        stock = yf.Ticker(ticker)
-        
-        # Get historical data first
-        hist = stock.history(period="5d")
-        
-        if not hist.empty and len(hist) > 1:
-            current_price = float(hist['Close'].iloc[-1])
-            prev_price = float(hist['Close'].iloc[-2])
-            price_change = current_price - prev_price
-            price_change_percent = (price_change / prev_price) * 100 if prev_price > 0 else 0
-            
-            # Get additional info with error handling
-            try:
-                info = stock.info
-                market_cap = int(info.get('marketCap', 0))
-                avg_volume = int(info.get('averageVolume', 0))
-            except:
-                market_cap = 0
-                avg_volume = 0
-            
-            return {
-                "price": current_price,
-                "price_change": price_change,
-                "price_change_percent": price_change_percent,
-                "market_cap": market_cap,
-                "volume": int(hist['Volume'].iloc[-1]),
-                "avg_volume": avg_volume,
-                "high": float(hist['High'].iloc[-1]),
-                "low": float(hist['Low'].iloc[-1]),
-                "open": float(hist['Open'].iloc[-1]),
-                "source": "Yahoo Finance"
-            }
-        return None
-    except Exception as e:
-        print(f"Error getting yfinance data for {ticker}: {e}")
-        return None
+async def analyze_stock_ndjson(ticker: str, race: Optional[bool], window: int, estimator: str,
+                               selected: Optional[List[str]] = None):
+    """Yield quote, volatility and earnings records as each completes, then a summary.
 
-def get_polygon_data(ticker: str) -> Optional[Dict[str, Any]]:
-    """Get data from Polygon.io API"""
-    if not POLYGON_API_KEY:
-        return None
-    
-    try:
-        # Get current price
-        url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/prev?adjusted=true&apiKey={POLYGON_API_KEY}"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('results') and len(data['results']) > 0:
-                result = data['results'][0]
-                current_price = float(result['c'])
-                prev_price = float(result['o'])
-                price_change = current_price - prev_price
-                price_change_percent = (price_change / prev_price) * 100 if prev_price > 0 else 0
-                
-                return {
-                    "price": current_price,
-                    "price_change": price_change,
-                    "price_change_percent": price_change_percent,
-                    "market_cap": 0,  # Polygon doesn't provide this in basic endpoint
-                    "volume": int(result['v']),
-                    "avg_volume": 0,
-                    "high": float(result['h']),
-                    "low": float(result['l']),
-                    "open": prev_price,
-                    "source": "Polygon.io"
-                }
-        return None
-    except Exception as e:
-        print(f"Error getting Polygon data for {ticker}: {e}")
-        return None
+    Every line is a JSON object with a "section" key. A failed quote yields an
+    "error" record; the other sections are still sent. With a field selection,
+    records keep only selected top-level fields and empty sections are skipped.
+    """
+    keep = None if selected is None else {path.split(".")[0] for path in selected} | {"failed", "error"}
 
-def get_fmp_data(ticker: str) -> Optional[dict]:
-    """Get data from Financial Modeling Prep API"""
-    if not FMP_API_KEY:
-        return None
-    
-    try:
-        # Get quote
-        url = f"https://financialmodelingprep.com/api/v3/quote/{ticker}?apikey={FMP_API_KEY}"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data and len(data) > 0:
-                quote = data[0]
-                current_price = float(quote.get('price', 0))
-                prev_price = float(quote.get('previousClose', current_price))
-                price_change = current_price - prev_price
-                price_change_percent = (price_change / prev_price) * 100 if prev_price > 0 else 0
-                
-                return {
-                    "price": current_price,
-                    "price_change": price_change,
-                    "price_change_percent": price_change_percent,
-                    "market_cap": int(quote.get('marketCap', 0)),
-                    "volume": int(quote.get('volume', 0)),
-                    "avg_volume": int(quote.get('avgVolume', 0)),
-                    "high": float(quote.get('dayHigh', 0)),
-                    "low": float(quote.get('dayLow', 0)),
-                    "open": float(quote.get('open', 0)),
-                    "source": "Financial Modeling Prep"
-                }
-        return None
-    except Exception as e:
-        print(f"Error getting FMP data for {ticker}: {e}")
-        return None
+    def record(section: str, **fields) -> str:
+        if keep is not None:
+            fields = {k: v for k, v in fields.items() if k in keep}
+            if not fields:
+                return ""
+        return dumps({"section": section, "ticker": ticker, **fields}) + "\n"
 
-def get_earnings_data(ticker: str) -> Dict[str, Any]:
-    """Get earnings data for a stock"""
+    ctx = TickerContext(ticker, days=max(window, HISTORY_DAYS))
+    tasks = {
+        asyncio.create_task(get_comprehensive_stock_data(ticker, ctx=ctx, race=race)): "quote",
+        asyncio.create_task(calculate_volatility(ticker, ctx=ctx, window=window, estimator=estimator)): "volatility",
+        asyncio.create_task(get_earnings_data(ticker, ctx=ctx)): "earnings",
+    }
+    results: Dict[str, dict] = {}
+    error = None
+    pending = set(tasks)
     try:
-        stock = yf.Ticker(ticker)
-        calendar = stock.calendar
-        
-        if calendar is not None and isinstance(calendar, pd.DataFrame) and not calendar.empty:
-            next_earnings = calendar.iloc[0]['Earnings Date']
-            if isinstance(next_earnings, pd.Timestamp):
-                next_earnings = next_earnings.strftime('%Y-%m-%d')
-            
-            return {
-                "next_earnings": next_earnings,
-                "earnings_date": next_earnings
-            }
-        else:
-            return {
-                "next_earnings": "N/A",
-                "earnings_date": "N/A"
-            }
-    except Exception as e:
-        print(f"Error getting earnings data for {ticker}: {e}")
-        return {
-            "next_earnings": "N/A",
-            "earnings_date": "N/A"
-        }
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                section = tasks[task]
+                try:
+                    data = task.result()
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    print(f"Error streaming {section} for {ticker}: {detail}")
+                    error = f"Data unavailable: {detail}"
+                    yield record("error", failed=section, error=error)
+                    continue
+                results[section] = data
+                if section == "quote":
+                    line = record(section, **quote_fields(data), data_source=data.get("source", "Unknown"))
+                elif section == "volatility":
+                    line = record(section, **volatility_fields(data, window, estimator))
+                else:
+                    line = record(section, **earnings_fields(data))
+                if line:
+                    yield line
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if "quote" in results:
+        summary = generate_analysis_summary(
+            ticker, results["quote"], results.get("volatility", {}), results.get("earnings", {})
+        )
+    else:
+        summary = "No analysis available due to data error."
+    yield record(
+        "summary",
+        success=error is None,
+        analysis_summary=summary,
+        timestamp=datetime.now().isoformat(),
+    )
+
+@cached("quote", ignore=("ctx", "race"))
+async def get_comprehensive_stock_data(ticker: str, ctx: Optional[TickerContext] = None,
+                                       race: Optional[bool] = None) -> dict:
+    """Get comprehensive stock data with proper formatting and real API fallback only"""
+    # race=true/false overrides the configured routing for this request
+    mode = None if race is None else ("race" if race else "sequential")
+    data = await data_router.quote(ticker, ctx=ctx, mode=mode)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"No real data found for {ticker}")
+    return data
 
-def calculate_volatility(ticker: str) -> Dict[str, Any]:
-    """Calculate volatility metrics for a stock"""
+@cached("earnings", ignore=("ctx",))
+async def get_earnings_data(ticker: str, ctx: Optional[TickerContext] = None) -> Dict[str, Any]:
+    """Get earnings data for a stock, served from the earnings calendar when it is fresh"""
+    entry = await earnings_calendar.lookup(ticker, lambda t: data_router.earnings(t, ctx=ctx))
+    return earnings_data(entry)
+
+@cached("options", ignore=("ctx",))
+async def get_option_chain(ticker: str, ctx: Optional[TickerContext] = None) -> Dict[str, Any]:
+    """Option chain over the nearest expiries"""
+    chain = await data_router.options(ticker, ctx=ctx)
+    if chain is None:
+        raise HTTPException(status_code=404, detail=f"No option chain found for {ticker}")
+    return chain
+
+@cached("implied_vol", ignore=("ctx",))
+async def get_solved_chain(ticker: str, ctx: Optional[TickerContext] = None) -> Tuple[Dict[str, Any], Any, float]:
+    """(chain, contracts with implied volatility, solve time in ms), solved once per cached chain"""
+    chain = await get_option_chain(ticker, ctx=ctx)
+    start = time.perf_counter()
+    solved = solve_chain(chain)
+    return chain, solved, (time.perf_counter() - start) * 1000
+
+@cached("surface", ignore=("ctx",))
+async def get_vol_surface(ticker: str, ctx: Optional[TickerContext] = None) -> VolSurface:
+    """Implied volatility surface built from the option chain"""
+    # Built from the same solved chain /api/options/{ticker}/iv serves
+    chain, solved, _ = await get_solved_chain(ticker, ctx=ctx)
+    surface = VolSurface.from_chain(
+        ticker, chain["spot"], solved, OPTIONS_RISK_FREE_RATE, OPTIONS_DIVIDEND_YIELD
+    )
+    if surface is None:
+        raise HTTPException(status_code=404, detail=f"Not enough option quotes to build a surface for {ticker}")
+    return surface
+
+@cached("volatility", cacheable=lambda v: v.get("volatility_rating") != "Error", ignore=("ctx",))
+async def calculate_volatility(ticker: str, ctx: Optional[TickerContext] = None,
+                               window: int = HISTORY_DAYS,
+                               estimator: str = DEFAULT_ESTIMATOR) -> Dict[str, Any]:
+    """Calculate volatility metrics for a stock over the last `window` calendar days"""
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period="30d")
+        hist = await data_router.history(ticker, window, ctx=ctx)
+        if hist is None:
+            raise LookupError("no provider returned price history")
         
-        if not hist.empty and len(hist) > 5:
-            # Calculate daily returns
-            hist['Returns'] = hist['Close'].pct_change()
-            
-            # Calculate annualized volatility
-            daily_volatility = hist['Returns'].std()
-            annualized_volatility = daily_volatility * (252 ** 0.5) * 100
+        if len(hist) >= MIN_BARS:
+            # All estimators in one pass over the OHLC arrays
+            daily = estimate_volatility(
+                hist['Open'].to_numpy(), hist['High'].to_numpy(),
+                hist['Low'].to_numpy(), hist['Close'].to_numpy(),
+            )
+            daily_volatility = float(daily[estimator][0])
+            annualized_volatility = float(annualize(daily_volatility))
+            if not math.isfinite(annualized_volatility):
+                # Flat or gappy bars: the estimator is undefined, not zero
+                return {
+                    "annualized_volatility": None,
+                    "volatility_rating": "N/A",
+                    "daily_volatility": None,
+                    "estimator": estimator,
+                }
             
             # Get volatility rating
             volatility_rating = get_volatility_rating(annualized_volatility)
@@ -340,24 +433,33 @@ def calculate_volatility(ticker: str) -> Dict[str, Any]:
             return {
                 "annualized_volatility": round(annualized_volatility, 2),
                 "volatility_rating": volatility_rating,
-                "daily_volatility": round(daily_volatility * 100, 2)
+                "daily_volatility": round(daily_volatility * 100, 2),
+                "estimator": estimator,
+                "estimators": {
+                    name: round(float(annualize(values[0])), 2)
+                    for name, values in daily.items() if not np.isnan(values[0])
+                }
             }
         else:
             return {
                 "annualized_volatility": 0,
                 "volatility_rating": "Unknown",
-                "daily_volatility": 0
+                "daily_volatility": 0,
+                "estimator": estimator
         }
     except Exception as e:
         print(f"Error calculating volatility for {ticker}: {e}")
         return {
             "annualized_volatility": 0,
             "volatility_rating": "Error",
-            "daily_volatility": 0
+            "daily_volatility": 0,
+            "estimator": estimator
         }
 
-def get_volatility_rating(volatility: float) -> str:
+def get_volatility_rating(volatility: Optional[float]) -> str:
     """Get volatility rating based on percentage"""
+    if volatility is None or not math.isfinite(volatility):
+        return "N/A"
     if volatility > 30:
         return "High"
     elif volatility > 20:
@@ -370,9 +472,375 @@ def get_volatility_rating(volatility: float) -> str:
 @app.post("/api/stock-data")
 async def get_stock_data_endpoint(request: StockRequest):
     """Alternative endpoint for stock data"""
-    return await analyze_stock(request.ticker)
+    return await analyze_stock_data(request.ticker)
+
+@app.get("/api/earnings/upcoming")
+async def upcoming_earnings(from_: Optional[str] = Query(None, alias="from"), to: Optional[str] = None):
+    """Earnings reports between two dates (YYYY-MM-DD, inclusive), ordered by date"""
+    try:
+        start = datetime.strptime(from_, "%Y-%m-%d").date() if from_ else datetime.now().date()
+        end = datetime.strptime(to, "%Y-%m-%d").date() if to else start + timedelta(days=14)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from and to must be dates in YYYY-MM-DD format")
+    if end < start:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    if (end - start).days > EARNINGS_UPCOMING_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {EARNINGS_UPCOMING_MAX_DAYS} days")
+
+    entries = earnings_calendar.between(start, end)
+    return FastJSONResponse({
+        "success": True,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "count": len(entries),
+        "earnings": [{"ticker": e["ticker"], **earnings_data(e)} for e in entries],
+        "timestamp": datetime.now().isoformat(),
+    })
 
 @app.get("/api/earnings/{ticker}")
 async def get_earnings_data_endpoint(ticker: str):
     """Get earnings data for a stock"""
-    return get_earnings_data(ticker) 
\ No newline at end of file
+    return await get_earnings_data(ticker.upper())
+
+@app.get("/api/surface/{ticker}")
+async def vol_surface(ticker: str, days: Optional[float] = Query(None, gt=0),
+                      moneyness: Optional[float] = Query(None, gt=0), strike: Optional[float] = Query(None, gt=0),
+                      grid: bool = False):
+    """Implied volatility surface: ATM term structure and skew, a point query, and optionally the grid.
+
+    ``days`` selects the maturity of the point query; ``moneyness`` (strike / spot)
+    or ``strike`` its strike, at the money by default.
+    """
+    if moneyness is not None and strike is not None:
+        raise HTTPException(status_code=400, detail="Pass either moneyness or strike, not both")
+    ticker = ticker.upper()
+    surface = await get_vol_surface(ticker)
+
+    start = time.perf_counter()
+    point = None
+    if days is not None:
+        t = days / 365
+        k = surface.log_moneyness(t, moneyness, strike)
+        point = {
+            "days": days,
+            "strike": round(surface.spot * math.exp(k + (surface.rate - surface.dividend_yield) * t), 4),
+            "iv": round(surface.iv(t, k) * 100, 3),
+            "atm_iv": round(surface.atm(t) * 100, 3),
+            "skew": round(surface.skew(t) * 100, 3),
+        }
+    query_ms = (time.perf_counter() - start) * 1000
+
+    payload = {
+        "success": True,
+        "ticker": ticker,
+        "spot": surface.spot,
+        "term_structure": [
+            {"expiry": expiry, "days": round(t * 365, 2), "atm_iv": round(atm * 100, 3), "skew": round(skew * 100, 3)}
+            for expiry, t, atm, skew in surface.term_structure()
+        ],
+        "point": point,
+        "timestamp": datetime.now().isoformat(),
+    }
+    if grid:
+        payload["grid"] = {
+            "log_moneyness": surface.k_grid.round(4).tolist(),
+            "days": (surface.t * 365).round(2).tolist(),
+            "iv": (surface.grid() * 100).round(3).tolist(),
+        }
+    # Timing goes in a header so it does not change the body's ETag
+    return FastJSONResponse(payload, headers={"Server-Timing": f"query;dur={query_ms:.3f}"})
+
+@app.get("/api/options/{ticker}/iv")
+async def option_implied_volatility(ticker: str, expiry: Optional[str] = None,
+                                    option_type: str = Query("all", alias="type", pattern="^(all|call|put)$")):
+    """Implied volatility of every contract in the option chain, grouped by expiry"""
+    ticker = ticker.upper()
+    chain, solved, solve_ms = await get_solved_chain(ticker)
+    if expiry:
+        solved = solved[solved["expiry"].dt.strftime("%Y-%m-%d") == expiry]
+    if option_type != "all":
+        solved = solved[solved["type"] == option_type]
+    # Timing goes in a header so it does not change the body's ETag
+    return FastJSONResponse({
+        "success": True,
+        "ticker": ticker,
+        "spot": chain["spot"],
+        "source": chain["source"],
+        "rate": OPTIONS_RISK_FREE_RATE,
+        "dividend_yield": OPTIONS_DIVIDEND_YIELD,
+        "contracts": len(solved),
+        "solved": int(solved["iv"].notna().sum()),
+        "expiries": iv_payload(solved),
+        "timestamp": datetime.now().isoformat(),
+    }, headers={"Server-Timing": f"solve;dur={solve_ms:.2f}"})
+
+@app.post("/api/analyze/batch")
+async def analyze_batch_endpoint(request: BatchRequest,
+                                 estimator: str = Query(DEFAULT_ESTIMATOR, pattern=ESTIMATOR_PATTERN),
+                                 fields: Optional[str] = None,
+                                 view: str = Query("full", pattern=VIEW_PATTERN)):
+    """Analyze many tickers in one request"""
+    return FastJSONResponse(await analyze_batch(request.tickers, estimator, parse_fields(fields, view, HISTORY_DAYS)))
+
+@app.get("/api/analyze")
+async def analyze_batch_query(tickers: str,
+                              estimator: str = Query(DEFAULT_ESTIMATOR, pattern=ESTIMATOR_PATTERN),
+                              fields: Optional[str] = None,
+                              view: str = Query("full", pattern=VIEW_PATTERN)):
+    """Analyze a comma-separated list of tickers in one request"""
+    return FastJSONResponse(await analyze_batch([tickers], estimator, parse_fields(fields, view, HISTORY_DAYS)))
+
+async def analyze_batch(raw_tickers: List[str], estimator: str = DEFAULT_ESTIMATOR,
+                        selected: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Quote and volatility fields for many tickers from bulk downloads.
+
+    Market cap and earnings need per-ticker round trips and are not included;
+    avg_volume is the mean over the downloaded window.
+    """
+    tickers = parse_tickers(raw_tickers)
+    if not tickers:
+        raise HTTPException(status_code=400, detail="No tickers provided")
+    if len(tickers) > BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TICKERS} tickers per request")
+
+    metrics = await fetch_batch_metrics(tickers, POLYGON_API_KEY, estimator)
+    timestamp = datetime.now().isoformat()
+
+    results = []
+    for ticker in tickers:
+        data = metrics.get(ticker)
+        if data is None:
+            results.append({
+                "success": False,
+                "ticker": ticker,
+                "error": f"Data unavailable: No real data found for {ticker}",
+                "data_source": "Error",
+            })
+            continue
+        results.append({
+            "success": True,
+            "ticker": ticker,
+            "current_price": data["price"],
+            "price_change": data["price_change"],
+            "price_change_percent": data["price_change_percent"],
+            "volume": data["volume"],
+            "avg_volume": data["avg_volume"],
+            "high": data["high"],
+            "low": data["low"],
+            "open": data["open"],
+            volatility_key(HISTORY_DAYS): data["annualized_volatility"],
+            "volatility_estimator": estimator,
+            "volatility_rating": get_volatility_rating(data["annualized_volatility"]) if data["annualized_volatility"] is not None else "N/A",
+            "data_source": data["source"],
+        })
+
+    return {
+        "success": True,
+        "count": len(results),
+        "found": len(metrics),
+        "results": [project(result, selected) for result in results],
+        "timestamp": timestamp,
+    }
+
+class ForecastRequest(BaseModel):
+    tickers: List[str]
+
+@app.get("/api/forecast/{ticker}")
+async def forecast_ticker(ticker: str):
+    """Forecast of realized volatility over the model's horizon"""
+    result = (await forecast_batch([ticker]))["results"][0]
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return FastJSONResponse(result)
+
+@app.post("/api/forecast/batch")
+async def forecast_batch_endpoint(request: ForecastRequest):
+    """Forecast many tickers with one model call"""
+    return FastJSONResponse(await forecast_batch(request.tickers))
+
+@app.get("/api/forecast")
+async def forecast_batch_query(tickers: str):
+    """Forecast a comma-separated list of tickers with one model call"""
+    return FastJSONResponse(await forecast_batch([tickers]))
+
+async def forecast_inputs(ticker: str) -> Tuple[Any, Optional[str], Optional[float]]:
+    """(history, next earnings date, sentiment score) for one ticker"""
+    ctx = TickerContext(ticker, days=FORECAST_HISTORY_DAYS)
+    hist, earnings_data, sentiment_data = await asyncio.gather(
+        data_router.history(ticker, FORECAST_HISTORY_DAYS, ctx=ctx),
+        get_earnings_data(ticker, ctx=ctx),
+        analyze_sentiment(ticker),
+        return_exceptions=True,
+    )
+    if isinstance(hist, BaseException):
+        hist = None
+    next_earnings = None
+    if isinstance(earnings_data, dict) and earnings_data.get("next_earnings", "N/A") != "N/A":
+        next_earnings = earnings_data["next_earnings"]
+    sentiment = None
+    if isinstance(sentiment_data, dict) and sentiment_data.get("document_count"):
+        sentiment = sentiment_data["sentiment_score"]
+    return hist, next_earnings, sentiment
+
+async def forecast_batch(raw_tickers: List[str]) -> Dict[str, Any]:
+    """Volatility forecasts for many tickers: inputs fetched concurrently, one predict call"""
+    tickers = parse_tickers(raw_tickers)
+    if not tickers:
+        raise HTTPException(status_code=400, detail="No tickers provided")
+    if len(tickers) > BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TICKERS} tickers per request")
+    try:
+        model = await asyncio.to_thread(get_forecast_model)
+    except ModelNotFound as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    semaphore = asyncio.Semaphore(FORECAST_CONCURRENCY)
+
+    async def inputs(ticker: str):
+        async with semaphore:
+            return await forecast_inputs(ticker)
+
+    fetched = dict(zip(tickers, await asyncio.gather(*(inputs(t) for t in tickers))))
+    ready = [t for t in tickers if fetched[t][0] is not None and len(fetched[t][0]) >= MIN_BARS]
+    features = latest_features(
+        [fetched[t][0] for t in ready], [fetched[t][1] for t in ready], [fetched[t][2] for t in ready]
+    )
+    predictions = dict(zip(ready, await forecast_batcher.predict(features))) if ready else {}
+    rows = dict(zip(ready, features))
+    current = FEATURE_NAMES.index("vol_close_to_close_21")
+    timestamp = datetime.now().isoformat()
+
+    results = []
+    for ticker in tickers:
+        if ticker not in predictions:
+            results.append({
+                "success": False,
+                "ticker": ticker,
+                "error": f"Not enough price history to forecast {ticker}",
+            })
+            continue
+        row = rows[ticker]
+        results.append({
+            "success": True,
+            "ticker": ticker,
+            "horizon_days": model.horizon,
+            "forecast_volatility": round(float(predictions[ticker]), 2),
+            "current_volatility": round(float(row[current]), 2) if np.isfinite(row[current]) else None,
+            "model_version": model.version,
+            "features": {
+                name: round(float(value), 4) if np.isfinite(value) else None
+                for name, value in zip(FEATURE_NAMES, row)
+            },
+            "timestamp": timestamp,
+        })
+
+    return {
+        "success": True,
+        "count": len(results),
+        "found": len(predictions),
+        "model_version": model.version,
+        "results": results,
+        "timestamp": timestamp,
+    }
+
+async def stream_snapshot(ticker: str) -> Dict[str, Any]:
+    """Quote and volatility fields pushed to watchlist subscribers"""
+    ctx = TickerContext(ticker)
+    stock_data, volatility_data = await asyncio.gather(
+        get_comprehensive_stock_data(ticker, ctx=ctx),
+        calculate_volatility(ticker, ctx=ctx),
+    )
+    return {
+        "current_price": stock_data.get("price", 0),
+        "price_change": stock_data.get("price_change", 0),
+        "price_change_percent": stock_data.get("price_change_percent", 0),
+        "volume": stock_data.get("volume", 0),
+        "high": stock_data.get("high", 0),
+        "low": stock_data.get("low", 0),
+        volatility_key(HISTORY_DAYS): volatility_data.get("annualized_volatility", 0),
+        "volatility_rating": volatility_data.get("volatility_rating", "Unknown"),
+        "data_source": stock_data.get("source", "Unknown"),
+    }
+
+# One shared poller per watched ticker, fanned out to every stream
+watchlist_hub = WatchlistHub(stream_snapshot)
+
+@app.get("/api/stream")
+async def stream_watchlist(request: Request, tickers: str):
+    """Server-sent events with quote and volatility changes for a comma-separated watchlist"""
+    symbols = parse_tickers([tickers])
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No tickers provided")
+
+    async def events():
+        subscriber = watchlist_hub.connect()
+        try:
+            watchlist_hub.subscribe(subscriber, symbols)
+            while not await request.is_disconnected():
+                updates = await subscriber.next(timeout=STREAM_HEARTBEAT_SECONDS)
+                if not updates:
+                    yield ": keep-alive\n\n"
+                for ticker, data in updates.items():
+                    yield f"event: update\ndata: {dumps({'ticker': ticker, **data})}\n\n"
+        finally:
+            watchlist_hub.disconnect(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/ws/watchlist")
+async def watchlist_socket(websocket: WebSocket, tickers: Optional[str] = None):
+    """Watchlist updates over a WebSocket.
+
+    Send {"action": "subscribe" | "unsubscribe", "tickers": [...]} to change the
+    watchlist; updates arrive as {"type": "update", "ticker": ..., "data": {...}}
+    with only the fields that changed.
+    """
+    await websocket.accept()
+    subscriber = watchlist_hub.connect()
+    send_lock = asyncio.Lock()
+
+    async def send(message: Dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_text(dumps(message))
+
+    async def receive_commands():
+        while True:
+            message = await websocket.receive_json()
+            action = message.get("action")
+            symbols = parse_tickers(message.get("tickers") or [])
+            if action == "subscribe":
+                watchlist_hub.subscribe(subscriber, symbols)
+            elif action == "unsubscribe":
+                watchlist_hub.unsubscribe(subscriber, symbols)
+            else:
+                await send({"type": "error", "error": f"Unknown action: {action}"})
+                continue
+            await send({"type": "subscribed", "tickers": sorted(subscriber.tickers)})
+
+    async def push_updates():
+        while True:
+            updates = await subscriber.next(timeout=STREAM_HEARTBEAT_SECONDS)
+            if not updates:
+                await send({"type": "heartbeat"})
+            for ticker, data in updates.items():
+                await send({"type": "update", "ticker": ticker, "data": data})
+
+    if tickers:
+        watchlist_hub.subscribe(subscriber, parse_tickers([tickers]))
+        await send({"type": "subscribed", "tickers": sorted(subscriber.tickers)})
+
+    tasks = [asyncio.create_task(receive_commands()), asyncio.create_task(push_updates())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"Watchlist socket closed with error: {error}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        watchlist_hub.disconnect(subscriber)
@@ -0,0 +1,77 @@
+"""
+Market session helpers
+
+US equity session boundaries used to decide how long market data stays fresh.
+Exchange holidays are not modelled; a holiday is treated like a regular weekday.
+"""
+from datetime import datetime, time as dtime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+PRE_MARKET_OPEN = dtime(4, 0)
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+POST_MARKET_CLOSE = dtime(20, 0)
+
+def market_now() -> datetime:
+    """Current time in the exchange timezone"""
+    return datetime.now(MARKET_TZ)
+
+def _to_market_time(now: Optional[datetime]) -> datetime:
+    if now is None:
+        return market_now()
+    if now.tzinfo is None:
+        return now.replace(tzinfo=MARKET_TZ)
+    return now.astimezone(MARKET_TZ)
+
+def market_session(now: Optional[datetime] = None) -> str:
+    """Return the current session: 'pre', 'regular', 'post' or 'closed'"""
+    now = _to_market_time(now)
+    if now.weekday() >= 5:
+        return "closed"
+
+    current = now.time()
+    if MARKET_OPEN <= current < MARKET_CLOSE:
+        return "regular"
+    if PRE_MARKET_OPEN <= current < MARKET_OPEN:
+        return "pre"
+    if MARKET_CLOSE <= current < POST_MARKET_CLOSE:
+        return "post"
+    return "closed"
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """True during the regular trading session"""
+    return market_session(now) == "regular"
+
+def next_market_open(now: Optional[datetime] = None) -> datetime:
+    """Start of the next regular session (now if the market is already open)"""
+    now = _to_market_time(now)
+    if is_market_open(now):
+        return now
+
+    candidate = now.replace(
+        hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0
+    )
+    if now.time() >= MARKET_OPEN:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+def seconds_until_next_open(now: Optional[datetime] = None) -> float:
+    """Seconds until the next regular session starts (0 while open)"""
+    now = _to_market_time(now)
+    return max((next_market_open(now) - now).total_seconds(), 0.0)
+
+def last_market_close(now: Optional[datetime] = None) -> datetime:
+    """End of the most recent regular session that has already closed"""
+    now = _to_market_time(now)
+    candidate = now.replace(
+        hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0
+    )
+    if now < candidate:
+        candidate -= timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate -= timedelta(days=1)
+    return candidate
@@ -0,0 +1,32 @@
+"""
+Model registry
+
+Versioned model artifacts shared by the volatility forecaster and the text
+sentiment model. Each model kind lives in its own directory:
+
+    <directory>/<version>/...    one artifact per training run
+    <directory>/LATEST           version served by default
+
+Versions are UTC timestamps, so they sort in training order.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+class ModelNotFound(LookupError):
+    pass
+
+def new_version() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def latest_version(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, "LATEST"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def set_latest(directory: str, version: str) -> None:
+    """Point LATEST at version"""
+    with open(os.path.join(directory, "LATEST"), "w", encoding="utf-8") as f:
+        f.write(version)
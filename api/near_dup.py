@@ -0,0 +1,247 @@
+"""
+Near-duplicate detection
+
+Wire services and aggregators republish the same story many times with small
+edits. Each document is reduced to a MinHash signature over its word
+shingles, and signatures are indexed by LSH bands. A new document is only
+compared with the few clusters that share a band with it. It joins the most
+similar one when the estimated Jaccard similarity reaches DEDUP_THRESHOLD,
+and starts a new cluster otherwise.
+
+Signatures for a batch of documents are computed in one vectorized pass.
+Documents are also keyed by a hash of their exact text, so a document seen
+before (the same files scanned on every request) maps straight to its
+cluster without being hashed or counted again. The index lives in memory. A cluster expires DEDUP_TTL_SECONDS after it was last
+matched, and beyond DEDUP_MAX_CLUSTERS the least recently matched clusters
+are dropped, so memory stays bounded when news volume spikes. Each cluster
+also keeps its sentiment score, so later copies of a story are never scored
+again.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from coldstart import lazy_import
+
+np = lazy_import("numpy")
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") != "0"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+# Words per shingle; shorter documents are hashed as a single shingle
+DEDUP_SHINGLE = int(os.getenv("DEDUP_SHINGLE", "3"))
+DEDUP_TTL_SECONDS = float(os.getenv("DEDUP_TTL_SECONDS", str(3 * 24 * 3600)))
+DEDUP_MAX_CLUSTERS = int(os.getenv("DEDUP_MAX_CLUSTERS", "200000"))
+# Shingles hashed per vectorized step: a (permutations x shingles) uint64 block of about 50 MB
+SIGNATURE_CHUNK = 50_000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def shingles(text: str, k: int = DEDUP_SHINGLE) -> Set[bytes]:
+    """Distinct k-word shingles of a text, lowercased"""
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) <= k:
+        return {" ".join(tokens).encode("utf-8")}
+    return {" ".join(tokens[i:i + k]).encode("utf-8") for i in range(len(tokens) - k + 1)}
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """(bands, rows per band) for the LSH index.
+
+    A pair with similarity s shares a band with probability 1 - (1 - s^r)^b,
+    an S-curve centred near (1/b)^(1/r). The layout with the highest centre
+    at or below the threshold is chosen, so true duplicates are almost always
+    candidates; candidates are then checked against the threshold exactly.
+    """
+    layouts = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [(b, r) for b, r in layouts if (1 / b) ** (1 / r) <= threshold]
+    return max(below, key=lambda br: (1 / br[0]) ** (1 / br[1])) if below else layouts[-1]
+
+def cluster_weight(members: int) -> float:
+    """Weight of a story published `members` times: wider coverage counts, but not linearly"""
+    return 1.0 + math.log(members)
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+class _Cluster:
+    __slots__ = ("signature", "keys", "hashes", "size", "last_seen", "score")
+
+    def __init__(self, signature: np.ndarray, keys: List[bytes], now: float):
+        self.signature = signature
+        self.keys = keys
+        # Exact texts already counted in this cluster
+        self.hashes: List[bytes] = []
+        self.size = 1
+        self.last_seen = now
+        self.score: Optional[float] = None
+
+class NearDuplicateIndex:
+    """MinHash/LSH clusters of recently seen documents"""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                 shingle: int = DEDUP_SHINGLE, ttl_seconds: float = DEDUP_TTL_SECONDS,
+                 max_clusters: int = DEDUP_MAX_CLUSTERS, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.ttl = ttl_seconds
+        self.max_clusters = max_clusters
+        self.seed = seed
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self._permutations: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._tables: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        # Cluster id -> cluster, least recently matched first
+        self._clusters: "OrderedDict[int, _Cluster]" = OrderedDict()
+        # Content hash -> cluster id of every distinct text indexed
+        self._by_hash: Dict[bytes, int] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.duplicates = 0
+        self.evicted = 0
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """(documents x permutations) uint32 MinHash signatures"""
+        if self._permutations is None:
+            # Multiply-shift hashing: the top 32 bits of (a * x + b) mod 2^64 with odd a
+            rng = np.random.default_rng(self.seed)
+            a = rng.integers(0, np.iinfo(np.uint64).max, (self.num_perm, 1), dtype=np.uint64, endpoint=True)
+            self._permutations = (a | np.uint64(1),
+                                  rng.integers(0, np.iinfo(np.uint64).max, (self.num_perm, 1), dtype=np.uint64,
+                                               endpoint=True))
+        a, b = self._permutations
+        lengths, hashes = [], []
+        for text in texts:
+            grams = shingles(text, self.shingle)
+            lengths.append(len(grams))
+            hashes.extend(map(zlib.crc32, grams))
+        hashes = np.array(hashes, dtype=np.uint64)
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        out = np.empty((len(lengths), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(lengths):
+            # Group documents so each step hashes about SIGNATURE_CHUNK shingles at once
+            end = max(start + 1, int(np.searchsorted(bounds, bounds[start] + SIGNATURE_CHUNK, side="right")) - 1)
+            flat = hashes[bounds[start]:bounds[end]]
+            permuted = a * flat
+            permuted += b
+            permuted >>= np.uint64(32)
+            out[start:end] = np.minimum.reduceat(permuted, bounds[start:end] - bounds[start], axis=1).T
+            start = end
+        return out
+
+    def band_keys(self, signatures: np.ndarray) -> List[List[bytes]]:
+        """Each signature split into `bands` byte strings of `rows` values"""
+        rows = np.ascontiguousarray(signatures).view(np.dtype((np.void, 4 * self.rows)))
+        return rows.reshape(len(signatures), self.bands).tolist()
+
+    def _drop(self, cid: int) -> None:
+        cluster = self._clusters.pop(cid)
+        for digest in cluster.hashes:
+            del self._by_hash[digest]
+        for table, key in zip(self._tables, cluster.keys):
+            ids = table.get(key)
+            if ids is not None:
+                ids.remove(cid)
+                if not ids:
+                    del table[key]
+        self.evicted += 1
+
+    def _evict(self, now: float) -> None:
+        while self._clusters:
+            cid, cluster = next(iter(self._clusters.items()))
+            if now - cluster.last_seen < self.ttl and len(self._clusters) <= self.max_clusters:
+                break
+            self._drop(cid)
+
+    def _touch(self, cid: int, now: float) -> None:
+        self._clusters[cid].last_seen = now
+        self._clusters.move_to_end(cid)
+
+    def _insert(self, digest: bytes, signature: np.ndarray, keys: List[bytes], now: float) -> int:
+        # Caller holds the lock
+        candidates = set()
+        for table, key in zip(self._tables, keys):
+            candidates.update(table.get(key, ()))
+        best, best_similarity = None, self.threshold
+        for cid in candidates:
+            similarity = float(np.mean(self._clusters[cid].signature == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = cid, similarity
+        if best is None:
+            best = self._next_id
+            self._next_id += 1
+            self._clusters[best] = _Cluster(signature.copy(), keys, now)
+            for table, key in zip(self._tables, keys):
+                table.setdefault(key, []).append(best)
+        else:
+            self._clusters[best].size += 1
+            self._touch(best, now)
+            self.duplicates += 1
+        self._clusters[best].hashes.append(digest)
+        self._by_hash[digest] = best
+        self.documents += 1
+        return best
+
+    def assign(self, texts: Sequence[str], now: Optional[float] = None) -> List[int]:
+        """Cluster id for each text; near-duplicates of each other or of recent documents share one.
+
+        Texts already indexed keep their cluster and are not counted again.
+        """
+        now = time.time() if now is None else now
+        digests = [content_hash(text) for text in texts]
+        with self._lock:
+            self._evict(now)
+            unseen = {d: i for i, d in enumerate(digests) if d not in self._by_hash}
+        # Only new texts are shingled and hashed, outside the lock
+        signatures = self.signatures([texts[i] for i in unseen.values()])
+        band_keys = self.band_keys(signatures)
+        with self._lock:
+            for digest, signature, keys in zip(unseen, signatures, band_keys):
+                # Another request may have indexed the same text meanwhile
+                if digest not in self._by_hash:
+                    self._insert(digest, signature, keys, now)
+            ids = []
+            for text, digest in zip(texts, digests):
+                cid = self._by_hash.get(digest)
+                if cid is None:
+                    # Evicted by another request between the two locked sections
+                    signature = self.signatures([text])
+                    cid = self._insert(digest, signature[0], self.band_keys(signature)[0], now)
+                elif digest not in unseen:
+                    self._touch(cid, now)
+                ids.append(cid)
+            self._evict(now)
+        return ids
+
+    def scores(self, ids: Iterable[int]) -> List[Optional[float]]:
+        """Stored score of each cluster (None if unscored or evicted)"""
+        with self._lock:
+            return [self._clusters[cid].score if cid in self._clusters else None for cid in ids]
+
+    def set_scores(self, scores: Dict[int, float]) -> None:
+        with self._lock:
+            for cid, score in scores.items():
+                if cid in self._clusters:
+                    self._clusters[cid].score = score
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clusters": len(self._clusters),
+                "documents": self.documents,
+                "duplicates": self.duplicates,
+                "evicted": self.evicted,
+                "bands": self.bands,
+                "rows": self.rows,
+            }
+
+dedup_index = NearDuplicateIndex()
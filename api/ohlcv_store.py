@@ -0,0 +1,262 @@
+"""
+Local OHLCV store
+
+SQLite-backed store of daily bars keyed by (ticker, date). Reads come from
+disk; the upstream is only asked for bars from the last stored session
+onwards (that bar is re-fetched because it may have been partial), so long
+look-back windows cost one small incremental download and stored history keeps
+serving when the provider is down.
+
+Writes happen in single transactions on a WAL-journaled database, and a
+database that fails its integrity check on open is moved aside and rebuilt.
+The file is opened on first use, so importing the module costs no I/O.
+
+Usage:
+    python ohlcv_store.py stats
+    python ohlcv_store.py compact
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from coldstart import lazy_import
+from market_hours import is_market_open, last_market_close
+
+pd = lazy_import("pandas")
+
+OHLCV_STORE_ENABLED = os.getenv("OHLCV_STORE_ENABLED", "1") != "0"
+OHLCV_STORE_PATH = os.getenv(
+    "OHLCV_STORE_PATH", os.path.join(tempfile.gettempdir(), "vola_ohlcv.sqlite3")
+)
+# Minimum history fetched the first time a ticker is seen
+OHLCV_BOOTSTRAP_DAYS = int(os.getenv("OHLCV_BOOTSTRAP_DAYS", "400"))
+# How often a ticker is re-checked upstream while the market is open
+OHLCV_REFRESH_SECONDS = float(os.getenv("OHLCV_REFRESH_SECONDS", "60"))
+# Bars older than this are dropped by compaction
+OHLCV_RETENTION_DAYS = int(os.getenv("OHLCV_RETENTION_DAYS", str(5 * 365)))
+OHLCV_COMPACT_INTERVAL = float(os.getenv("OHLCV_COMPACT_INTERVAL", str(24 * 60 * 60)))
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT PRIMARY KEY,
+    covered_from TEXT NOT NULL,
+    refreshed_at REAL NOT NULL
+);
+"""
+
+# Fetch callable: accepts yfinance history() keyword arguments (start=...)
+Fetch = Callable[..., "pd.DataFrame"]
+
+class OHLCVStore:
+    """Daily bar store with incremental, append-only refresh"""
+
+    def __init__(self, path: str = OHLCV_STORE_PATH):
+        self.path = path
+        self._write_lock = threading.Lock()
+        # The file is checked and created on first use, not at import
+        self._open_lock = threading.Lock()
+        self._opened = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._opened:
+            with self._open_lock:
+                if not self._opened:
+                    self._open()
+                    self._opened = True
+        return self._sqlite_connect()
+
+    def _sqlite_connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _open(self) -> None:
+        """Create the schema, rebuilding the database if it is corrupt"""
+        try:
+            conn = self._sqlite_connect()
+            try:
+                ok = conn.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+                if ok:
+                    conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError as e:
+            print(f"OHLCV store at {self.path} is unreadable: {e}")
+            ok = False
+
+        if not ok:
+            backup = f"{self.path}.corrupt-{int(time.time())}"
+            print(f"Moving corrupt OHLCV store to {backup} and starting fresh")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.path + suffix):
+                    os.replace(self.path + suffix, backup + suffix)
+            conn = self._sqlite_connect()
+            try:
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+
+    def read(self, ticker: str, start: Optional[date] = None) -> pd.DataFrame:
+        """Stored bars for ticker, oldest first, indexed by session date"""
+        query = "SELECT date, open, high, low, close, volume FROM bars WHERE ticker = ?"
+        params = [ticker]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(start.isoformat())
+        query += " ORDER BY date"
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        frame = pd.DataFrame(rows, columns=("Date",) + COLUMNS)
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop("Date")), name="Date")
+        return frame
+
+    def _coverage(self, ticker: str):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT covered_from, refreshed_at, "
+                "(SELECT MAX(date) FROM bars WHERE ticker = ?) "
+                "FROM coverage WHERE ticker = ?",
+                (ticker, ticker),
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def write(self, ticker: str, bars: pd.DataFrame, covered_from: date) -> int:
+        """Upsert bars and record coverage in one transaction; returns rows written"""
+        bars = bars.dropna(subset=["Close"])
+        rows = [
+            (ticker, index.strftime("%Y-%m-%d"), *(float(row[c]) for c in COLUMNS))
+            for index, row in bars[list(COLUMNS)].iterrows()
+        ]
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                    )
+                    conn.execute(
+                        "INSERT INTO coverage VALUES (?, ?, ?) "
+                        "ON CONFLICT(ticker) DO UPDATE SET "
+                        "covered_from = MIN(covered_from, excluded.covered_from), "
+                        "refreshed_at = excluded.refreshed_at",
+                        (ticker, covered_from.isoformat(), time.time()),
+                    )
+            finally:
+                conn.close()
+        return len(rows)
+
+    def _is_fresh(self, refreshed_at: float) -> bool:
+        if is_market_open():
+            return time.time() - refreshed_at < OHLCV_REFRESH_SECONDS
+        return refreshed_at >= last_market_close().timestamp()
+
+    def refresh(self, ticker: str, fetch: Fetch, days: int) -> int:
+        """Bring ticker up to date for a days-long window; returns bars written"""
+        today = date.today()
+        want_from = today - timedelta(days=days)
+        coverage = self._coverage(ticker)
+
+        if coverage is None or date.fromisoformat(coverage[0]) > want_from:
+            # New ticker or a longer window than we hold: backfill the whole range
+            start = min(want_from, today - timedelta(days=OHLCV_BOOTSTRAP_DAYS))
+            covered_from = start
+        elif self._is_fresh(coverage[1]):
+            return 0
+        else:
+            # Only bars from the last stored session onward
+            start = date.fromisoformat(coverage[2]) if coverage[2] else want_from
+            covered_from = date.fromisoformat(coverage[0])
+
+        bars = fetch(start=start.isoformat())
+        return self.write(ticker, bars, covered_from)
+
+    def history(self, ticker: str, fetch: Fetch, days: int) -> pd.DataFrame:
+        """Bars covering the last `days` calendar days, refreshing incrementally first.
+
+        If the upstream refresh fails, whatever is stored is returned instead.
+        """
+        try:
+            self.refresh(ticker, fetch, days)
+        except Exception as e:
+            print(f"Error refreshing stored history for {ticker}, serving stored bars: {e}")
+        return self.read(ticker, start=date.today() - timedelta(days=days))
+
+    def compact(self, retention_days: int = OHLCV_RETENTION_DAYS) -> Dict[str, Any]:
+        """Drop bars past retention, then rebuild the file to reclaim space"""
+        cutoff = (date.today() - timedelta(days=retention_days)).isoformat()
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    deleted = conn.execute("DELETE FROM bars WHERE date < ?", (cutoff,)).rowcount
+                    conn.execute(
+                        "UPDATE coverage SET covered_from = ? WHERE covered_from < ?",
+                        (cutoff, cutoff),
+                    )
+                    conn.execute("DELETE FROM coverage WHERE ticker NOT IN (SELECT DISTINCT ticker FROM bars)")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+        return {"deleted_bars": deleted, **self.stats()}
+
+    def tickers(self) -> List[str]:
+        """Every ticker with stored bars"""
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute("SELECT ticker FROM coverage ORDER BY ticker")]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        if not self._opened and not os.path.exists(self.path):
+            return {"path": self.path, "tickers": 0, "bars": 0, "bytes": 0}
+        conn = self._connect()
+        try:
+            tickers, bars = conn.execute(
+                "SELECT COUNT(DISTINCT ticker), COUNT(*) FROM bars"
+            ).fetchone()
+        finally:
+            conn.close()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"path": self.path, "tickers": tickers, "bars": bars, "bytes": size}
+
+ohlcv_store = OHLCVStore() if OHLCV_STORE_ENABLED else None
+
+def main():
+    if ohlcv_store is None:
+        print("OHLCV store is disabled (OHLCV_STORE_ENABLED=0)")
+        return
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "compact":
+        print(ohlcv_store.compact())
+    elif command == "stats":
+        print(ohlcv_store.stats())
+    else:
+        print(__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Option chains
+
+Normalizes option chains from the providers into one long table (one row
+per contract across every expiry) and solves the whole table for implied
+volatility in a single vectorized pass (see implied_vol.py). Chains can be
+captured to JSON fixtures and replayed offline by the ``fixture`` provider;
+replayed expiries are shifted by the fixture's age so they never expire.
+
+Usage:
+    python options.py capture AAPL [path]
+    python options.py solve AAPL
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from coldstart import lazy_import
+from implied_vol import implied_volatility
+from market_hours import MARKET_CLOSE, market_now
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Nearest expiries fetched per ticker (each is one upstream round trip)
+OPTIONS_MAX_EXPIRIES = int(os.getenv("OPTIONS_MAX_EXPIRIES", "8"))
+OPTIONS_RISK_FREE_RATE = float(os.getenv("OPTIONS_RISK_FREE_RATE", "0.045"))
+OPTIONS_DIVIDEND_YIELD = float(os.getenv("OPTIONS_DIVIDEND_YIELD", "0"))
+OPTIONS_FIXTURE_DIR = os.getenv(
+    "OPTIONS_FIXTURE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "options")
+)
+
+CHAIN_COLUMNS = ("expiry", "type", "strike", "bid", "ask", "last", "volume", "open_interest")
+DAYS_PER_YEAR = 365.0
+
+def option_chain(ticker: str, spot: float, contracts: pd.DataFrame, source: str,
+                 as_of: Optional[date] = None) -> Dict[str, Any]:
+    """The provider-independent chain: underlying price plus one row per contract"""
+    contracts = contracts.loc[:, list(CHAIN_COLUMNS)].sort_values(["expiry", "type", "strike"], ignore_index=True)
+    return {
+        "ticker": ticker.upper(),
+        "spot": float(spot),
+        "as_of": (as_of or date.today()).isoformat(),
+        "source": source,
+        "contracts": contracts,
+    }
+
+def chain_from_yfinance(expiry: str, calls: pd.DataFrame, puts: pd.DataFrame) -> pd.DataFrame:
+    """Contracts of one yfinance option_chain() result in CHAIN_COLUMNS form"""
+    frames = []
+    for kind, frame in (("call", calls), ("put", puts)):
+        if frame is None or frame.empty:
+            continue
+        frames.append(pd.DataFrame({
+            "expiry": pd.Timestamp(expiry),
+            "type": kind,
+            "strike": frame["strike"].astype(float),
+            "bid": frame["bid"].astype(float),
+            "ask": frame["ask"].astype(float),
+            "last": frame["lastPrice"].astype(float),
+            "volume": frame["volume"].fillna(0).astype(float),
+            "open_interest": frame["openInterest"].fillna(0).astype(float),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=list(CHAIN_COLUMNS))
+    return pd.concat(frames, ignore_index=True)
+
+def years_to_expiry(expiry: pd.Series, now: Optional[datetime] = None) -> np.ndarray:
+    """Year fractions (ACT/365) until each expiry date's 4pm ET close"""
+    now = (now or market_now()).replace(tzinfo=None)
+    close = pd.to_datetime(expiry).to_numpy() + np.timedelta64(MARKET_CLOSE.hour * 60 + MARKET_CLOSE.minute, "m")
+    seconds = (close - np.datetime64(now)) / np.timedelta64(1, "s")
+    return seconds / (DAYS_PER_YEAR * 86400)
+
+def mid_prices(contracts: pd.DataFrame) -> np.ndarray:
+    """Bid/ask midpoint, or the last trade where the market is one-sided or crossed"""
+    bid = contracts["bid"].to_numpy(dtype=float)
+    ask = contracts["ask"].to_numpy(dtype=float)
+    quoted = (bid > 0) & (ask >= bid)
+    return np.where(quoted, 0.5 * (bid + ask), contracts["last"].to_numpy(dtype=float))
+
+def solve_chain(chain: Dict[str, Any], rate: float = OPTIONS_RISK_FREE_RATE,
+                dividend_yield: float = OPTIONS_DIVIDEND_YIELD,
+                now: Optional[datetime] = None) -> pd.DataFrame:
+    """The chain's contracts with mid, years to expiry and implied volatility columns"""
+    solved = chain["contracts"].copy()
+    solved["t"] = years_to_expiry(solved["expiry"], now)
+    solved["mid"] = mid_prices(solved)
+    solved["iv"], solved["iterations"] = implied_volatility(
+        solved["mid"].to_numpy(), chain["spot"], solved["strike"].to_numpy(), solved["t"].to_numpy(),
+        (solved["type"] == "call").to_numpy(), rate, dividend_yield,
+    )
+    return solved
+
+def _round(value: float, digits: int) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+def iv_payload(solved: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Solved contracts grouped by expiry, with IVs in percent (null when unsolvable)"""
+    today = pd.Timestamp(date.today())
+    expiries = []
+    for expiry, group in solved.groupby("expiry", sort=True):
+        entry: Dict[str, Any] = {"expiry": expiry.date().isoformat(), "days": int((expiry - today).days)}
+        for kind in ("call", "put"):
+            rows = group[group["type"] == kind]
+            entry[f"{kind}s"] = [
+                {
+                    "strike": float(strike),
+                    "bid": float(bid),
+                    "ask": float(ask),
+                    "mid": _round(mid, 4),
+                    "volume": int(volume),
+                    "open_interest": int(open_interest),
+                    "iv": _round(iv * 100, 3),
+                }
+                for strike, bid, ask, mid, volume, open_interest, iv in zip(
+                    rows["strike"], rows["bid"], rows["ask"], rows["mid"],
+                    rows["volume"], rows["open_interest"], rows["iv"],
+                )
+            ]
+        expiries.append(entry)
+    return expiries
+
+def fixture_path(ticker: str, directory: str = OPTIONS_FIXTURE_DIR) -> str:
+    return os.path.join(directory, f"{ticker.upper()}.json")
+
+def save_fixture(chain: Dict[str, Any], path: str) -> None:
+    contracts = chain["contracts"].copy()
+    contracts["expiry"] = contracts["expiry"].dt.strftime("%Y-%m-%d")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**chain, "contracts": contracts.to_dict(orient="list")}, f)
+
+def load_fixture(ticker: str, directory: str = OPTIONS_FIXTURE_DIR) -> Optional[Dict[str, Any]]:
+    """A captured chain with expiries moved forward by the fixture's age, or None"""
+    path = fixture_path(ticker, directory)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    contracts = pd.DataFrame(data["contracts"])
+    age = date.today() - date.fromisoformat(data["as_of"])
+    contracts["expiry"] = pd.to_datetime(contracts["expiry"]) + pd.Timedelta(days=age.days)
+    return option_chain(data["ticker"], data["spot"], contracts, data.get("source", "Fixture"))
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("capture", "solve"):
+        print(__doc__)
+        return
+    command, ticker = sys.argv[1], sys.argv[2].upper()
+
+    from providers import data_router
+    import http_client
+
+    async def fetch():
+        try:
+            return await data_router.options(ticker)
+        finally:
+            await http_client.shutdown()
+
+    chain = asyncio.run(fetch())
+    if chain is None:
+        print(f"No option chain for {ticker}")
+        return
+    if command == "capture":
+        path = sys.argv[3] if len(sys.argv) > 3 else fixture_path(ticker)
+        save_fixture(chain, path)
+        print(f"Saved {len(chain['contracts'])} contracts from {chain['source']} to {path}")
+    else:
+        start = time.perf_counter()
+        solved = solve_chain(chain)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{ticker}: {len(solved)} contracts, {int(solved['iv'].notna().sum())} solved "
+              f"in {elapsed:.1f} ms (max {int(solved['iterations'].max())} iterations)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,517 @@
+"""
+Market data providers
+
+Every upstream (yfinance, Polygon.io, FMP, a local stub and captured option
+chain fixtures for tests) sits behind one interface with up to four
+capabilities: quote, history, earnings and options. The router keeps an
+EWMA of latency and success rate per provider and capability, tries the
+provider expected to answer soonest first, and can hedge to the next one
+when it is slow. Providers whose circuit breaker is open are skipped
+without a call. main.py and standalone.py share the same router, so both
+deployments get the same data path.
+
+Configuration:
+    DATA_PROVIDERS=yfinance,polygon,fmp   configured order (stub and fixture are opt-in)
+    PROVIDER_ROUTING=hedge                hedge, sequential or race
+    PROVIDER_HEDGE_DELAY=1.5              seconds before the next provider joins
+    PROVIDER_EWMA_ALPHA=0.2               weight of the newest observation
+    PROVIDER_FAILURE_PENALTY=5            seconds a failed call is assumed to cost
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import http_client
+from circuit_breaker import circuit_breakers
+from coldstart import lazy_import
+from racing import hedge_providers, is_valid_quote, provider_deadline, race_providers
+from rate_limit import RateLimitExceeded, rate_limiter
+from implied_vol import black_scholes
+from options import (
+    OPTIONS_DIVIDEND_YIELD, OPTIONS_MAX_EXPIRIES, OPTIONS_RISK_FREE_RATE, chain_from_yfinance,
+    load_fixture, option_chain, years_to_expiry,
+)
+from ticker_context import HISTORY_DAYS, TickerContext
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+DATA_PROVIDERS = [
+    name.strip().lower()
+    for name in os.getenv("DATA_PROVIDERS", "yfinance,polygon,fmp").split(",")
+    if name.strip()
+]
+# PROVIDER_RACE_MODE=1 predates the router and still selects racing
+PROVIDER_ROUTING = os.getenv(
+    "PROVIDER_ROUTING", "race" if os.getenv("PROVIDER_RACE_MODE", "0") == "1" else "hedge"
+)
+PROVIDER_HEDGE_DELAY = float(os.getenv("PROVIDER_HEDGE_DELAY", "1.5"))
+PROVIDER_EWMA_ALPHA = float(os.getenv("PROVIDER_EWMA_ALPHA", "0.2"))
+# Added to a provider's score per unit of failure rate: the time lost falling back
+PROVIDER_FAILURE_PENALTY = float(os.getenv("PROVIDER_FAILURE_PENALTY", "5"))
+
+ROUTING_MODES = ("hedge", "sequential", "race")
+CAPABILITIES = ("quote", "history", "earnings", "options")
+
+def _valid_history(data: Any) -> bool:
+    return data is not None and not data.empty
+
+VALIDATORS: Dict[str, Callable[[Any], bool]] = {
+    "quote": is_valid_quote,
+    "history": _valid_history,
+    "earnings": lambda data: data is not None,
+    "options": lambda data: data is not None and not data["contracts"].empty,
+}
+
+def _quote(price: float, prev_price: float, source: str, **fields) -> Dict[str, Any]:
+    price_change = price - prev_price
+    return {
+        "price": price,
+        "price_change": price_change,
+        "price_change_percent": (price_change / prev_price) * 100 if prev_price > 0 else 0,
+        "market_cap": 0,
+        "volume": 0,
+        "avg_volume": 0,
+        "high": 0.0,
+        "low": 0.0,
+        "open": 0.0,
+        **fields,
+        "source": source,
+    }
+
+class Provider:
+    """A market data upstream. Capabilities it does not list are never routed to it.
+
+    Methods return None when the provider has no data for the ticker, raise
+    on failure, and raise RateLimitExceeded when its budget is exhausted.
+    """
+
+    name = "provider"
+    capabilities: Tuple[str, ...] = ()
+
+    async def quote(self, ticker: str, ctx: Optional[TickerContext] = None) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def history(self, ticker: str, days: int,
+                      ctx: Optional[TickerContext] = None) -> Optional[pd.DataFrame]:
+        raise NotImplementedError
+
+    async def earnings(self, ticker: str, ctx: Optional[TickerContext] = None) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def options(self, ticker: str, ctx: Optional[TickerContext] = None) -> Optional[Dict[str, Any]]:
+        """Option chain over the nearest expiries, as built by options.option_chain"""
+        raise NotImplementedError
+
+class YFinanceProvider(Provider):
+    """Yahoo Finance through the per-request TickerContext (blocking, run in threads)"""
+
+    name = "yfinance"
+    capabilities = ("quote", "history", "earnings", "options")
+
+    async def quote(self, ticker, ctx=None):
+        return await asyncio.to_thread(self._quote, ctx or TickerContext(ticker))
+
+    def _quote(self, ctx: TickerContext) -> Optional[Dict[str, Any]]:
+        # Last 5 sessions of the shared history window
+        hist = ctx.history(rows=5)
+        if hist.empty or len(hist) < 2:
+            return None
+
+        try:
+            info = ctx.info
+            market_cap = int(info.get('marketCap', 0))
+            avg_volume = int(info.get('averageVolume', 0))
+        except RateLimitExceeded:
+            raise
+        except Exception:
+            market_cap = 0
+            avg_volume = 0
+
+        return _quote(
+            float(hist['Close'].iloc[-1]), float(hist['Close'].iloc[-2]), "Yahoo Finance",
+            market_cap=market_cap,
+            volume=int(hist['Volume'].iloc[-1]),
+            avg_volume=avg_volume,
+            high=float(hist['High'].iloc[-1]),
+            low=float(hist['Low'].iloc[-1]),
+            open=float(hist['Open'].iloc[-1]),
+        )
+
+    async def history(self, ticker, days, ctx=None):
+        ctx = ctx if ctx is not None and ctx.days >= days else TickerContext(ticker, days=days)
+        return await asyncio.to_thread(ctx.history, days=days)
+
+    async def earnings(self, ticker, ctx=None):
+        calendar = await asyncio.to_thread(lambda: (ctx or TickerContext(ticker)).calendar)
+        next_earnings = "N/A"
+        if isinstance(calendar, dict):
+            # Newer yfinance returns {"Earnings Date": [date, ...], ...}
+            dates = calendar.get('Earnings Date') or []
+            if dates:
+                next_earnings = min(dates)
+        elif calendar is not None and isinstance(calendar, pd.DataFrame) and not calendar.empty:
+            next_earnings = calendar.iloc[0]['Earnings Date']
+        if hasattr(next_earnings, 'strftime'):
+            next_earnings = next_earnings.strftime('%Y-%m-%d')
+        return {"next_earnings": next_earnings, "earnings_date": next_earnings}
+
+    async def options(self, ticker, ctx=None):
+        ctx = ctx or TickerContext(ticker)
+        expiries = (await asyncio.to_thread(lambda: ctx.option_expiries))[:OPTIONS_MAX_EXPIRIES]
+        hist = await asyncio.to_thread(ctx.history, 1)
+        if not expiries or hist.empty:
+            return None
+        # One round trip per expiry; run them side by side
+        chains = await asyncio.gather(*(asyncio.to_thread(ctx.option_chain, e) for e in expiries))
+        contracts = pd.concat(
+            [chain_from_yfinance(e, chain.calls, chain.puts) for e, chain in zip(expiries, chains)],
+            ignore_index=True,
+        )
+        return option_chain(ticker, float(hist["Close"].iloc[-1]), contracts, "Yahoo Finance")
+
+class PolygonProvider(Provider):
+    """Polygon.io previous-day aggregates"""
+
+    name = "polygon"
+    capabilities = ("quote",)
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    async def quote(self, ticker, ctx=None):
+        if not await rate_limiter.acquire(self.name):
+            raise RateLimitExceeded("polygon rate limit budget exhausted")
+        url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/prev"
+        data = await http_client.get_json(url, params={"adjusted": "true", "apiKey": self.api_key})
+        if not data or not data.get('results'):
+            return None
+
+        result = data['results'][0]
+        prev_price = float(result['o'])
+        return _quote(
+            float(result['c']), prev_price, "Polygon.io",
+            market_cap=0,  # Polygon doesn't provide this in basic endpoint
+            volume=int(result['v']),
+            avg_volume=0,
+            high=float(result['h']),
+            low=float(result['l']),
+            open=prev_price,
+        )
+
+class FMPProvider(Provider):
+    """Financial Modeling Prep quote endpoint"""
+
+    name = "fmp"
+    capabilities = ("quote",)
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    async def quote(self, ticker, ctx=None):
+        if not await rate_limiter.acquire(self.name):
+            raise RateLimitExceeded("fmp rate limit budget exhausted")
+        url = f"https://financialmodelingprep.com/api/v3/quote/{ticker}"
+        data = await http_client.get_json(url, params={"apikey": self.api_key})
+        if not data:
+            return None
+
+        quote = data[0]
+        current_price = float(quote.get('price', 0))
+        return _quote(
+            current_price, float(quote.get('previousClose', current_price)), "Financial Modeling Prep",
+            market_cap=int(quote.get('marketCap', 0)),
+            volume=int(quote.get('volume', 0)),
+            avg_volume=int(quote.get('avgVolume', 0)),
+            high=float(quote.get('dayHigh', 0)),
+            low=float(quote.get('dayLow', 0)),
+            open=float(quote.get('open', 0)),
+        )
+
+class StubProvider(Provider):
+    """Deterministic synthetic data for tests and offline development.
+
+    Bars are a seeded random walk per ticker, so repeated calls agree with
+    each other. ``latency`` adds an artificial delay to exercise routing.
+    """
+
+    name = "stub"
+    capabilities = ("quote", "history", "earnings", "options")
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def _seed(self, ticker: str) -> int:
+        return int(hashlib.sha256(ticker.encode("utf-8")).hexdigest()[:8], 16)
+
+    def _bars(self, ticker: str, days: int) -> pd.DataFrame:
+        index = pd.bdate_range(end=pd.Timestamp(date.today()), periods=max(days * 5 // 7, 2), name="Date")
+        rng = np.random.default_rng(self._seed(ticker))
+        close = (50 + self._seed(ticker) % 200) * np.exp(np.cumsum(rng.normal(0, 0.015, len(index))))
+        spread = np.abs(rng.normal(0, 0.01, len(index)))
+        return pd.DataFrame({
+            "Open": close * (1 - spread / 2),
+            "High": close * (1 + spread),
+            "Low": close * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 5_000_000, len(index)).astype(float),
+        }, index=index)
+
+    async def quote(self, ticker, ctx=None):
+        await asyncio.sleep(self.latency)
+        bars = self._bars(ticker, HISTORY_DAYS)
+        last = bars.iloc[-1]
+        return _quote(
+            float(last["Close"]), float(bars["Close"].iloc[-2]), "Stub",
+            volume=int(last["Volume"]),
+            avg_volume=int(bars["Volume"].mean()),
+            high=float(last["High"]),
+            low=float(last["Low"]),
+            open=float(last["Open"]),
+        )
+
+    async def history(self, ticker, days, ctx=None):
+        await asyncio.sleep(self.latency)
+        return self._bars(ticker, days)
+
+    async def earnings(self, ticker, ctx=None):
+        await asyncio.sleep(self.latency)
+        next_earnings = (date.today() + timedelta(days=self._seed(ticker) % 90)).isoformat()
+        return {"next_earnings": next_earnings, "earnings_date": next_earnings}
+
+    async def options(self, ticker, ctx=None):
+        """Contracts priced off a known smile (skew plus curvature, rising with maturity)"""
+        await asyncio.sleep(self.latency)
+        spot = float(self._bars(ticker, HISTORY_DAYS)["Close"].iloc[-1])
+        friday = date.today() + timedelta(days=(4 - date.today().weekday()) % 7 or 7)
+        expiries = [friday + timedelta(weeks=w) for w in (0, 1, 3, 7, 12, 25, 38, 51)][:OPTIONS_MAX_EXPIRIES]
+        strikes = np.round(spot * np.linspace(0.6, 1.4, 41), 1)
+        expiry, strike = np.meshgrid(np.array(expiries, dtype="datetime64[D]"), strikes, indexing="ij")
+        t = years_to_expiry(pd.Series(expiry.ravel()))
+        strike = np.tile(strike.ravel(), 2)
+        t = np.tile(t, 2)
+        is_call = np.repeat([True, False], t.size // 2)
+        moneyness = np.log(strike / spot)
+        sigma = 0.15 + (self._seed(ticker) % 20) / 100 - 0.2 * moneyness + 0.4 * moneyness ** 2 + 0.02 * np.sqrt(t)
+        price = black_scholes(spot, strike, t, sigma, is_call, OPTIONS_RISK_FREE_RATE, OPTIONS_DIVIDEND_YIELD)
+        spread = np.maximum(0.01, np.round(price * 0.02, 2))
+        contracts = pd.DataFrame({
+            "expiry": pd.to_datetime(np.tile(expiry.ravel(), 2)),
+            "type": np.where(is_call, "call", "put"),
+            "strike": strike,
+            "bid": np.maximum(np.round(price - spread / 2, 2), 0.0),
+            "ask": np.round(price + spread / 2, 2),
+            "last": np.round(price, 2),
+            "volume": np.round(1000 * np.exp(-20 * moneyness ** 2)),
+            "open_interest": np.round(5000 * np.exp(-10 * moneyness ** 2)),
+        })
+        return option_chain(ticker, spot, contracts, "Stub")
+
+class FixtureProvider(Provider):
+    """Option chains captured with ``python options.py capture``, replayed from OPTIONS_FIXTURE_DIR"""
+
+    name = "fixture"
+    capabilities = ("options",)
+
+    async def options(self, ticker, ctx=None):
+        return await asyncio.to_thread(load_fixture, ticker)
+
+class ProviderStats:
+    """EWMA latency and success rate of one provider capability"""
+
+    def __init__(self, alpha: float = PROVIDER_EWMA_ALPHA):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.success_rate: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.failures += 0 if ok else 1
+            if self.latency is None:
+                self.latency, self.success_rate = seconds, float(ok)
+            else:
+                self.latency += self.alpha * (seconds - self.latency)
+                self.success_rate += self.alpha * (float(ok) - self.success_rate)
+
+    def observe_cancelled(self, seconds: float) -> None:
+        """A call that lost a race: its latency is at least `seconds`"""
+        with self._lock:
+            self.cancelled += 1
+            if self.latency is None:
+                self.latency, self.success_rate = seconds, 1.0
+            elif seconds > self.latency:
+                self.latency += self.alpha * (seconds - self.latency)
+
+    def score(self) -> Optional[float]:
+        """Expected seconds until a usable answer, None before the first call"""
+        with self._lock:
+            if self.latency is None:
+                return None
+            return self.latency + (1 - self.success_rate) * PROVIDER_FAILURE_PENALTY
+
+    def snapshot(self) -> Dict[str, Any]:
+        score = self.score()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "cancelled": self.cancelled,
+                "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+                "success_rate": round(self.success_rate, 3) if self.success_rate is not None else None,
+                "score": round(score, 3) if score is not None else None,
+            }
+
+def _no_deadline(name: str) -> None:
+    # The router applies deadlines itself so timeouts can be recorded
+    return None
+
+class ProviderRouter:
+    """Routes each capability to the providers expected to answer soonest"""
+
+    def __init__(self, providers: List[Provider], mode: str = PROVIDER_ROUTING,
+                 hedge_delay: float = PROVIDER_HEDGE_DELAY):
+        if mode not in ROUTING_MODES:
+            raise ValueError(f"Unknown provider routing mode: {mode}")
+        self.providers = providers
+        self.mode = mode
+        self.hedge_delay = hedge_delay
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    def stats(self, name: str, capability: str) -> ProviderStats:
+        with self._lock:
+            return self._stats.setdefault((name, capability), ProviderStats())
+
+    def ranked(self, capability: str) -> List[Provider]:
+        """Providers for a capability, lowest expected time to a valid answer first.
+
+        Providers with an open circuit breaker go last; they are skipped
+        when called unless the breaker has become due for a probe.
+
+        Providers without observations are scored like the best observed one,
+        so configured order decides between them and untried providers are not
+        starved; hedging then gives them their first observations.
+        """
+        candidates = [p for p in self.providers if capability in p.capabilities]
+        scores = [self.stats(p.name, capability).score() for p in candidates]
+        best = min((s for s in scores if s is not None), default=0.0)
+        is_open = [circuit_breakers.get(p.name).state == "open" for p in candidates]
+        order = sorted(
+            range(len(candidates)),
+            key=lambda i: (is_open[i], best if scores[i] is None else scores[i], i),
+        )
+        return [candidates[i] for i in order]
+
+    async def _call(self, provider: Provider, capability: str, ticker: str, *args, **kwargs) -> Any:
+        breaker = circuit_breakers.get(provider.name)
+        if not breaker.allow():
+            print(f"Skipping {provider.name} for {ticker}: circuit open")
+            return None
+
+        stats = self.stats(provider.name, capability)
+        deadline = provider_deadline(provider.name)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(getattr(provider, capability)(ticker, *args, **kwargs), deadline)
+        except RateLimitExceeded as e:
+            # A skipped call says nothing about the provider's health
+            print(f"Skipping {provider.name} for {ticker}: {e}")
+            breaker.release()
+            return None
+        except asyncio.TimeoutError:
+            print(f"Provider {provider.name} missed its {deadline}s deadline for {capability} {ticker}")
+            stats.observe(time.perf_counter() - start, False)
+            breaker.record_failure()
+            return None
+        except asyncio.CancelledError:
+            # Lost a race or hedge; still evidence that this provider is slow
+            stats.observe_cancelled(time.perf_counter() - start)
+            breaker.release()
+            raise
+        except Exception as e:
+            print(f"Error getting {capability} from {provider.name} for {ticker}: {e}")
+            stats.observe(time.perf_counter() - start, False)
+            breaker.record_failure()
+            return None
+        # A reply without data (unknown ticker) still shows the upstream is up
+        stats.observe(time.perf_counter() - start, VALIDATORS[capability](result))
+        breaker.record_success()
+        return result
+
+    async def fetch(self, capability: str, ticker: str, *args, mode: Optional[str] = None,
+                    **kwargs) -> Tuple[Optional[str], Any]:
+        """(provider name, result) from the first provider with a valid answer, or (None, None)"""
+        mode = mode or self.mode
+        is_valid = VALIDATORS[capability]
+        calls = {
+            p.name: (lambda p=p: self._call(p, capability, ticker, *args, **kwargs))
+            for p in self.ranked(capability)
+        }
+        if len(calls) > 1 and mode == "race":
+            return await race_providers(calls, is_valid, deadline=_no_deadline)
+        if len(calls) > 1 and mode == "hedge":
+            return await hedge_providers(calls, self.hedge_delay, is_valid, deadline=_no_deadline)
+
+        for name, call in calls.items():
+            result = await call()
+            if is_valid(result):
+                return name, result
+        return None, None
+
+    async def quote(self, ticker: str, ctx: Optional[TickerContext] = None,
+                    mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return (await self.fetch("quote", ticker, ctx=ctx, mode=mode))[1]
+
+    async def history(self, ticker: str, days: int = HISTORY_DAYS,
+                      ctx: Optional[TickerContext] = None) -> Optional[pd.DataFrame]:
+        return (await self.fetch("history", ticker, days, ctx=ctx))[1]
+
+    async def earnings(self, ticker: str, ctx: Optional[TickerContext] = None) -> Optional[Dict[str, Any]]:
+        return (await self.fetch("earnings", ticker, ctx=ctx))[1]
+
+    async def options(self, ticker: str, ctx: Optional[TickerContext] = None) -> Optional[Dict[str, Any]]:
+        return (await self.fetch("options", ticker, ctx=ctx))[1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "order": {capability: [p.name for p in self.ranked(capability)] for capability in CAPABILITIES},
+            "stats": {
+                f"{name}.{capability}": stats.snapshot()
+                for (name, capability), stats in sorted(self._stats.items())
+                if stats.score() is not None
+            },
+        }
+
+def build_providers(names: List[str] = DATA_PROVIDERS) -> List[Provider]:
+    """Providers in configured order; vendors without an API key are left out"""
+    providers: List[Provider] = []
+    for name in names:
+        if name == "yfinance":
+            providers.append(YFinanceProvider())
+        elif name == "polygon":
+            if os.getenv("POLYGON_API_KEY"):
+                providers.append(PolygonProvider(os.getenv("POLYGON_API_KEY")))
+        elif name == "fmp":
+            if os.getenv("FMP_API_KEY"):
+                providers.append(FMPProvider(os.getenv("FMP_API_KEY")))
+        elif name == "fixture":
+            providers.append(FixtureProvider())
+        elif name == "stub":
+            providers.append(StubProvider(float(os.getenv("STUB_PROVIDER_LATENCY", "0"))))
+        else:
+            print(f"Ignoring unknown data provider: {name}")
+    return providers
+
+data_router = ProviderRouter(build_providers())
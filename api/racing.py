@@ -0,0 +1,125 @@
+"""
+Provider racing
+
+Runs several quote providers concurrently, each under its own deadline, and
+keeps the first valid answer. Slower providers are cancelled as soon as a
+winner is known, so a degraded upstream no longer delays the fallbacks.
+Hedging is the cheaper variant: providers are started one at a time and the
+next one only joins when the running ones are slow or have failed.
+"""
+import asyncio
+import os
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+ProviderCalls = Dict[str, Callable[[], Awaitable[Any]]]
+
+# Per-provider deadline in seconds, overridable with PROVIDER_DEADLINE_<NAME>
+DEFAULT_DEADLINES = {
+    "yfinance": 8.0,
+    "polygon": 5.0,
+    "fmp": 5.0,
+}
+
+def provider_deadline(name: str) -> float:
+    return float(os.getenv(f"PROVIDER_DEADLINE_{name.upper()}", DEFAULT_DEADLINES.get(name, 5.0)))
+
+class RaceStats:
+    """Win counts per provider (and races nobody won)"""
+
+    def __init__(self):
+        self._wins = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, winner: Optional[str]) -> None:
+        with self._lock:
+            self._wins[winner or "none"] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._wins)
+
+race_stats = RaceStats()
+
+def is_valid_quote(data: Optional[Dict[str, Any]]) -> bool:
+    return bool(data) and data.get("price", 0) > 0
+
+def _start(name: str, fetch, deadline: Callable[[str], Optional[float]]) -> asyncio.Future:
+    return asyncio.ensure_future(asyncio.wait_for(fetch(), deadline(name)))
+
+def _first_valid(done, tasks, is_valid, deadline) -> Tuple[Optional[str], Any]:
+    for task in done:
+        name = tasks[task]
+        try:
+            result = task.result()
+        except asyncio.TimeoutError:
+            print(f"Provider {name} missed its {deadline(name)}s deadline")
+            continue
+        except Exception as e:
+            print(f"Provider {name} failed: {e}")
+            continue
+        if is_valid(result):
+            return name, result
+    return None, None
+
+async def race_providers(
+    providers: ProviderCalls,
+    is_valid: Callable[[Any], bool] = is_valid_quote,
+    deadline: Callable[[str], Optional[float]] = provider_deadline,
+) -> Tuple[Optional[str], Any]:
+    """Return (provider name, result) for the first provider with a valid result.
+
+    Each provider is a zero-argument coroutine factory. Providers that raise,
+    time out or return an invalid result are ignored; (None, None) is returned
+    when no provider produces a valid result.
+    """
+    tasks = {_start(name, fetch, deadline): name for name, fetch in providers.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            name, result = _first_valid(done, tasks, is_valid, deadline)
+            if name:
+                race_stats.record(name)
+                return name, result
+        race_stats.record(None)
+        return None, None
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def hedge_providers(
+    providers: ProviderCalls,
+    delay: float,
+    is_valid: Callable[[Any], bool] = is_valid_quote,
+    deadline: Callable[[str], Optional[float]] = provider_deadline,
+) -> Tuple[Optional[str], Any]:
+    """Like race_providers, but start providers in order, one at a time.
+
+    The next provider is started when no running provider has produced a
+    valid result within ``delay`` seconds, or as soon as one fails; running
+    providers keep going, and the first valid result wins.
+    """
+    queue = list(providers.items())
+    tasks: Dict[asyncio.Future, str] = {}
+    pending = set()
+    try:
+        while queue or pending:
+            if queue:
+                name, fetch = queue.pop(0)
+                task = _start(name, fetch, deadline)
+                tasks[task] = name
+                pending.add(task)
+            done, pending = await asyncio.wait(
+                pending, timeout=delay if queue else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            name, result = _first_valid(done, tasks, is_valid, deadline)
+            if name:
+                race_stats.record(name)
+                return name, result
+        race_stats.record(None)
+        return None, None
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,128 @@
+"""
+Upstream rate limiting
+
+Process-wide token buckets, one per data provider, shared by every request.
+Callers reserve a token and wait (asynchronously from the event loop, or by
+sleeping inside a worker thread) until it becomes available, so vendor quotas
+are honoured exactly instead of with random delays.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Budget per provider as (requests, per seconds, burst); override with
+# RATE_LIMIT_<PROVIDER>="requests/seconds" and RATE_LIMIT_<PROVIDER>_BURST
+DEFAULT_BUDGETS = {
+    "yfinance": (2, 1, 5),           # unofficial endpoint, keep it polite
+    "polygon": (5, 60, 5),           # Polygon.io free plan: 5 calls/minute
+    "fmp": (250, 24 * 60 * 60, 10),  # FMP free plan: 250 calls/day
+}
+
+# Longest a caller will queue for a token before giving up on the provider
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "2.0"))
+
+class RateLimitExceeded(Exception):
+    """Raised when a token is not available within the allowed wait"""
+
+def _budget_from_env(name: str, default: Tuple[float, float, float]) -> Tuple[float, float]:
+    """Return (tokens per second, capacity) for a provider"""
+    requests_, seconds, burst = default
+    spec = os.getenv(f"RATE_LIMIT_{name.upper()}")
+    if spec:
+        requests_, seconds = (float(part) for part in spec.split("/", 1))
+    burst = float(os.getenv(f"RATE_LIMIT_{name.upper()}_BURST", burst))
+    return requests_ / seconds, burst
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations in FIFO order"""
+
+    def __init__(self, name: str, rate: float, capacity: float):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._rejected = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _reserve(self, max_wait: Optional[float]) -> Optional[float]:
+        """Take a token and return how long to wait for it, or None if over max_wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Tokens may go negative: each reservation queues behind the previous one
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                self._rejected += 1
+                return None
+
+            self._tokens -= 1
+            self._acquired += 1
+            if wait > 0:
+                self._waited += 1
+                self._wait_seconds += wait
+                self._max_wait_seconds = max(self._max_wait_seconds, wait)
+            return wait
+
+    async def acquire(self, max_wait: Optional[float] = None) -> bool:
+        """Wait on the event loop for a token; False if it would take longer than max_wait"""
+        wait = self._reserve(max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def acquire_sync(self, max_wait: Optional[float] = None) -> bool:
+        """Blocking variant of acquire for code running in worker threads"""
+        wait = self._reserve(max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.monotonic() - self._updated
+            return {
+                "rate_per_second": self.rate,
+                "capacity": self.capacity,
+                "tokens": round(min(self.capacity, self._tokens + elapsed * self.rate), 3),
+                "acquired": self._acquired,
+                "rejected": self._rejected,
+                "waited": self._waited,
+                "wait_seconds_total": round(self._wait_seconds, 3),
+                "wait_seconds_max": round(self._max_wait_seconds, 3),
+            }
+
+class RateLimiter:
+    """Registry of per-provider token buckets"""
+
+    def __init__(self, budgets: Dict[str, Tuple[float, float, float]] = DEFAULT_BUDGETS):
+        self._buckets = {}
+        for name, default in budgets.items():
+            rate, capacity = _budget_from_env(name, default)
+            self._buckets[name] = TokenBucket(name, rate, capacity)
+
+    def bucket(self, provider: str) -> TokenBucket:
+        return self._buckets[provider]
+
+    async def acquire(self, provider: str, max_wait: Optional[float] = RATE_LIMIT_MAX_WAIT) -> bool:
+        return await self._buckets[provider].acquire(max_wait)
+
+    def acquire_sync(self, provider: str, max_wait: Optional[float] = RATE_LIMIT_MAX_WAIT) -> bool:
+        return self._buckets[provider].acquire_sync(max_wait)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: bucket.snapshot() for name, bucket in self._buckets.items()}
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,324 @@
+"""
+Sentiment pipeline
+
+Scores local text about a ticker (headline files, transcripts) and aggregates
+it into the /api/sentiment response. The scoring model (TextBlob's lexicon,
+or the hashing model from text_model.py with SENTIMENT_MODEL=hashing) is
+loaded once per process, concurrent requests are micro-batched into a single scoring call,
+and scores are cached by content hash so identical documents are never
+scored twice. Near-duplicates (near_dup.py) are clustered before scoring, so
+a story republished by many outlets is scored once and weighted as one story.
+
+Text comes from SENTIMENT_TEXT_SOURCE: "directory" reads SENTIMENT_TEXT_DIR,
+laid out as
+    AAPL.txt          one headline per line
+    AAPL/*.txt|*.md   one document per file (transcripts, articles)
+and "corpus" reads the newest documents ingested into the corpus (ingest.py).
+"""
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from near_dup import DEDUP_ENABLED, cluster_weight, dedup_index
+
+SENTIMENT_TEXT_DIR = os.getenv(
+    "SENTIMENT_TEXT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "text")
+)
+SENTIMENT_TEXT_SOURCE = os.getenv("SENTIMENT_TEXT_SOURCE", "directory").lower()
+# "textblob" (lexicon) or "hashing" (the trained model in text_model.py)
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "textblob").lower()
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "50000"))
+# How long the batcher waits for more requests before scoring, and the batch cap
+SENTIMENT_BATCH_WINDOW_MS = float(os.getenv("SENTIMENT_BATCH_WINDOW_MS", "5"))
+SENTIMENT_MAX_BATCH = int(os.getenv("SENTIMENT_MAX_BATCH", "512"))
+# Documents read per ticker (newest files first)
+SENTIMENT_MAX_DOCUMENTS = int(os.getenv("SENTIMENT_MAX_DOCUMENTS", "200"))
+
+# Polarity band treated as neutral
+NEUTRAL_BAND = 0.05
+
+RISK_TERMS = (
+    "lawsuit", "investigation", "subpoena", "downgrade", "guidance cut",
+    "miss", "recall", "layoffs", "bankruptcy", "default", "short seller",
+    "delisting", "fraud", "volatility", "impairment", "restatement",
+)
+
+# Kept local so key-phrase extraction needs no corpus download or extra package
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been
+before being below between both but by can could did do does doing down during each
+few for from further had has have having he her here hers him his how i if in into is
+it its itself just me more most my no nor not now of off on once only or other our
+ours out over own same she should so some such than that the their theirs them then
+there these they this those through to too under until up very was we were what when
+where which while who whom why will with would you your yours inc corp co ltd says said
+""".split())
+
+_WORD = re.compile(r"[a-z][a-z'\-]+")
+
+class DirectoryTextSource:
+    """Reads headline files and per-ticker document folders from a directory"""
+
+    def __init__(self, root: str = SENTIMENT_TEXT_DIR, max_documents: int = SENTIMENT_MAX_DOCUMENTS):
+        self.root = root
+        self.max_documents = max_documents
+
+    def documents(self, ticker: str) -> List[str]:
+        documents = []
+        headlines = os.path.join(self.root, f"{ticker}.txt")
+        if os.path.isfile(headlines):
+            with open(headlines, encoding="utf-8", errors="ignore") as handle:
+                documents.extend(line.strip() for line in handle if line.strip())
+
+        folder = os.path.join(self.root, ticker)
+        if os.path.isdir(folder):
+            paths = [
+                os.path.join(folder, name) for name in os.listdir(folder)
+                if name.endswith((".txt", ".md"))
+            ]
+            paths.sort(key=os.path.getmtime, reverse=True)
+            for path in paths[: self.max_documents]:
+                with open(path, encoding="utf-8", errors="ignore") as handle:
+                    text = handle.read().strip()
+                if text:
+                    documents.append(text)
+        return documents[: self.max_documents]
+
+class CorpusTextSource:
+    """Reads a ticker's newest documents from the ingested corpus"""
+
+    def __init__(self, max_documents: int = SENTIMENT_MAX_DOCUMENTS):
+        self.max_documents = max_documents
+
+    def documents(self, ticker: str) -> List[str]:
+        from corpus import get_corpus
+
+        return [
+            doc["text"] for doc in get_corpus().documents(ticker, newest_first=True, limit=self.max_documents)
+        ]
+
+class TextBlobScorer:
+    """Lexicon polarity in [-1, 1] from TextBlob's bundled pattern analyzer"""
+
+    name = "textblob-pattern"
+
+    def __init__(self):
+        from textblob.en.sentiments import PatternAnalyzer
+        self._analyzer = PatternAnalyzer()
+
+    def score(self, texts: Sequence[str]) -> List[float]:
+        return [float(self._analyzer.analyze(text).polarity) for text in texts]
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_scorer():
+    """The process-wide scoring model, loaded on first use"""
+    global _scorer
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                if SENTIMENT_MODEL == "hashing":
+                    from model_registry import ModelNotFound
+                    from text_model import get_text_model
+                    try:
+                        _scorer = get_text_model()
+                    except ModelNotFound as e:
+                        print(f"{e}; scoring sentiment with TextBlob")
+                if _scorer is None:
+                    _scorer = TextBlobScorer()
+    return _scorer
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ScoreCache:
+    """Bounded LRU of polarity scores keyed by content hash"""
+
+    def __init__(self, max_entries: int = SENTIMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._scores: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._scores.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def put(self, key: str, score: float) -> None:
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._scores), "hits": self.hits, "misses": self.misses}
+
+score_cache = ScoreCache()
+
+class SentimentBatcher:
+    """Collects documents from concurrent requests and scores them in one call"""
+
+    def __init__(self, window_ms: float = SENTIMENT_BATCH_WINDOW_MS, max_batch: int = SENTIMENT_MAX_BATCH):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.documents = 0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        return self._queue
+
+    async def score(self, texts: Sequence[str]) -> List[float]:
+        """Polarity for each text, from the cache or the next micro-batch"""
+        hashes = [content_hash(text) for text in texts]
+        scores: List[Optional[float]] = [score_cache.get(h) for h in hashes]
+        missing = [(h, text) for h, text, score in zip(hashes, texts, scores) if score is None]
+        if missing:
+            future = asyncio.get_running_loop().create_future()
+            await self._ensure_worker().put((missing, future))
+            fresh = await future
+            scores = [fresh[h] if score is None else score for h, score in zip(hashes, scores)]
+        return scores
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.window
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            # Identical documents across requests are scored once
+            unique = {}
+            for missing, _ in pending:
+                unique.update(missing)
+            try:
+                hashes = list(unique)
+                scored = await asyncio.to_thread(lambda texts: get_scorer().score(texts), [unique[h] for h in hashes])
+                results = dict(zip(hashes, scored))
+                for h, score in results.items():
+                    score_cache.put(h, score)
+                self.batches += 1
+                self.documents += len(hashes)
+                for _, future in pending:
+                    if not future.done():
+                        future.set_result(results)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"batches": self.batches, "documents_scored": self.documents, "cache": score_cache.stats()}
+
+text_source = CorpusTextSource() if SENTIMENT_TEXT_SOURCE == "corpus" else DirectoryTextSource()
+batcher = SentimentBatcher()
+
+def _key_phrases(documents: Sequence[str], limit: int = 3) -> List[str]:
+    """Most frequent two-word phrases without stop words"""
+    counts = Counter()
+    for text in documents:
+        words = [w for w in _WORD.findall(text.lower()) if w not in STOP_WORDS]
+        counts.update(" ".join(pair) for pair in zip(words, words[1:]))
+    return [phrase for phrase, _ in counts.most_common(limit)]
+
+def _risk_indicators(documents: Sequence[str], limit: int = 5) -> List[str]:
+    counts = Counter()
+    for text in documents:
+        lowered = text.lower()
+        for term in RISK_TERMS:
+            if re.search(rf"\b{re.escape(term)}", lowered):
+                counts[term] += 1
+    return [term for term, _ in counts.most_common(limit)]
+
+def _label(polarity: float) -> str:
+    if polarity > NEUTRAL_BAND:
+        return "Positive"
+    if polarity < -NEUTRAL_BAND:
+        return "Negative"
+    return "Neutral"
+
+async def _cluster(documents: List[str]) -> Tuple[List[Optional[int]], List[List[str]]]:
+    """(cluster ids, member texts) of each story; every document is its own story without dedup"""
+    if not DEDUP_ENABLED:
+        return [None] * len(documents), [[text] for text in documents]
+    ids = await asyncio.to_thread(dedup_index.assign, documents)
+    members: Dict[int, List[str]] = {}
+    for cid, text in zip(ids, documents):
+        members.setdefault(cid, []).append(text)
+    return list(members), list(members.values())
+
+async def analyze_sentiment(ticker: str) -> Dict[str, Any]:
+    """Aggregate sentiment for a ticker from its local documents.
+
+    Near-duplicate documents (the same story from several outlets) are
+    clustered first. Each story is scored once, and a story printed n times
+    weighs 1 + ln(n) in the mean polarity. sentiment_score maps that mean from
+    [-1, 1] onto [0, 1]; a ticker with no documents is reported as Neutral
+    (0.5) with document_count 0.
+    """
+    documents = await asyncio.to_thread(text_source.documents, ticker)
+    if not documents:
+        return {
+            "overall_sentiment": "Neutral",
+            "sentiment_score": 0.5,
+            "key_phrases": [],
+            "risk_indicators": [],
+            "document_count": 0,
+            "story_count": 0,
+        }
+
+    ids, stories = await _cluster(documents)
+    representatives = [members[0] for members in stories]
+    scores = dedup_index.scores(ids) if DEDUP_ENABLED else [None] * len(ids)
+    unscored = [i for i, score in enumerate(scores) if score is None]
+    if unscored:
+        fresh = await batcher.score([representatives[i] for i in unscored])
+        for i, score in zip(unscored, fresh):
+            scores[i] = score
+        if DEDUP_ENABLED:
+            dedup_index.set_scores({ids[i]: score for i, score in zip(unscored, fresh)})
+
+    key_phrases, risk_indicators = await asyncio.to_thread(
+        lambda: (_key_phrases(representatives), _risk_indicators(representatives))
+    )
+    weights = [cluster_weight(len(members)) for members in stories]
+    polarity = sum(w * s for w, s in zip(weights, scores)) / sum(weights)
+    return {
+        "overall_sentiment": _label(polarity),
+        "sentiment_score": round((polarity + 1) / 2, 4),
+        "key_phrases": key_phrases,
+        "risk_indicators": risk_indicators,
+        "document_count": len(documents),
+        "story_count": len(stories),
+    }
+
+def sentiment_stats() -> Dict[str, Any]:
+    return {**batcher.stats(), "dedup": dedup_index.stats() if DEDUP_ENABLED else None}
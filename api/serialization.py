@@ -0,0 +1,84 @@
+"""
+Response serialization
+
+orjson-backed JSON responses (the standard encoder is used when orjson is
+not installed) and field projection for analyze payloads, so clients can ask
+for only the fields they render.
+
+Projection takes a comma-separated list of top-level keys or dotted paths
+into nested objects (``raw_data.volatility_data.estimators``), or a named
+view. Views name the volatility field after the requested window
+(``volatility_60d`` for ?window=60). ``success``, ``ticker`` and ``error``
+are always kept so clients can still tell a failure apart.
+"""
+import importlib.util
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+
+# App-wide response class; handlers on hot paths return it directly so
+# FastAPI's jsonable_encoder pass is skipped as well
+FastJSONResponse = ORJSONResponse if HAS_ORJSON else JSONResponse
+
+if HAS_ORJSON:
+    import orjson
+
+    def dumps(obj: Any) -> str:
+        """Compact JSON text for streamed records"""
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+    loads = orjson.loads
+else:
+    def dumps(obj: Any) -> str:
+        """Compact JSON text for streamed records"""
+        return json.dumps(obj, separators=(",", ":"), default=str)
+
+    loads = json.loads
+
+ALWAYS_INCLUDED = ("success", "ticker", "error")
+
+VIEWS = {
+    "full": None,
+    # Everything except the raw_data copy of the flattened fields
+    "compact": (
+        "current_price", "price_change", "price_change_percent", "market_cap", "volume",
+        "avg_volume", "high", "low", "open", "volatility_{window}d", "volatility_window",
+        "volatility_estimator", "volatility_rating", "next_earnings", "earnings_date",
+        "data_source", "timestamp", "analysis_summary",
+    ),
+    "minimal": (
+        "current_price", "price_change_percent", "volatility_{window}d", "volatility_rating",
+        "next_earnings", "data_source",
+    ),
+}
+VIEW_PATTERN = f"^({'|'.join(VIEWS)})$"
+
+def parse_fields(fields: Optional[str], view: str = "full", window: int = 30) -> Optional[List[str]]:
+    """Requested field paths from ?fields= and ?view=, or None for everything"""
+    selected = [path.format(window=window) for path in VIEWS[view] or ()]
+    if fields:
+        selected.extend(f.strip() for f in fields.split(",") if f.strip())
+    if not selected:
+        return None
+    return list(dict.fromkeys((*ALWAYS_INCLUDED, *selected)))
+
+def project(payload: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """Keep only the given field paths; unknown paths are ignored"""
+    if fields is None:
+        return payload
+    result: Dict[str, Any] = {}
+    for path in fields:
+        keys = path.split(".")
+        source = payload
+        for key in keys[:-1]:
+            source = source.get(key) if isinstance(source, dict) else None
+        if not isinstance(source, dict) or keys[-1] not in source:
+            continue
+        target = result
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = source[keys[-1]]
+    return result
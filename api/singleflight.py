@@ -0,0 +1,106 @@
+"""
+Request coalescing
+
+Concurrent lookups that share a key (for example ``("quote", "NVDA")``) are
+collapsed into one upstream call whose result, or exception, is handed to
+every caller. Works for coroutines on the event loop and for blocking
+functions running in worker threads.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """In-flight deduplication keyed by an arbitrary hashable"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "shared": 0, "abandoned": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once per key no matter how many callers are waiting on it.
+
+        A cancelled caller does not cancel the shared call unless it was the
+        last one waiting for it.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self._count("leaders")
+        else:
+            self._count("shared")
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                raise
+            # Only this caller was cancelled; drop the shared call if nobody else wants it
+            if self._waiters.get(key) == 1 and self._tasks.get(key) is task and not task.done():
+                task.cancel()
+                self._count("abandoned")
+            raise
+        finally:
+            if self._tasks.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: Hashable, task: "asyncio.Task") -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            self._waiters.pop(key, None)
+        # Mark the exception as retrieved when every caller has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def do_sync(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Blocking variant of do for worker threads"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["leaders"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._tasks) + len(self._calls), **self._stats}
+
+inflight = SingleFlight()
@@ -1,26 +1,31 @@
 """
 VOLA Engine API - Standalone version for Vercel deployment
 
-This is a standalone version that includes all necessary endpoints
-without depending on main.py, in case there are import issues.
+A smaller app with the core analysis endpoints for serverless deployment.
+It does not import main.py, but shares the provider router, earnings
+calendar, sentiment scorer and HTTP helpers with it.
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import os
-import requests
 from datetime import datetime, timedelta
-import yfinance as yf
-import pandas as pd
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
-import time
-import random
 
 # Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
+from coldstart import VOLA_WARMUP, WARMUP_MODULES, load_env, warmup
+load_env()
 
-app = FastAPI(title="VOLA Engine API", version="1.0.0")
+from sentiment import analyze_sentiment, get_scorer
+from providers import data_router
+from earnings_calendar import earnings_calendar, earnings_data
+from serialization import FastJSONResponse
+from http_cache import HTTPCacheMiddleware
+from ticker_context import TickerContext
+import http_client
+
+app = FastAPI(title="VOLA Engine API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -31,9 +36,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# API Keys
-POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
-FMP_API_KEY = os.getenv("FMP_API_KEY")
+# ETag and Cache-Control headers so the CDN can serve repeat requests
+app.add_middleware(HTTPCacheMiddleware)
+
+@app.on_event("startup")
+async def startup_event():
+    if VOLA_WARMUP:
+        print(f"Warmup: {await asyncio.to_thread(warmup, WARMUP_MODULES, [get_scorer])}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await http_client.shutdown()
 
 class StockRequest(BaseModel):
     ticker: str
@@ -67,33 +80,23 @@ async def analyze_stock(ticker: str):
     ticker = ticker.upper()
     
     try:
-        # Get stock data using yfinance
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period="5d")
+        # Same provider router as main.py; with yfinance one 30-day download
+        # serves both the quote (last 5 sessions) and the volatility calculation
+        ctx = TickerContext(ticker)
+        quote, hist_30d, earnings = await asyncio.gather(
+            data_router.quote(ticker, ctx=ctx),
+            data_router.history(ticker, ctx=ctx),
+            earnings_calendar.lookup(ticker, lambda t: data_router.earnings(t, ctx=ctx)),
+        )
         
-        if hist.empty:
+        if quote is None:
             raise HTTPException(status_code=404, detail=f"No data found for {ticker}")
-        
-        current_price = float(hist['Close'].iloc[-1])
-        prev_price = float(hist['Close'].iloc[-2])
-        price_change = current_price - prev_price
-        price_change_percent = (price_change / prev_price) * 100 if prev_price > 0 else 0
-        
-        # Get additional info
-        try:
-            info = stock.info
-            market_cap = int(info.get('marketCap', 0))
-            avg_volume = int(info.get('averageVolume', 0))
-        except:
-            market_cap = 0
-            avg_volume = 0
+        earnings = earnings_data(earnings)
         
         # Calculate volatility
         try:
-            hist_30d = stock.history(period="30d")
-            if not hist_30d.empty and len(hist_30d) > 5:
-                hist_30d['Returns'] = hist_30d['Close'].pct_change()
-                daily_volatility = hist_30d['Returns'].std()
+            if hist_30d is not None and len(hist_30d) > 5:
+                daily_volatility = hist_30d['Close'].pct_change().std()
                 annualized_volatility = daily_volatility * (252 ** 0.5) * 100
             else:
                 annualized_volatility = 0
@@ -113,20 +116,20 @@ async def analyze_stock(ticker: str):
         return {
             "success": True,
             "ticker": ticker,
-            "current_price": current_price,
-            "price_change": price_change,
-            "price_change_percent": price_change_percent,
-            "market_cap": market_cap,
-            "volume": int(hist['Volume'].iloc[-1]),
-            "avg_volume": avg_volume,
-            "high": float(hist['High'].iloc[-1]),
-            "low": float(hist['Low'].iloc[-1]),
-            "open": float(hist['Open'].iloc[-1]),
+            "current_price": quote["price"],
+            "price_change": quote["price_change"],
+            "price_change_percent": quote["price_change_percent"],
+            "market_cap": quote["market_cap"],
+            "volume": quote["volume"],
+            "avg_volume": quote["avg_volume"],
+            "high": quote["high"],
+            "low": quote["low"],
+            "open": quote["open"],
             "volatility_30d": round(annualized_volatility, 2),
             "volatility_rating": volatility_rating,
-            "next_earnings": "N/A",
-            "earnings_date": "N/A",
-            "data_source": "Yahoo Finance",
+            "next_earnings": earnings["next_earnings"],
+            "earnings_date": earnings["earnings_date"],
+            "data_source": quote["source"],
             "timestamp": datetime.now().isoformat()
         }
         
@@ -158,29 +161,7 @@ async def get_sentiment_analysis(ticker: str):
     ticker = ticker.upper()
     
     try:
-        # Mock sentiment data
-        sentiment_options = [
-            {
-                "overall_sentiment": "Positive",
-                "sentiment_score": 0.75,
-                "key_phrases": ["strong performance", "growth potential", "market leader"],
-                "risk_indicators": []
-            },
-            {
-                "overall_sentiment": "Neutral",
-                "sentiment_score": 0.50,
-                "key_phrases": ["stable performance", "market average", "steady growth"],
-                "risk_indicators": ["moderate volatility"]
-            },
-            {
-                "overall_sentiment": "Negative",
-                "sentiment_score": 0.25,
-                "key_phrases": ["declining performance", "market concerns", "volatility"],
-                "risk_indicators": ["high volatility", "earnings risk"]
-            }
-        ]
-        
-        sentiment_data = random.choice(sentiment_options)
+        sentiment_data = await analyze_sentiment(ticker)
         
         return {
             "success": True,
@@ -189,6 +170,8 @@ async def get_sentiment_analysis(ticker: str):
             "sentiment_score": sentiment_data["sentiment_score"],
             "key_phrases": sentiment_data["key_phrases"],
             "risk_indicators": sentiment_data["risk_indicators"],
+            "document_count": sentiment_data["document_count"],
+            "story_count": sentiment_data["story_count"],
             "timestamp": datetime.now().isoformat()
         }
         
@@ -201,6 +184,8 @@ async def get_sentiment_analysis(ticker: str):
             "sentiment_score": 0.0,
             "key_phrases": [],
             "risk_indicators": [],
+            "document_count": 0,
+            "story_count": 0,
             "timestamp": datetime.now().isoformat()
         }
 
@@ -0,0 +1,157 @@
+"""
+Watchlist streaming
+
+Fans live quote and volatility updates out to WebSocket and SSE clients.
+There is one poller per ticker however many clients watch it, so upstream
+calls scale with unique tickers rather than with connected users. Pollers
+start with the first subscriber and stop with the last one.
+
+Each subscriber holds at most one pending update per ticker: when a client
+reads slower than updates arrive, newer deltas are merged into the pending
+one instead of queueing, so memory stays bounded by the watchlist size and
+the client always catches up to the latest values.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from market_hours import is_market_open
+
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "15"))
+# Outside regular hours prices barely move, so poll far less often
+STREAM_CLOSED_POLL_SECONDS = float(os.getenv("STREAM_CLOSED_POLL_SECONDS", "300"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_MAX_TICKERS = int(os.getenv("STREAM_MAX_TICKERS", "50"))
+
+Snapshot = Dict[str, Any]
+SnapshotFetch = Callable[[str], Awaitable[Optional[Snapshot]]]
+
+def poll_interval() -> float:
+    return STREAM_POLL_SECONDS if is_market_open() else STREAM_CLOSED_POLL_SECONDS
+
+class Subscriber:
+    """One connected client: its tickers and the updates it has not read yet"""
+
+    def __init__(self):
+        self.tickers: Set[str] = set()
+        self._pending: Dict[str, Snapshot] = {}
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, ticker: str, delta: Snapshot) -> None:
+        """Queue a delta without blocking; merges into an unread one for the same ticker"""
+        if ticker in self._pending:
+            self._pending[ticker].update(delta)
+            self.coalesced += 1
+        else:
+            self._pending[ticker] = dict(delta)
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> Dict[str, Snapshot]:
+        """All pending updates by ticker, or {} if none arrived within timeout"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return pending
+
+class TickerPoller:
+    """Polls one ticker and publishes changed fields to its subscribers"""
+
+    def __init__(self, ticker: str, fetch: SnapshotFetch):
+        self.ticker = ticker
+        self.fetch = fetch
+        self.subscribers: Set[Subscriber] = set()
+        self.latest: Snapshot = {}
+        self.polls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def publish(self, snapshot: Snapshot) -> None:
+        delta = {k: v for k, v in snapshot.items() if self.latest.get(k) != v}
+        if not delta:
+            return
+        self.latest.update(delta)
+        for subscriber in list(self.subscribers):
+            subscriber.push(self.ticker, delta)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                snapshot = await self.fetch(self.ticker)
+                self.polls += 1
+                if snapshot:
+                    self.publish(snapshot)
+            except Exception as e:
+                print(f"Error polling {self.ticker} for stream subscribers: {e}")
+            await asyncio.sleep(poll_interval())
+
+class WatchlistHub:
+    """Shares one poller per ticker between all subscribers"""
+
+    def __init__(self, fetch: SnapshotFetch):
+        self.fetch = fetch
+        self._pollers: Dict[str, TickerPoller] = {}
+        self._subscribers: Set[Subscriber] = set()
+
+    def connect(self) -> Subscriber:
+        subscriber = Subscriber()
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def subscribe(self, subscriber: Subscriber, tickers: Iterable[str]) -> List[str]:
+        """Add tickers to a subscriber's watchlist; returns the ones accepted"""
+        added = []
+        for ticker in tickers:
+            if ticker in subscriber.tickers:
+                continue
+            if len(subscriber.tickers) >= STREAM_MAX_TICKERS:
+                break
+            poller = self._pollers.get(ticker)
+            if poller is None:
+                poller = self._pollers[ticker] = TickerPoller(ticker, self.fetch)
+                poller.start()
+            poller.subscribers.add(subscriber)
+            subscriber.tickers.add(ticker)
+            if poller.latest:
+                # Late joiners start from the last known values
+                subscriber.push(ticker, poller.latest)
+            added.append(ticker)
+        return added
+
+    def unsubscribe(self, subscriber: Subscriber, tickers: Iterable[str]) -> None:
+        for ticker in list(tickers):
+            subscriber.tickers.discard(ticker)
+            poller = self._pollers.get(ticker)
+            if poller is None:
+                continue
+            poller.subscribers.discard(subscriber)
+            if not poller.subscribers:
+                poller.stop()
+                del self._pollers[ticker]
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber, subscriber.tickers)
+        self._subscribers.discard(subscriber)
+
+    async def shutdown(self) -> None:
+        for poller in self._pollers.values():
+            poller.stop()
+        self._pollers.clear()
+        self._subscribers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "tickers": len(self._pollers),
+            "polls": sum(p.polls for p in self._pollers.values()),
+            "coalesced_updates": sum(s.coalesced for s in self._subscribers),
+        }
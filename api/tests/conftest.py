@@ -0,0 +1,25 @@
+"""
+Shared test setup
+
+The API modules read their configuration at import, so the environment is
+fixed here before any of them is imported: synthetic market data from the
+stub provider, and every on-disk store either disabled or in a scratch
+directory.
+"""
+import os
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix="vola-tests-")
+
+os.environ.update({
+    "DATA_PROVIDERS": "stub",
+    "OHLCV_STORE_ENABLED": "0",
+    "EARNINGS_STORE_ENABLED": "0",
+    "FORECAST_MODEL_DIR": os.path.join(SCRATCH, "models", "forecast"),
+    "TEXT_MODEL_DIR": os.path.join(SCRATCH, "models", "text"),
+    "CORPUS_PATH": os.path.join(SCRATCH, "corpus.sqlite3"),
+    "SENTIMENT_TEXT_DIR": os.path.join(SCRATCH, "text"),
+})
+sys.path.insert(0, API_DIR)
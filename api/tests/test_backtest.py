@@ -0,0 +1,73 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from backtest import COLUMNS, load_bars, run_backtest, run_shard, summarize
+
+def write_prices(directory, ticker, sessions, seed=0):
+    index = pd.bdate_range("2020-01-01", periods=sessions, name="Date")
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, sessions)))
+    pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close},
+                 index=index).to_csv(directory / f"{ticker}.csv")
+    return index
+
+def write_events(path, rows):
+    pd.DataFrame(rows, columns=["ticker", "date", "sentiment"]).to_csv(path, index=False)
+
+def shard(tmp_path, events):
+    return {
+        "events": events, "start": date(2020, 1, 1), "end": date(2021, 12, 31), "pre": 5, "post": 5,
+        "estimator": "close_to_close", "prices_dir": str(tmp_path), "corpus": False, "sentiment_days": 7,
+    }
+
+def test_missing_price_file_yields_empty_dated_frame(tmp_path):
+    bars = load_bars("NOPE", date(2020, 1, 1), str(tmp_path))
+    assert bars.empty
+    assert isinstance(bars.index, pd.DatetimeIndex)
+
+def test_shard_without_usable_events_returns_typed_empty_columns(tmp_path):
+    write_prices(tmp_path, "SHORT", 8)
+    events = {
+        "NOPE": pd.DataFrame({"date": [date(2020, 6, 1)]}),
+        "SHORT": pd.DataFrame({"date": [date(2020, 1, 6)]}),
+    }
+    result = run_shard(shard(tmp_path, events))
+    assert set(result) == set(COLUMNS)
+    assert all(len(values) == 0 for values in result.values())
+    assert result["event_date"].dtype == np.dtype("datetime64[D]")
+    assert result["documents"].dtype.kind == "i"
+
+def test_empty_shard_concatenates_with_full_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr("backtest.BACKTEST_SHARD_SIZE", 1)
+    index = write_prices(tmp_path, "AAA", 300, seed=1)
+    events_path = tmp_path / "events.csv"
+    write_events(events_path, [
+        ("AAA", index[100].date(), 0.7),
+        ("AAA", index[200].date(), 0.3),
+        ("ZZZ", index[150].date(), 0.6),  # no price file
+    ])
+    table, report = run_backtest(["AAA", "ZZZ"], date(2020, 1, 1), date(2021, 12, 31),
+                                 events_path=str(events_path), prices_dir=str(tmp_path),
+                                 pre=10, post=10, workers=1)
+    assert list(table["ticker"]) == ["AAA", "AAA"]
+    assert list(table["event_date"]) == [index[100].date(), index[200].date()]
+    assert report["events"] == 2
+    assert report["input_events"] == 3
+
+def test_event_windows_exclude_the_event_day(tmp_path):
+    index = write_prices(tmp_path, "JMP", 120, seed=2)
+    frame = pd.read_csv(tmp_path / "JMP.csv", index_col=0, parse_dates=True)
+    # A 20% gap on the event day must show up in the event return, not in either window
+    frame.iloc[60:] *= 1.2
+    frame.to_csv(tmp_path / "JMP.csv")
+    result = run_shard(shard(tmp_path, {"JMP": pd.DataFrame({"date": [index[60].date()]})}))
+    assert np.isclose(result["event_return"][0], np.log(1.2), atol=0.05)
+    assert result["pre_vol"][0] < 40 and result["post_vol"][0] < 40
+
+def test_summary_of_no_events_is_empty():
+    report = summarize(pd.DataFrame({column: np.empty(0) for column in COLUMNS}))
+    assert report["events"] == 0
+    assert report["vol_change"] == {"count": 0}
+    assert "hit_rate" not in report
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from batch import POLYGON_GROUPED_DAYS, compute_batch_metrics, parse_tickers
+
+def panel(sessions):
+    """{field: DataFrame(dates x tickers)} with `sessions[ticker]` most recent bars per ticker"""
+    index = pd.bdate_range(end="2024-03-28", periods=max(sessions.values()))
+    rng = np.random.default_rng(7)
+    close = pd.DataFrame(
+        {t: 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(index)))) for t in sessions}, index=index
+    )
+    for ticker, n in sessions.items():
+        close.iloc[:len(index) - n, close.columns.get_loc(ticker)] = np.nan
+    return {
+        "Open": close.shift(1).fillna(close), "High": close * 1.01, "Low": close * 0.99,
+        "Close": close, "Volume": close * 0 + 1e6,
+    }
+
+def test_tickers_are_normalized_and_deduplicated():
+    assert parse_tickers(["aapl, msft", "AAPL", " nvda ", ""]) == ["AAPL", "MSFT", "NVDA"]
+
+def test_quote_fields_come_from_the_last_two_bars():
+    bars = panel({"AAPL": 30})
+    metrics = compute_batch_metrics(bars, ["AAPL"])["AAPL"]
+    close = bars["Close"]["AAPL"]
+    assert metrics["price"] == close.iloc[-1]
+    assert np.isclose(metrics["price_change_percent"], (close.iloc[-1] / close.iloc[-2] - 1) * 100)
+    expected = close.pct_change().std() * np.sqrt(252) * 100
+    assert np.isclose(metrics["annualized_volatility"], expected, atol=0.01)
+
+def test_short_history_has_a_quote_but_unknown_volatility():
+    metrics = compute_batch_metrics(panel({"AAPL": 30, "NEW": 3, "ONE": 1}), ["AAPL", "NEW", "ONE"])
+    assert "ONE" not in metrics
+    assert metrics["NEW"]["price"] > 0
+    assert metrics["NEW"]["annualized_volatility"] is None
+    assert metrics["NEW"]["daily_volatility"] is None
+
+def test_grouped_fallback_covers_enough_sessions_for_volatility():
+    metrics = compute_batch_metrics(panel({"AAPL": POLYGON_GROUPED_DAYS}), ["AAPL"])
+    assert metrics["AAPL"]["annualized_volatility"] > 0
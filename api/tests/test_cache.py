@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+import cache
+from cache import QuoteCache, cached
+
+@pytest.fixture(autouse=True)
+def market_open(monkeypatch):
+    # Outside the session every TTL stretches to the next open
+    monkeypatch.setattr(cache, "is_market_open", lambda: True)
+
+def eventually(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def unreachable():
+    raise AssertionError("loader should not be called")
+
+def test_fresh_entries_are_served_without_reloading():
+    c = QuoteCache(ttls={"quote": 60})
+    calls = []
+
+    def load():
+        calls.append(1)
+        return len(calls)
+
+    assert c.get_or_load("quote", "AAPL", load) == 1
+    assert c.get_or_load("quote", "AAPL", load) == 1
+    assert calls == [1]
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 1
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    c = QuoteCache(ttls={"quote": 0}, stale_seconds=60)
+    c.set("quote", "AAPL", "old")
+    c.ttls["quote"] = 60
+    release = threading.Event()
+    refreshes = []
+
+    def reload():
+        refreshes.append(1)
+        release.wait(5)
+        return "new"
+
+    assert c.get_or_load("quote", "AAPL", reload) == "old"
+    assert c.get_or_load("quote", "AAPL", reload) == "old"
+    release.set()
+    assert eventually(lambda: c.get_or_load("quote", "AAPL", unreachable) == "new")
+    assert refreshes == [1]
+    assert c.stats()["stale_hits"] >= 2
+
+def test_failed_refresh_keeps_the_stale_value():
+    c = QuoteCache(ttls={"quote": 0}, stale_seconds=60)
+    c.set("quote", "AAPL", "old")
+
+    def broken():
+        raise RuntimeError("upstream down")
+
+    assert c.get_or_load("quote", "AAPL", broken) == "old"
+    assert eventually(lambda: c.stats()["refresh_errors"] == 1)
+    assert c.get_or_load("quote", "AAPL", lambda: "ignored") == "old"
+
+def test_entries_past_the_stale_window_are_reloaded_inline():
+    c = QuoteCache(ttls={"quote": 0}, stale_seconds=0)
+    c.set("quote", "AAPL", "old")
+    assert c.get_or_load("quote", "AAPL", lambda: "new") == "new"
+
+def test_least_recently_used_entry_is_evicted():
+    c = QuoteCache(max_entries=2, ttls={"quote": 60})
+    c.set("quote", "A", 1)
+    c.set("quote", "B", 2)
+    assert c.get_or_load("quote", "A", unreachable) == 1
+    c.set("quote", "C", 3)
+    assert c.stats()["evictions"] == 1
+    assert c.get_or_load("quote", "C", unreachable) == 3
+    assert c.get_or_load("quote", "B", lambda: "reloaded") == "reloaded"
+
+def test_rejected_values_are_not_stored():
+    c = QuoteCache(ttls={"volatility": 60})
+    values = iter([{"rating": "Error"}, {"rating": "Low"}])
+    ok = lambda value: value["rating"] != "Error"
+    assert c.get_or_load("volatility", "AAPL", lambda: next(values), cacheable=ok)["rating"] == "Error"
+    assert c.get_or_load("volatility", "AAPL", lambda: next(values), cacheable=ok)["rating"] == "Low"
+    assert c.get_or_load("volatility", "AAPL", unreachable, cacheable=ok)["rating"] == "Low"
+
+def test_closed_market_keeps_entries_until_the_open(monkeypatch):
+    monkeypatch.setattr(cache, "is_market_open", lambda: False)
+    monkeypatch.setattr(cache, "seconds_until_next_open", lambda: 3600.0)
+    assert QuoteCache(ttls={"quote": 60}).ttl_for("quote") == 3600.0
+
+def test_cached_helpers_share_entries_across_ticker_case(monkeypatch):
+    monkeypatch.setattr(cache, "quote_cache", QuoteCache(ttls={"quote": 60}))
+    calls = []
+
+    @cached("quote", ignore=("ctx",))
+    def quote(ticker, ctx=None):
+        calls.append(ticker)
+        return {"ticker": ticker.upper()}
+
+    assert quote("aapl", ctx=object()) == {"ticker": "AAPL"}
+    assert quote("AAPL", ctx=object()) == {"ticker": "AAPL"}
+    assert calls == ["aapl"]
+    cache.quote_cache.invalidate("aapl")
+    quote("AAPL")
+    assert calls == ["aapl", "AAPL"]
@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+import pytest
+
+import http_client
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, circuit_breakers
+from providers import PolygonProvider, ProviderRouter
+
+def breaker(**overrides):
+    settings = dict(failure_threshold=3, failure_rate=0.5, window=10, min_calls=4, cooldown=60.0,
+                    half_open_probes=1)
+    settings.update(overrides)
+    return CircuitBreaker("test", **settings)
+
+def test_consecutive_failures_open_the_breaker():
+    b = breaker()
+    for _ in range(2):
+        b.record_failure()
+    assert b.state == CLOSED and b.allow()
+    b.record_failure()
+    assert b.state == OPEN
+    assert not b.allow()
+    assert b.snapshot()["rejected"] == 1
+
+def test_failure_rate_opens_the_breaker():
+    b = breaker(failure_threshold=100)
+    for outcome in (True, False, True, False):
+        b.record_success() if outcome else b.record_failure()
+    assert b.state == OPEN
+
+def test_half_open_probe_closes_or_reopens():
+    b = breaker(cooldown=0.0)
+    for _ in range(3):
+        b.record_failure()
+    assert b.allow()
+    assert b.state == HALF_OPEN
+    # Only one probe at a time
+    assert not b.allow()
+    b.record_failure()
+    assert b.state == OPEN
+    assert b.allow()
+    b.record_success()
+    assert b.state == CLOSED
+
+def test_released_probe_slot_can_be_reused():
+    b = breaker(cooldown=0.0)
+    for _ in range(3):
+        b.record_failure()
+    assert b.allow() and not b.allow()
+    b.release()
+    assert b.allow()
+
+@pytest.mark.parametrize("status", [401, 403, 404])
+def test_rejected_requests_count_as_provider_failures(monkeypatch, status):
+    transport = httpx.MockTransport(lambda request: httpx.Response(status))
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=transport))
+    monkeypatch.setattr(circuit_breakers, "_breakers", {})
+    provider = PolygonProvider(api_key="bad-key")
+    router = ProviderRouter([provider])
+
+    assert asyncio.run(router._call(provider, "quote", "AAPL")) is None
+    assert circuit_breakers.get("polygon").snapshot()["consecutive_failures"] == 1
+
+@pytest.mark.parametrize("status", [204, 301])
+def test_other_non_200_answers_raise_without_retrying(monkeypatch, status):
+    requests = []
+
+    def answer(request):
+        requests.append(request)
+        return httpx.Response(status)
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(answer)))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(http_client.get_json("https://example.test/data?apiKey=secret"))
+    assert len(requests) == 1
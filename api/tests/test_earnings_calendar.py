@@ -0,0 +1,87 @@
+import asyncio
+import time
+from datetime import date, timedelta
+
+import pytest
+
+import earnings_calendar
+from earnings_calendar import EarningsCalendar
+
+TODAY = date.today()
+
+def day(offset):
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+class Upstream:
+    """Per-ticker fetch returning a fixed next report date, recording each call"""
+
+    def __init__(self, offset=30):
+        self.offset = offset
+        self.calls = []
+
+    async def __call__(self, ticker):
+        self.calls.append(ticker)
+        return {"next_earnings": day(self.offset), "source": "test"}
+
+def test_range_queries_are_inclusive_and_ordered():
+    calendar = EarningsCalendar(None)
+    calendar.upsert([
+        {"ticker": "msft", "earnings_date": day(3)},
+        {"ticker": "AAPL", "earnings_date": day(3)},
+        {"ticker": "NVDA", "earnings_date": day(10)},
+        {"ticker": "TSLA", "earnings_date": day(11)},
+    ])
+    found = calendar.between(TODAY + timedelta(days=3), TODAY + timedelta(days=10))
+    assert [entry["ticker"] for entry in found] == ["AAPL", "MSFT", "NVDA"]
+
+def test_a_moved_date_is_reindexed():
+    calendar = EarningsCalendar(None)
+    calendar.upsert([{"ticker": "AAPL", "earnings_date": day(3)}])
+    calendar.upsert([{"ticker": "AAPL", "earnings_date": day(20)}])
+    assert calendar.between(TODAY, TODAY + timedelta(days=5)) == []
+    assert calendar.stats()["dated"] == 1
+
+def test_fresh_entries_are_served_and_passed_dates_refetched():
+    calendar = EarningsCalendar(None)
+    upstream = Upstream()
+    assert asyncio.run(calendar.lookup("AAPL", upstream))["earnings_date"] == day(30)
+    asyncio.run(calendar.lookup("aapl", upstream))
+    assert upstream.calls == ["AAPL"]
+
+    calendar.upsert([{"ticker": "MSFT", "earnings_date": day(-1)}])
+    asyncio.run(calendar.lookup("MSFT", upstream))
+    assert upstream.calls == ["AAPL", "MSFT"]
+
+def test_entries_survive_a_restart_and_loading_waits_for_first_use(tmp_path):
+    path = tmp_path / "earnings.sqlite3"
+    calendar = EarningsCalendar(str(path))
+    assert not path.exists()
+    calendar.upsert([{"ticker": "AAPL", "earnings_date": day(5)}])
+    reopened = EarningsCalendar(str(path))
+    assert reopened.get("AAPL")["earnings_date"] == day(5)
+
+def test_refresh_covers_the_universe_and_recent_lookups_only(monkeypatch):
+    calendar = EarningsCalendar(None)
+    stale = time.time() - 2 * earnings_calendar.EARNINGS_MAX_AGE
+    # Names left behind by earlier bulk pulls, never looked up here
+    calendar.upsert([{"ticker": t, "earnings_date": day(-5), "refreshed_at": stale} for t in ("OLD1", "OLD2")])
+    upstream = Upstream()
+    asyncio.run(calendar.lookup("AAPL", upstream))
+    calendar.upsert([{"ticker": "AAPL", "earnings_date": day(-1), "refreshed_at": stale}])
+    upstream.calls.clear()
+
+    result = asyncio.run(calendar.refresh(upstream, tickers=["SPY"]))
+    assert sorted(upstream.calls) == ["AAPL", "SPY"]
+    assert result["per_ticker"] == 2
+
+    # Lookups older than the window drop out of the refresh
+    monkeypatch.setattr(earnings_calendar, "EARNINGS_RECENT_SECONDS", 0.0)
+    calendar.upsert([{"ticker": "AAPL", "earnings_date": day(-1), "refreshed_at": stale}])
+    upstream.calls.clear()
+    asyncio.run(calendar.refresh(upstream, tickers=[]))
+    assert upstream.calls == []
+
+@pytest.mark.parametrize("value, expected", [("2024-05-02", "2024-05-02"), ("2024-05-02 16:30:00", "2024-05-02"),
+                                             ("N/A", None), (None, None)])
+def test_provider_dates_are_normalized(value, expected):
+    assert earnings_calendar.parse_date(value) == expected
@@ -0,0 +1,90 @@
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import forecast
+from features import FEATURE_NAMES
+from forecast import ModelNotFound, latest_features, load_model, quarterly_dates, train
+
+def frames(tickers=("AAA", "BBB", "CCC"), sessions=400):
+    """OHLCV histories whose volatility drifts slowly, so it is partly predictable"""
+    index = pd.bdate_range(end="2024-06-28", periods=sessions, name="Date")
+    out = {}
+    for seed, ticker in enumerate(tickers):
+        rng = np.random.default_rng(seed)
+        sigma = 0.01 + 0.01 * (1 + np.sin(np.arange(sessions) / 40 + seed))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, sigma)))
+        open_ = close * np.exp(rng.normal(0, sigma / 3))
+        out[ticker] = pd.DataFrame({
+            "Open": open_, "High": np.maximum(open_, close) * (1 + sigma / 2),
+            "Low": np.minimum(open_, close) * (1 - sigma / 2), "Close": close,
+            "Volume": rng.integers(1_000_000, 2_000_000, sessions).astype(float),
+        }, index=index)
+    return out
+
+@pytest.fixture(scope="module")
+def trained():
+    """A ridge model written to the configured model directory"""
+    return train(frames(), {"AAA": "2024-07-25"}, kind="ridge")
+
+def test_training_writes_a_versioned_artifact(trained):
+    assert forecast.latest_version(forecast.FORECAST_MODEL_DIR) == trained["version"]
+    assert trained["metrics"]["validation_rows"] > 0
+    model = load_model()
+    assert model.version == trained["version"]
+    predictions = model.predict(latest_features(list(frames().values()), [None] * 3, [None] * 3))
+    assert predictions.shape == (3,) and np.all(predictions > 0)
+
+def test_missing_versions_raise_model_not_found(tmp_path):
+    with pytest.raises(ModelNotFound):
+        load_model(directory=str(tmp_path))
+    with pytest.raises(ModelNotFound):
+        load_model("19990101T000000Z")
+
+def test_inference_rows_match_the_last_training_row():
+    history = frames(("AAA",))["AAA"]
+    row = latest_features([history], ["2024-07-25"], [0.7])[0]
+    assert row.shape == (len(FEATURE_NAMES),)
+    # Counted from the ticker's own last bar (Friday 2024-06-28)
+    assert row[FEATURE_NAMES.index("days_to_earnings")] == (date(2024, 7, 25) - date(2024, 6, 28)).days
+    assert row[FEATURE_NAMES.index("sentiment")] == 0.7
+    assert np.isfinite(row[FEATURE_NAMES.index("vol_close_to_close_63")])
+
+def test_short_histories_are_padded_and_no_histories_give_no_rows():
+    short = frames(("AAA",), sessions=20)["AAA"]
+    row = latest_features([short], [None], [None])[0]
+    assert np.isnan(row[FEATURE_NAMES.index("vol_close_to_close_63")])
+    assert np.isfinite(row[FEATURE_NAMES.index("vol_close_to_close_5")])
+    assert latest_features([], [], []).shape == (0, len(FEATURE_NAMES))
+
+def test_past_report_dates_step_back_in_quarters():
+    dates = quarterly_dates("2024-07-25", date(2024, 1, 1), date(2024, 6, 28))
+    assert dates == ["2024-07-25", "2024-04-25", "2024-01-25"]
+    assert quarterly_dates(None, date(2024, 1, 1), date(2024, 6, 28)) == []
+
+def test_unknown_tickers_get_404_or_per_ticker_errors(trained, monkeypatch):
+    import main
+
+    real_history = main.data_router.history
+
+    async def history(ticker, days, ctx=None):
+        return None if ticker in ("ZZZZ", "YYYY") else await real_history(ticker, days, ctx=ctx)
+
+    monkeypatch.setattr(main.data_router, "history", history)
+    monkeypatch.setattr(forecast, "_model", None)
+    client = TestClient(main.app)
+
+    assert client.get("/api/forecast/ZZZZ").status_code == 404
+    batch = client.get("/api/forecast?tickers=ZZZZ,YYYY")
+    assert batch.status_code == 200
+    assert batch.json()["found"] == 0
+    assert [r["success"] for r in batch.json()["results"]] == [False, False]
+
+    ok = client.get("/api/forecast/AAPL")
+    assert ok.status_code == 200
+    assert ok.json()["model_version"] == trained["version"]
+    assert os.path.isdir(os.path.join(forecast.FORECAST_MODEL_DIR, trained["version"]))
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from http_cache import HTTPCacheMiddleware, compute_etag, etag_matches
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+    return TestClient(main.app)
+
+def test_etag_ignores_timestamps():
+    first = {"price": 1.5, "timestamp": "2024-01-02T10:00:00", "rows": [{"timestamp": 1, "v": 2}]}
+    second = {"price": 1.5, "timestamp": "2024-01-02T10:05:00", "rows": [{"timestamp": 9, "v": 2}]}
+    assert compute_etag(first) == compute_etag(second)
+    assert compute_etag(first) != compute_etag({**first, "price": 1.6})
+
+def test_etag_matching_is_weak():
+    etag = compute_etag({"a": 1})
+    assert etag_matches(etag.removeprefix("W/"), etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"other"', etag)
+
+def test_analyze_round_trips_to_304(client):
+    response = client.get("/api/analyze/AAPL")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert "s-maxage=" in response.headers["cache-control"]
+
+    again = client.get("/api/analyze/AAPL", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+def test_head_carries_the_get_etag(client):
+    get = client.get("/api/analyze/MSFT")
+    head = client.head("/api/analyze/MSFT")
+    assert head.status_code == 200
+    assert head.content == b""
+    assert head.headers["etag"] == get.headers["etag"]
+    assert head.headers["content-length"] == get.headers["content-length"]
+    assert client.head("/api/analyze/MSFT", headers={"If-None-Match": get.headers["etag"]}).status_code == 304
+
+@pytest.mark.parametrize("path", ["/api/options/AAPL/iv", "/api/surface/AAPL?days=30"])
+def test_timings_stay_out_of_the_body(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert "dur=" in response.headers["server-timing"]
+    assert "solve_ms" not in response.json() and "query_us" not in response.json()
+    assert client.get(path, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+def test_uncached_paths_pass_through(client):
+    response = client.get("/health")
+    assert "etag" not in response.headers
+
+def test_failed_payloads_are_not_stored():
+    app = FastAPI()
+    app.add_middleware(HTTPCacheMiddleware)
+
+    @app.get("/api/analyze/{ticker}")
+    def failed(ticker: str):
+        return {"success": False, "ticker": ticker, "error": "Data unavailable"}
+
+    response = TestClient(app).get("/api/analyze/AAPL")
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+def test_vary_is_merged_into_an_existing_header():
+    app = FastAPI()
+    app.add_middleware(HTTPCacheMiddleware)
+
+    @app.get("/api/analyze/{ticker}")
+    def analyze(ticker: str, response: Response):
+        response.headers["Vary"] = "Accept-Encoding"
+        return {"success": True, "ticker": ticker}
+
+    response = TestClient(app).get("/api/analyze/AAPL")
+    assert response.headers.get_list("vary") == ["Accept-Encoding, Accept"]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from implied_vol import black_scholes, implied_volatility
+
+RATE, DIVIDEND = 0.04, 0.01
+
+def test_round_trip_over_strikes_maturities_and_sides():
+    spot = 100.0
+    strike, t, sigma = np.meshgrid(np.linspace(60, 140, 17), [7 / 365, 0.25, 1.0, 2.0], [0.1, 0.3, 0.8])
+    is_call = np.arange(strike.size).reshape(strike.shape) % 2 == 0
+    price = black_scholes(spot, strike, t, sigma, is_call, RATE, DIVIDEND)
+    # Deep in-the-money prices barely above intrinsic pin volatility down only loosely
+    forward = spot * np.exp((RATE - DIVIDEND) * t)
+    intrinsic = np.exp(-RATE * t) * np.maximum(np.where(is_call, forward - strike, strike - forward), 0)
+    informative = price - intrinsic > 1e-3 * spot
+
+    iv, iterations = implied_volatility(price, spot, strike, t, is_call, RATE, DIVIDEND)
+    assert np.allclose(iv[informative], sigma[informative], atol=1e-5)
+    assert iterations.max() <= 64
+
+def test_put_call_parity_gives_the_same_volatility():
+    strike, t = np.array([90.0, 100.0, 110.0]), 0.5
+    call = black_scholes(100, strike, t, 0.25, True, RATE, DIVIDEND)
+    put = black_scholes(100, strike, t, 0.25, False, RATE, DIVIDEND)
+    call_iv, _ = implied_volatility(call, 100, strike, t, True, RATE, DIVIDEND)
+    put_iv, _ = implied_volatility(put, 100, strike, t, False, RATE, DIVIDEND)
+    assert np.allclose(call_iv, put_iv, atol=1e-6)
+
+def test_prices_outside_no_arbitrage_bounds_are_nan():
+    # Below intrinsic, above the spot, zero time and a negative price
+    price = np.array([5.0, 150.0, 10.0, -1.0])
+    t = np.array([0.5, 0.5, 0.0, 0.5])
+    iv, _ = implied_volatility(price, 100, np.array([90.0, 100.0, 100.0, 100.0]), t, True)
+    assert np.isnan(iv).all()
+
+def test_initial_guess_does_not_change_the_answer():
+    price = black_scholes(100, 105, 0.3, 0.42, True)
+    cold, _ = implied_volatility(price, 100, 105, 0.3, True)
+    warm, _ = implied_volatility(price, 100, 105, 0.3, True, initial=np.array(0.4))
+    assert np.isclose(cold, 0.42, atol=1e-6) and np.isclose(warm, 0.42, atol=1e-6)
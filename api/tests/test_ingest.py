@@ -0,0 +1,87 @@
+import tarfile
+
+import pytest
+
+from corpus import Corpus
+from ingest import find_ticker, ingest, normalize_text
+
+BODY = ("Apple (NASDAQ: AAPL) reported record services revenue for the quarter and raised its dividend, "
+        "while iPhone sales in China came in ahead of analyst expectations.")
+
+ARTICLE = f"""<html><head><title>Apple beats estimates</title>
+<meta property="article:published_time" content="2024-02-01T21:30:00Z"></head>
+<body><nav>Markets | Tech</nav><article><p>{BODY}</p></article><footer>Subscribe</footer></body></html>"""
+
+@pytest.fixture
+def documents(tmp_path):
+    root = tmp_path / "docs"
+    (root / "news").mkdir(parents=True)
+    (root / "news" / "apple.html").write_text(ARTICLE)
+    (root / "news" / "msft_2024-01-30.txt").write_text(
+        "Ticker: MSFT\n\nMicrosoft said Azure growth accelerated as enterprise customers expanded AI workloads."
+    )
+    (root / "news" / "short.txt").write_text("Ticker: AMD\n\nToo short.")
+    (root / "news" / "untagged.txt").write_text(
+        "Shares of the chipmaker fell after it warned that data center demand would soften next quarter."
+    )
+    return root
+
+@pytest.fixture
+def corpus(tmp_path):
+    return Corpus(str(tmp_path / "corpus.sqlite3"))
+
+def test_documents_are_parsed_tagged_and_stored(documents, corpus):
+    counts = ingest(str(documents), corpus, workers=1)
+    assert counts["seen"] == 4
+    assert counts["written"] == 2
+    assert counts["empty"] == 1 and counts["untagged"] == 1
+
+    (apple,) = corpus.documents("AAPL")
+    assert apple["date"] == "2024-02-01"
+    assert apple["title"] == "Apple beats estimates"
+    assert apple["text"] == BODY
+    (msft,) = corpus.documents("MSFT")
+    assert msft["text"].startswith("Ticker: MSFT")
+
+def test_reruns_skip_indexed_and_recorded_files(documents, corpus):
+    ingest(str(documents), corpus, workers=1)
+    counts = ingest(str(documents), corpus, workers=1, batch_size=1)
+    assert counts["already_indexed"] == 2
+    assert counts["already_skipped"] == 2
+    assert "written" not in counts
+    assert corpus.stats()["skipped_files"] == 2
+
+def test_a_default_ticker_retries_untagged_files_only(documents, corpus):
+    ingest(str(documents), corpus, workers=1)
+    counts = ingest(str(documents), corpus, workers=1, ticker="NVDA")
+    assert counts["written"] == 1
+    assert counts["already_skipped"] == 1
+    assert len(list(corpus.documents("NVDA"))) == 1
+    assert corpus.stats()["skipped_files"] == 1
+
+def test_the_same_text_in_another_wrapper_is_a_duplicate(documents, corpus):
+    (documents / "news" / "apple-copy.htm").write_text(ARTICLE.replace("<nav>Markets | Tech</nav>", ""))
+    counts = ingest(str(documents), corpus, workers=1)
+    assert counts["written"] == 2
+    assert counts["duplicate"] == 1
+
+def test_archives_are_streamed(documents, corpus, tmp_path):
+    archive = tmp_path / "docs.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(documents, arcname="docs")
+    assert ingest(str(archive), corpus, workers=1)["written"] == 2
+
+def test_path_segments_name_only_configured_tickers():
+    text = "Quarterly results were broadly in line with guidance."
+    assert find_ticker("news/AAPL_2024-01-05.html", text, known={"AAPL"}) == "AAPL"
+    assert find_ticker("AAPL/report.txt", text, known={"AAPL"}) == "AAPL"
+    assert find_ticker("NEWS/Q3/report.txt", text, known={"AAPL"}) is None
+    assert find_ticker("news/AAPL_2024-01-05.html", text, known=frozenset()) is None
+
+def test_ticker_hints_in_the_text():
+    assert find_ticker("a.txt", "Symbol: $tsla\nDeliveries rose.") == "TSLA"
+    assert find_ticker("a.txt", "Shares of Apple Inc. (NASDAQ: AAPL) rose.") == "AAPL"
+    assert find_ticker("a.txt", "Watching $NVDA and $AMD, mostly $NVDA today.") == "NVDA"
+
+def test_text_is_normalized():
+    assert normalize_text("ﬁrst\r\n\r\n\r\n\r\nsecond   line \t end") == "first\n\nsecond line end"
@@ -0,0 +1,48 @@
+from near_dup import NearDuplicateIndex, cluster_weight, lsh_bands
+
+STORY = ("Apple beat analyst estimates for the quarter as iPhone sales rose sharply in China and "
+         "services revenue reached a record, sending shares higher in after-hours trading")
+REPRINT = STORY + ", according to a company statement"
+OTHER = ("Regulators opened an investigation into the automaker's driver assistance software after "
+         "a series of crashes involving stationary emergency vehicles on highways")
+
+def test_near_duplicates_share_a_cluster():
+    index = NearDuplicateIndex()
+    ids = index.assign([STORY, REPRINT, OTHER])
+    assert ids[0] == ids[1] != ids[2]
+    assert index.stats()["clusters"] == 2
+    assert index.stats()["duplicates"] == 1
+
+def test_repeated_texts_are_indexed_once():
+    index = NearDuplicateIndex()
+    first = index.assign([STORY, REPRINT, OTHER, STORY])
+    second = index.assign([OTHER, STORY, REPRINT])
+    assert second == [first[2], first[0], first[1]]
+    stats = index.stats()
+    assert stats["documents"] == 3
+    assert stats["duplicates"] == 1
+
+def test_scores_are_kept_per_cluster():
+    index = NearDuplicateIndex()
+    ids = index.assign([STORY, OTHER])
+    index.set_scores({ids[0]: 0.4})
+    assert index.scores(index.assign([REPRINT, OTHER])) == [0.4, None]
+
+def test_clusters_expire_and_are_bounded():
+    index = NearDuplicateIndex(ttl_seconds=10, max_clusters=1)
+    old = index.assign([STORY], now=0)[0]
+    new = index.assign([OTHER], now=1)[0]
+    assert index.stats()["clusters"] == 1
+    # The evicted story starts a new cluster when it is seen again
+    assert index.assign([STORY], now=2)[0] not in (old, new)
+    index.assign([OTHER], now=100)
+    assert index.stats()["evicted"] == 3
+
+def test_band_layout_centres_below_threshold():
+    bands, rows = lsh_bands(0.8, 128)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) <= 0.8
+
+def test_wider_coverage_weighs_more_but_not_linearly():
+    assert cluster_weight(1) == 1.0
+    assert 1.0 < cluster_weight(10) < 10
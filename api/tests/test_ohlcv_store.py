@@ -0,0 +1,87 @@
+import sqlite3
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ohlcv_store import OHLCV_BOOTSTRAP_DAYS, OHLCVStore
+
+class Upstream:
+    """Fetch callable over a fixed bar history, recording each requested start"""
+
+    def __init__(self, sessions=600):
+        index = pd.bdate_range(end=date.today(), periods=sessions, name="Date")
+        close = np.linspace(100, 160, sessions)
+        self.bars = pd.DataFrame(
+            {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e6}, index=index
+        )
+        self.starts = []
+        self.down = False
+
+    def __call__(self, start):
+        self.starts.append(start)
+        if self.down:
+            raise ConnectionError("upstream down")
+        return self.bars[self.bars.index >= start]
+
+@pytest.fixture
+def store(tmp_path):
+    return OHLCVStore(str(tmp_path / "bars.sqlite3"))
+
+def age(store, ticker):
+    conn = sqlite3.connect(store.path)
+    with conn:
+        conn.execute("UPDATE coverage SET refreshed_at = 0 WHERE ticker = ?", (ticker,))
+    conn.close()
+
+def test_first_lookup_backfills_and_repeats_are_served_from_disk(store):
+    upstream = Upstream()
+    history = store.history("AAPL", upstream, 90)
+    assert upstream.starts == [(date.today() - timedelta(days=OHLCV_BOOTSTRAP_DAYS)).isoformat()]
+    expected = upstream.bars[upstream.bars.index >= pd.Timestamp(date.today() - timedelta(days=90))]
+    assert np.array_equal(history["Close"].to_numpy(), expected["Close"].to_numpy())
+
+    store.history("AAPL", upstream, 90)
+    assert len(upstream.starts) == 1
+
+def test_stale_coverage_fetches_from_the_last_stored_session(store):
+    upstream = Upstream()
+    store.history("AAPL", upstream, 90)
+    age(store, "AAPL")
+    store.history("AAPL", upstream, 90)
+    assert upstream.starts[-1] == upstream.bars.index[-1].date().isoformat()
+
+def test_a_longer_window_than_stored_backfills_it(store):
+    upstream = Upstream()
+    store.history("AAPL", upstream, 90)
+    store.history("AAPL", upstream, OHLCV_BOOTSTRAP_DAYS + 200)
+    assert upstream.starts[-1] == (date.today() - timedelta(days=OHLCV_BOOTSTRAP_DAYS + 200)).isoformat()
+
+def test_stored_bars_are_served_when_the_upstream_fails(store):
+    upstream = Upstream()
+    stored = store.history("AAPL", upstream, 90)
+    age(store, "AAPL")
+    upstream.down = True
+    assert store.history("AAPL", upstream, 90).equals(stored)
+
+def test_opening_is_deferred_to_first_use(tmp_path):
+    path = tmp_path / "bars.sqlite3"
+    store = OHLCVStore(str(path))
+    assert not path.exists()
+    assert store.stats()["bars"] == 0
+    assert not path.exists()
+
+def test_a_corrupt_file_is_moved_aside(tmp_path):
+    path = tmp_path / "bars.sqlite3"
+    path.write_bytes(b"not a database" * 100)
+    store = OHLCVStore(str(path))
+    assert store.read("AAPL").empty
+    assert list(tmp_path.glob("bars.sqlite3.corrupt-*"))
+
+def test_compaction_drops_bars_past_retention(store):
+    upstream = Upstream()
+    store.history("AAPL", upstream, 500)
+    result = store.compact(retention_days=100)
+    assert result["deleted_bars"] > 0
+    assert store.read("AAPL").index.min() >= pd.Timestamp(date.today() - timedelta(days=100))
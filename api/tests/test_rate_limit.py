@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from rate_limit import DEFAULT_BUDGETS, RateLimiter, TokenBucket, _budget_from_env
+
+def test_burst_is_granted_at_once_then_rejected_past_max_wait():
+    bucket = TokenBucket("test", rate=1.0, capacity=3)
+    assert all(bucket.acquire_sync(max_wait=0) for _ in range(3))
+    assert not bucket.acquire_sync(max_wait=0)
+    snapshot = bucket.snapshot()
+    assert snapshot["acquired"] == 3 and snapshot["rejected"] == 1 and snapshot["waited"] == 0
+
+def test_tokens_refill_at_the_configured_rate():
+    bucket = TokenBucket("test", rate=50.0, capacity=1)
+    assert bucket.acquire_sync(max_wait=0)
+    assert not bucket.acquire_sync(max_wait=0)
+    time.sleep(0.05)
+    assert bucket.acquire_sync(max_wait=0)
+
+def test_waiting_callers_queue_behind_each_other():
+    bucket = TokenBucket("test", rate=20.0, capacity=1)
+
+    async def run():
+        start = time.perf_counter()
+        granted = await asyncio.gather(*(bucket.acquire(max_wait=1.0) for _ in range(4)))
+        return granted, time.perf_counter() - start
+
+    granted, elapsed = asyncio.run(run())
+    assert granted == [True] * 4
+    # The first token is in the bucket; the other three arrive 50 ms apart
+    assert elapsed >= 0.14
+    snapshot = bucket.snapshot()
+    assert snapshot["waited"] == 3
+    assert 0.14 <= snapshot["wait_seconds_max"] <= 0.16
+
+def test_budgets_are_overridable_from_the_environment(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_POLYGON", "100/10")
+    monkeypatch.setenv("RATE_LIMIT_POLYGON_BURST", "7")
+    assert _budget_from_env("polygon", DEFAULT_BUDGETS["polygon"]) == (10.0, 7.0)
+
+def test_each_provider_has_its_own_bucket():
+    limiter = RateLimiter({"a": (1, 60, 1), "b": (1, 60, 1)})
+    assert limiter.acquire_sync("a", max_wait=0)
+    assert not limiter.acquire_sync("a", max_wait=0)
+    assert limiter.acquire_sync("b", max_wait=0)
+    assert set(limiter.snapshot()) == {"a", "b"}
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import cache
+from cache import QuoteCache, cached
+from singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"price": 101.5}
+
+    async def run():
+        return await asyncio.gather(*(flight.do(("quote", "NVDA"), fetch) for _ in range(10)))
+
+    assert asyncio.run(run()) == [{"price": 101.5}] * 10
+    assert calls == [1]
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 9, "abandoned": 0}
+
+def test_the_shared_error_reaches_every_caller():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise LookupError("no quote")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, LookupError) for result in asyncio.run(run()))
+
+def test_a_cancelled_caller_leaves_the_shared_call_running():
+    flight = SingleFlight()
+
+    async def run():
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert flight.stats()["abandoned"] == 0
+
+def test_the_last_caller_leaving_abandons_the_call():
+    flight = SingleFlight()
+    finished = []
+
+    async def run():
+        async def fetch():
+            await asyncio.sleep(0.05)
+            finished.append(1)
+
+        caller = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert finished == []
+    assert flight.stats()["abandoned"] == 1
+
+def test_blocking_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "quote"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do_sync("k", fetch))) for _ in range(5)]
+    threads[0].start()
+    while not calls:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    while flight.stats()["shared"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["quote"] * 5
+    assert calls == [1]
+
+def test_concurrent_cache_misses_load_once(monkeypatch):
+    monkeypatch.setattr(cache, "quote_cache", QuoteCache(ttls={"quote": 60}))
+    calls = []
+
+    @cached("quote")
+    async def quote(ticker):
+        calls.append(ticker)
+        await asyncio.sleep(0.01)
+        return {"ticker": ticker}
+
+    async def run():
+        return await asyncio.gather(*(quote("AMD") for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"ticker": "AMD"}] * 5
+    assert calls == ["AMD"]
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from corpus import Corpus
+from text_model import (
+    ModelNotFound, forward_returns, labelled_batches, load_model, make_vectorizer, train,
+)
+
+GOOD = ("beats", "record", "raises", "upgrade", "strong", "growth")
+BAD = ("misses", "lawsuit", "cuts", "downgrade", "weak", "recall")
+FILLER = ("company", "quarter", "shares", "said", "analysts", "market", "today", "results")
+
+@pytest.fixture(scope="module")
+def market(tmp_path_factory):
+    """A corpus of one document per session and closes that move the way its words say"""
+    rng = np.random.default_rng(3)
+    sessions = pd.bdate_range("2023-01-02", periods=1300)
+    up = rng.random(len(sessions)) < 0.5
+    closes = pd.Series(100 * np.cumprod(np.where(up, 1.02, 0.98)), index=sessions)
+    corpus = Corpus(str(tmp_path_factory.mktemp("text") / "corpus.sqlite3"))
+    docs = []
+    for i, (session, positive) in enumerate(zip(sessions[1:], up[1:])):
+        words = list(rng.choice(GOOD if positive else BAD, 3)) + list(rng.choice(FILLER, 8))
+        text = " ".join(rng.permutation(words))
+        docs.append({
+            "ticker": "AAA", "date": session.date().isoformat(), "kind": "news", "source": f"{i}.txt",
+            "raw_hash": f"raw{i}", "content_hash": f"content{i}", "text": text,
+        })
+    corpus.add(docs)
+    return corpus, {"AAA": closes}
+
+def test_hashed_features_have_a_fixed_width_without_fitting():
+    vectorizer = make_vectorizer(n_features=2 ** 10)
+    X = vectorizer.transform(["Apple beats estimates", "an entirely different and much longer sentence"])
+    assert X.shape == (2, 2 ** 10)
+    assert X.format == "csr"
+    assert np.allclose(np.sqrt(X.multiply(X).sum(axis=1)), 1.0)
+
+def test_labels_measure_from_the_close_before_the_document():
+    closes = pd.Series([100.0, 110.0, 99.0], index=pd.to_datetime(["2024-01-05", "2024-01-08", "2024-01-09"]))
+    dates = np.array(["2024-01-08", "2024-01-06", "2024-01-05", "2024-01-09"], dtype="datetime64[D]")
+    returns = forward_returns(closes, dates, horizon=1)
+    # Monday's and Saturday's documents both land on Monday's move; the first session has no base
+    assert returns[0] == pytest.approx(np.log(1.1))
+    assert returns[1] == pytest.approx(np.log(1.1))
+    assert np.isnan(returns[2])
+    assert returns[3] == pytest.approx(np.log(0.9))
+
+def test_small_moves_are_left_out(market):
+    corpus, closes = market
+    labelled = sum(len(labels) for _, labels in labelled_batches(corpus, closes, deadband=0.01, size=50))
+    assert labelled == 1299
+    assert sum(len(labels) for _, labels in labelled_batches(corpus, closes, deadband=0.05)) == 0
+
+def test_training_learns_the_words_that_move_prices(market, tmp_path):
+    corpus, closes = market
+    metadata = train(closes, corpus, passes=3, directory=str(tmp_path))
+    assert metadata["rows"] == 1299
+    assert metadata["metrics"]["accuracy"] > metadata["metrics"]["baseline_accuracy"]
+
+    model = load_model(directory=str(tmp_path))
+    assert model.version == metadata["version"]
+    good, bad = model.score(["shares beats record growth", "shares misses lawsuit recall"])
+    assert good > 0 > bad
+
+def test_missing_models_raise_model_not_found(tmp_path):
+    with pytest.raises(ModelNotFound):
+        load_model(directory=str(tmp_path))
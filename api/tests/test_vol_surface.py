@@ -0,0 +1,84 @@
+import asyncio
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from options import OPTIONS_DIVIDEND_YIELD, OPTIONS_RISK_FREE_RATE, solve_chain
+from providers import StubProvider
+from vol_surface import SKEW_MONEYNESS, VolSurface
+
+SPOT = 100.0
+
+def solved_chain(days, smile):
+    """solve_chain()-shaped rows with implied volatilities given by smile(k, t)"""
+    rows = []
+    for d in days:
+        t = d / 365
+        for strike in np.linspace(60, 140, 33):
+            k = math.log(strike / SPOT)
+            rows.append({
+                "expiry": pd.Timestamp("2030-01-01") + pd.Timedelta(days=d),
+                "t": t, "strike": strike, "type": "put" if k < 0 else "call", "iv": smile(k, t),
+            })
+    return pd.DataFrame(rows)
+
+def test_flat_smile_is_flat_everywhere():
+    surface = VolSurface.from_chain("FLAT", SPOT, solved_chain([30, 90, 180], lambda k, t: 0.25), 0.0, 0.0)
+    for days in (10, 30, 60, 180, 365):
+        assert surface.atm(days / 365) == pytest.approx(0.25, abs=1e-9)
+        assert surface.skew(days / 365) == pytest.approx(0.0, abs=1e-9)
+
+def test_skew_and_term_structure_follow_the_quotes():
+    surface = VolSurface.from_chain("SKEW", SPOT, solved_chain([30, 90], lambda k, t: 0.2 - 0.3 * k), 0.0, 0.0)
+    (_, _, atm, skew), _ = surface.term_structure()
+    assert atm == pytest.approx(0.2, abs=1e-3)
+    assert skew == pytest.approx(0.3 * 2 * SKEW_MONEYNESS, abs=1e-3)
+
+def test_total_variance_never_falls_with_maturity():
+    # The later expiry is quoted so low that its total variance would be below the earlier one's
+    surface = VolSurface.from_chain(
+        "CAL", SPOT, solved_chain([30, 60], lambda k, t: 0.4 if t < 0.1 else 0.2), 0.0, 0.0
+    )
+    assert np.all(np.diff(surface.variance, axis=0) >= 0)
+    assert surface.atm(60 / 365) == pytest.approx(0.4 * math.sqrt(30 / 60), abs=1e-9)
+
+def test_variance_is_interpolated_linearly_in_time():
+    surface = VolSurface.from_chain(
+        "TERM", SPOT, solved_chain([30, 90], lambda k, t: 0.2 if t < 0.1 else 0.3), 0.0, 0.0
+    )
+    w30, w90 = 0.2 ** 2 * 30 / 365, 0.3 ** 2 * 90 / 365
+    t = 60 / 365
+    assert surface.atm(t) == pytest.approx(math.sqrt((w30 + w90) / 2 / t), abs=1e-9)
+
+def test_too_few_contracts_gives_no_surface():
+    chain = solved_chain([30], lambda k, t: 0.2).iloc[:2]
+    assert VolSurface.from_chain("THIN", SPOT, chain, 0.0, 0.0) is None
+
+def test_surface_recovers_the_stub_chain_smile():
+    provider = StubProvider()
+    chain = asyncio.run(provider.options("SPY"))
+    rate, dividend_yield = OPTIONS_RISK_FREE_RATE, OPTIONS_DIVIDEND_YIELD
+    surface = VolSurface.from_chain("SPY", chain["spot"], solve_chain(chain), rate, dividend_yield)
+    base = 0.15 + (provider._seed("SPY") % 20) / 100
+    for _, t, atm, _ in surface.term_structure()[1:]:
+        # The stub's smile is in log spot moneyness; the surface's ATM point is the forward
+        m = (rate - dividend_yield) * t
+        assert atm == pytest.approx(base - 0.2 * m + 0.4 * m * m + 0.02 * math.sqrt(t), abs=0.005)
+
+def test_surface_and_iv_endpoint_share_one_solve(monkeypatch):
+    import main
+
+    solves = []
+
+    def counting(chain):
+        solves.append(1)
+        return solve_chain(chain)
+
+    monkeypatch.setattr(main, "solve_chain", counting)
+    client = TestClient(main.app)
+    assert client.get("/api/options/IWM/iv").status_code == 200
+    assert client.get("/api/surface/IWM?days=30").status_code == 200
+    assert solves == [1]
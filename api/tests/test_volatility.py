@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+from volatility import ESTIMATORS, MIN_BARS, annualize, estimate_volatility
+
+def bars(seed=0, steps=60):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, steps)))
+    open_ = close * np.exp(rng.normal(0, 0.005, steps))
+    high = np.maximum(open_, close) * 1.01
+    low = np.minimum(open_, close) * 0.99
+    return open_, high, low, close
+
+def test_close_to_close_and_log_match_the_sample_deviation():
+    open_, high, low, close = bars()
+    result = estimate_volatility(open_, high, low, close, estimators=("close_to_close", "log"))
+    assert result["close_to_close"][0] == pytest.approx(np.std(close[1:] / close[:-1] - 1, ddof=1))
+    assert result["log"][0] == pytest.approx(np.std(np.diff(np.log(close)), ddof=1))
+
+def test_parkinson_uses_the_high_low_range():
+    steps = 20
+    close = np.full(steps, 100.0)
+    result = estimate_volatility(close, close * 1.02, close / 1.02, close, estimators=("parkinson",))
+    assert result["parkinson"][0] == pytest.approx(math.log(1.02 ** 2) / math.sqrt(4 * math.log(2)))
+
+def test_ewma_of_constant_moves_is_that_move():
+    close = 100 * np.exp(0.01 * np.arange(30))
+    result = estimate_volatility(close, close, close, close, estimators=("ewma",))
+    assert result["ewma"][0] == pytest.approx(0.01)
+
+def test_gaps_measure_returns_against_the_previous_close():
+    open_, high, low, close = bars()
+    gappy = close.copy()
+    gappy[[10, 11, 30]] = np.nan
+    result = estimate_volatility(open_, high, low, gappy, estimators=("close_to_close",))
+    kept = gappy[~np.isnan(gappy)]
+    assert result["close_to_close"][0] == pytest.approx(np.std(kept[1:] / kept[:-1] - 1, ddof=1))
+
+def test_tickers_are_estimated_independently_in_one_pass():
+    one, two = bars(seed=1), bars(seed=2)
+    together = estimate_volatility(*(np.vstack([a, b]) for a, b in zip(one, two)))
+    for row, single in enumerate((one, two)):
+        alone = estimate_volatility(*single)
+        for name in ESTIMATORS:
+            assert together[name][row] == pytest.approx(alone[name][0])
+
+def test_too_few_bars_give_nan():
+    open_, high, low, close = (a[:MIN_BARS - 1] for a in bars())
+    result = estimate_volatility(open_, high, low, close)
+    assert all(np.isnan(values[0]) for values in result.values())
+
+def test_unknown_estimators_are_rejected():
+    with pytest.raises(ValueError):
+        estimate_volatility(*bars(), estimators=("close_to_close", "magic"))
+
+def test_annualized_figures_are_percentages():
+    assert annualize(np.array([0.01]))[0] == pytest.approx(0.01 * math.sqrt(252) * 100)
@@ -0,0 +1,283 @@
+"""
+Text model
+
+Turns news and transcripts into features without a vocabulary. Words and
+word pairs are hashed into TEXT_HASH_FEATURES columns of a sparse CSR
+matrix. Memory is therefore fixed however many distinct terms the corpus
+holds, there is nothing to fit, and transforms never densify. On top sits a
+linear classifier trained with partial_fit one batch at a time, so training
+streams through the corpus (corpus.py) in fixed memory too.
+
+Labels come from the market. A document is positive when the ticker's close
+TEXT_LABEL_HORIZON sessions after its date is above the last close before
+it. Moves smaller than TEXT_LABEL_DEADBAND are left out as noise. Training
+walks the corpus in date order and scores each batch before learning from
+it, so the reported accuracy is measured on documents the model had not yet
+seen.
+
+Artifacts are versioned like the forecast models:
+    TEXT_MODEL_DIR/<version>/model.joblib    fitted classifier (uncompressed)
+    TEXT_MODEL_DIR/<version>/metadata.json   hashing settings, labels, metrics
+    TEXT_MODEL_DIR/LATEST                    version served by default
+
+With SENTIMENT_MODEL=hashing, /api/sentiment scores documents with this
+model as 2 * P(positive) - 1, the same [-1, 1] scale as TextBlob polarity.
+
+Usage:
+    python text_model.py train [AAPL,MSFT] [--from 2023-01-01] [--to 2024-12-31] [--passes 1]
+    python text_model.py info
+    python text_model.py score "Apple raises full-year guidance"
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from coldstart import lazy_import
+from corpus import Corpus, get_corpus
+from model_registry import ModelNotFound, latest_version, new_version, set_latest
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+joblib = lazy_import("joblib")
+
+TEXT_MODEL_DIR = os.getenv(
+    "TEXT_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "text")
+)
+TEXT_MODEL_VERSION = os.getenv("TEXT_MODEL_VERSION")
+# 2**20 columns: a float64 weight vector of 8 MB, with few collisions between common terms
+TEXT_HASH_FEATURES = int(os.getenv("TEXT_HASH_FEATURES", str(2 ** 20)))
+TEXT_NGRAM_MAX = int(os.getenv("TEXT_NGRAM_MAX", "2"))
+TEXT_LABEL_HORIZON = int(os.getenv("TEXT_LABEL_HORIZON", "1"))
+TEXT_LABEL_DEADBAND = float(os.getenv("TEXT_LABEL_DEADBAND", "0.005"))
+# Documents per partial_fit call, and per transform when scoring
+TEXT_TRAIN_BATCH = int(os.getenv("TEXT_TRAIN_BATCH", "1000"))
+TEXT_TRANSFORM_BATCH = int(os.getenv("TEXT_TRANSFORM_BATCH", "2000"))
+# Tickers whose price history is fetched at once by the training CLI
+TEXT_FETCH_CONCURRENCY = int(os.getenv("TEXT_FETCH_CONCURRENCY", "8"))
+
+def make_vectorizer(n_features: int = TEXT_HASH_FEATURES, ngram_max: int = TEXT_NGRAM_MAX):
+    """Stateless hashing vectorizer producing L2-normalized float32 CSR rows"""
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(n_features=n_features, ngram_range=(1, ngram_max), norm="l2", dtype=np.float32)
+
+def make_classifier():
+    from sklearn.linear_model import SGDClassifier
+
+    # Logistic loss so predict_proba is available; light L2 suits very sparse rows
+    return SGDClassifier(loss="log_loss", alpha=1e-6, random_state=0)
+
+class TextModel:
+    """A loaded artifact: classifier plus the hashing settings it was trained with"""
+
+    def __init__(self, classifier: Any, metadata: Dict[str, Any]):
+        self.classifier = classifier
+        self.metadata = metadata
+        self.version = metadata["version"]
+        self.name = f"hashing-sgd:{self.version}"
+        self.vectorizer = make_vectorizer(metadata["n_features"], metadata["ngram_max"])
+
+    def probabilities(self, texts: Sequence[str]) -> np.ndarray:
+        """P(positive) for each text, transformed in bounded sparse batches"""
+        texts = list(texts)
+        out = np.empty(len(texts))
+        for start in range(0, len(texts), TEXT_TRANSFORM_BATCH):
+            X = self.vectorizer.transform(texts[start:start + TEXT_TRANSFORM_BATCH])
+            out[start:start + X.shape[0]] = self.classifier.predict_proba(X)[:, 1]
+        return out
+
+    def score(self, texts: Sequence[str]) -> List[float]:
+        """Polarity in [-1, 1], the scorer interface sentiment.py batches into"""
+        return (2 * self.probabilities(texts) - 1).tolist()
+
+def load_model(version: Optional[str] = None, directory: str = TEXT_MODEL_DIR) -> TextModel:
+    version = version or latest_version(directory)
+    if version is None:
+        raise ModelNotFound(f"No text model in {directory}; train one with python text_model.py train")
+    path = os.path.join(directory, version)
+    if not os.path.isdir(path):
+        raise ModelNotFound(f"Text model version {version} not found in {directory}")
+    with open(os.path.join(path, "metadata.json"), encoding="utf-8") as f:
+        metadata = json.load(f)
+    return TextModel(joblib.load(os.path.join(path, "model.joblib"), mmap_mode="r"), metadata)
+
+_model: Optional[TextModel] = None
+_model_lock = threading.Lock()
+
+def get_text_model() -> TextModel:
+    """The process-wide text model, loaded on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model(TEXT_MODEL_VERSION)
+    return _model
+
+def forward_returns(closes: pd.Series, dates: np.ndarray, horizon: int = TEXT_LABEL_HORIZON) -> np.ndarray:
+    """Log return from the last close before each date to the close `horizon` sessions later.
+
+    A document dated d is measured from the close of the session before d, so
+    horizon 1 is the reaction on d itself. NaN where the history does not
+    cover both closes.
+    """
+    index = closes.index.to_numpy(dtype="datetime64[D]")
+    values = closes.to_numpy(dtype=float)
+    base = np.searchsorted(index, np.asarray(dates, dtype="datetime64[D]"), side="left") - 1
+    target = base + horizon
+    usable = (base >= 0) & (target < len(values))
+    out = np.full(len(base), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[usable] = np.log(values[target[usable]] / values[base[usable]])
+    return out
+
+def labelled_batches(corpus: Corpus, closes: Dict[str, pd.Series], start: Optional[date] = None,
+                     end: Optional[date] = None, horizon: int = TEXT_LABEL_HORIZON,
+                     deadband: float = TEXT_LABEL_DEADBAND,
+                     size: int = TEXT_TRAIN_BATCH) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """(texts, 0/1 labels) batches in date order across tickers; unlabelled documents are dropped"""
+
+    def label(batch: List[Dict[str, Any]]) -> Tuple[List[str], np.ndarray]:
+        returns = np.full(len(batch), np.nan)
+        tickers = np.array([doc["ticker"] for doc in batch])
+        dates = np.array([doc["date"] for doc in batch], dtype="datetime64[D]")
+        for ticker in np.unique(tickers):
+            rows = tickers == ticker
+            returns[rows] = forward_returns(closes[ticker], dates[rows], horizon)
+        keep = np.abs(returns) >= deadband  # False for NaN
+        return [doc["text"] for doc, k in zip(batch, keep) if k], (returns[keep] > 0).astype(int)
+
+    batch: List[Dict[str, Any]] = []
+    for doc in corpus.documents(None, start, end):
+        if doc["ticker"] in closes:
+            batch.append(doc)
+            if len(batch) >= size:
+                yield label(batch)
+                batch = []
+    if batch:
+        yield label(batch)
+
+def train(closes: Dict[str, pd.Series], corpus: Optional[Corpus] = None, start: Optional[date] = None,
+          end: Optional[date] = None, passes: int = 1, horizon: int = TEXT_LABEL_HORIZON,
+          deadband: float = TEXT_LABEL_DEADBAND, directory: str = TEXT_MODEL_DIR) -> Dict[str, Any]:
+    """Stream labelled documents through partial_fit and write a new version"""
+    corpus = corpus or get_corpus()
+    vectorizer = make_vectorizer()
+    classifier = make_classifier()
+    classes = np.array([0, 1])
+    rows = positives = evaluated = correct = 0
+    loss = 0.0
+
+    for epoch in range(passes):
+        for texts, labels in labelled_batches(corpus, closes, start, end, horizon, deadband):
+            if not len(labels):
+                continue
+            X = vectorizer.transform(texts)
+            if epoch == 0:
+                # Progressive validation: every batch is scored before the model learns from it
+                if hasattr(classifier, "coef_"):
+                    p = np.clip(classifier.predict_proba(X)[:, 1], 1e-7, 1 - 1e-7)
+                    evaluated += len(labels)
+                    correct += int(np.sum((p >= 0.5) == labels))
+                    loss -= float(np.sum(labels * np.log(p) + (1 - labels) * np.log(1 - p)))
+                rows += len(labels)
+                positives += int(labels.sum())
+            classifier.partial_fit(X, labels, classes=classes)
+
+    if rows < 100:
+        raise ValueError(f"Only {rows} labelled documents; ingest more text or widen the date range")
+    metrics = {
+        "evaluated_rows": evaluated,
+        "accuracy": round(correct / evaluated, 4) if evaluated else None,
+        "log_loss": round(loss / evaluated, 4) if evaluated else None,
+        # Accuracy of always predicting the more common label
+        "baseline_accuracy": round(max(positives, rows - positives) / rows, 4),
+    }
+
+    version = new_version()
+    path = os.path.join(directory, version)
+    os.makedirs(path, exist_ok=True)
+    # Uncompressed so load_model can memory-map the weights
+    joblib.dump(classifier, os.path.join(path, "model.joblib"))
+    metadata = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "model": "sgd-logistic",
+        "n_features": TEXT_HASH_FEATURES,
+        "ngram_max": TEXT_NGRAM_MAX,
+        "label": f"close {horizon} session(s) after the document above the close before it",
+        "deadband": deadband,
+        "passes": passes,
+        "tickers": sorted(closes),
+        "rows": rows,
+        "positive_share": round(positives / rows, 4),
+        "metrics": metrics,
+    }
+    with open(os.path.join(path, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    set_latest(directory, version)
+    return metadata
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["info"]:
+        try:
+            print(json.dumps(load_model(TEXT_MODEL_VERSION).metadata, indent=2))
+        except ModelNotFound as e:
+            print(e)
+        return
+    if args[:1] == ["score"] and len(args) > 1:
+        model = get_text_model()
+        for text, polarity in zip(args[1:], model.score(args[1:])):
+            print(f"{polarity:+.3f}  {text}")
+        return
+    if args[:1] != ["train"]:
+        print(__doc__)
+        return
+
+    from batch import parse_tickers
+    from providers import data_router
+    import http_client
+
+    corpus = get_corpus()
+    spans = corpus.tickers()
+    wanted = parse_tickers([args[1]]) if len(args) > 1 and not args[1].startswith("--") else sorted(spans)
+    tickers = [t for t in wanted if t in spans]
+    start = date.fromisoformat(args[args.index("--from") + 1]) if "--from" in args else None
+    end = date.fromisoformat(args[args.index("--to") + 1]) if "--to" in args else None
+    passes = int(args[args.index("--passes") + 1]) if "--passes" in args else 1
+    if not tickers:
+        print("No corpus documents for the requested tickers; run ingest.py first")
+        return
+
+    async def fetch():
+        semaphore = asyncio.Semaphore(TEXT_FETCH_CONCURRENCY)
+
+        async def one(ticker):
+            # History back to the ticker's first document (or --from), plus a buffer for holidays
+            first = max(date.fromisoformat(spans[ticker][0]), start or date.min)
+            async with semaphore:
+                return ticker, await data_router.history(ticker, (date.today() - first).days + 10)
+
+        try:
+            return await asyncio.gather(*(one(t) for t in tickers))
+        finally:
+            await http_client.shutdown()
+
+    started = time.perf_counter()
+    closes = {t: hist["Close"].sort_index() for t, hist in asyncio.run(fetch()) if hist is not None and len(hist)}
+    skipped = sorted(set(tickers) - set(closes))
+    if skipped:
+        print(f"Skipping tickers without price history: {', '.join(skipped)}")
+    metadata = train(closes, corpus, start, end, passes)
+    print(f"Trained text model {metadata['version']} on {metadata['rows']} documents "
+          f"in {time.perf_counter() - started:.1f}s: {metadata['metrics']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Per-request ticker context
+
+Holds the yfinance resources for one ticker for the lifetime of a single
+analysis so the quote, volatility and earnings helpers share one OHLCV
+history and at most one ``info``, one ``calendar`` and one option-chain
+round trip per expiry. History comes from the local OHLCV store when it is
+enabled, which only asks yfinance for bars newer than those already on
+disk. Fetches block on the shared yfinance rate limit, so call them from
+worker threads.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from coldstart import lazy_import
+from ohlcv_store import ohlcv_store
+from rate_limit import RateLimitExceeded, rate_limiter
+
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+
+# Default look-back in calendar days (volatility uses the full 30 days)
+HISTORY_DAYS = 30
+HISTORY_PERIOD = f"{HISTORY_DAYS}d"
+
+_MISSING = object()
+
+class TickerContext:
+    """Lazily fetched, memoized yfinance data for one ticker"""
+
+    def __init__(self, ticker: str, days: int = HISTORY_DAYS):
+        self.ticker = ticker.upper()
+        self.days = days
+        self._stock = None
+        self._values: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stock(self) -> "yf.Ticker":
+        if self._stock is None:
+            self._stock = yf.Ticker(self.ticker)
+        return self._stock
+
+    def _fetch_once(self, name: str, fetch):
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        # Failures are memoized too so a broken resource is not retried within a request
+        with lock:
+            value = self._values.get(name, _MISSING)
+            if value is _MISSING:
+                try:
+                    value = fetch()
+                except Exception as e:
+                    value = e
+                self._values[name] = value
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def _upstream(self, name: str, call):
+        # Every upstream round trip is charged to the shared yfinance budget
+        if not rate_limiter.acquire_sync("yfinance"):
+            raise RateLimitExceeded(f"yfinance rate limit reached fetching {name}")
+        return call()
+
+    def _download_history(self, **kwargs) -> pd.DataFrame:
+        hist = self._upstream("history", lambda: self.stock.history(**kwargs))
+        if isinstance(hist.index, pd.DatetimeIndex) and hist.index.tz is not None:
+            # Session dates in exchange time, so stored and fresh bars line up
+            hist.index = hist.index.tz_localize(None)
+        return hist
+
+    def _load_history(self) -> pd.DataFrame:
+        if ohlcv_store is not None:
+            return ohlcv_store.history(self.ticker, self._download_history, self.days)
+        return self._download_history(period=f"{self.days}d")
+
+    def history(self, rows: Optional[int] = None, days: Optional[int] = None) -> pd.DataFrame:
+        """Daily OHLCV bars for the context window, optionally only the last rows or days"""
+        hist = self._fetch_once("history", self._load_history)
+        if days is not None:
+            hist = hist[hist.index >= pd.Timestamp(date.today() - timedelta(days=days))]
+        if rows is not None:
+            return hist.tail(rows)
+        return hist
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self._fetch_once("info", lambda: self._upstream("info", lambda: self.stock.info))
+
+    @property
+    def calendar(self) -> Any:
+        return self._fetch_once("calendar", lambda: self._upstream("calendar", lambda: self.stock.calendar))
+
+    @property
+    def option_expiries(self) -> Tuple[str, ...]:
+        return self._fetch_once("options", lambda: self._upstream("options", lambda: tuple(self.stock.options)))
+
+    def option_chain(self, expiry: str) -> Any:
+        """yfinance (calls, puts, ...) chain for one expiry date (YYYY-MM-DD)"""
+        return self._fetch_once(
+            f"option_chain:{expiry}",
+            lambda: self._upstream("option chain", lambda: self.stock.option_chain(expiry)),
+        )
@@ -0,0 +1,142 @@
+"""
+Implied volatility surface
+
+Turns a solved option chain (see options.py) into a compact grid of total
+implied variance w = iv² * t over log forward moneyness k = ln(K / F) and
+the listed expiries. Each expiry's smile comes from its out-of-the-money
+contracts (puts below the forward, calls above). The smile is resampled onto
+one uniform moneyness grid, and variance is made non-decreasing in maturity,
+which removes calendar arbitrage.
+
+A surface is built once per chain refresh. Queries then only read the grid.
+The moneyness cell is found arithmetically on the uniform grid, and the
+maturity by bisection over a handful of expiries. Values are interpolated
+linearly in total variance across maturity, so a single point costs a few
+microseconds of pure-Python arithmetic. Outside the listed range the smile
+is extended flat in moneyness and at constant volatility in maturity.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import os
+from typing import List, Optional, Tuple
+
+from coldstart import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+SURFACE_K_MIN = float(os.getenv("SURFACE_K_MIN", "-0.5"))
+SURFACE_K_MAX = float(os.getenv("SURFACE_K_MAX", "0.5"))
+SURFACE_K_STEP = float(os.getenv("SURFACE_K_STEP", "0.025"))
+# Expiries closer than this are left out: their IVs are dominated by noise
+SURFACE_MIN_DAYS = float(os.getenv("SURFACE_MIN_DAYS", "2"))
+# Contracts an expiry needs to contribute a smile
+SURFACE_MIN_CONTRACTS = int(os.getenv("SURFACE_MIN_CONTRACTS", "3"))
+# Skew is reported as iv(k = -0.1) - iv(k = +0.1), about 90% and 110% of the forward
+SKEW_MONEYNESS = 0.1
+
+class VolSurface:
+    """Total implied variance on a (maturity x log-moneyness) grid"""
+
+    def __init__(self, ticker: str, spot: float, rate: float, dividend_yield: float,
+                 expiries: List[str], t: np.ndarray, k_min: float, k_step: float, variance: np.ndarray):
+        self.ticker = ticker
+        self.spot = spot
+        self.rate = rate
+        self.dividend_yield = dividend_yield
+        self.expiries = expiries
+        self.t = t
+        self.k_min = k_min
+        self.k_step = k_step
+        self.variance = variance
+        # Plain-float copies for scalar queries; NumPy scalar arithmetic is slower
+        self._t = t.tolist()
+        self._rows = variance.tolist()
+        self._n_k = variance.shape[1]
+
+    @classmethod
+    def from_chain(cls, ticker: str, spot: float, solved: pd.DataFrame, rate: float,
+                   dividend_yield: float) -> Optional["VolSurface"]:
+        """Surface from solve_chain() output, or None when no expiry has a usable smile"""
+        k_grid = np.arange(SURFACE_K_MIN, SURFACE_K_MAX + SURFACE_K_STEP / 2, SURFACE_K_STEP)
+        expiries, times, rows = [], [], []
+        for expiry, group in solved.groupby("expiry", sort=True):
+            t = float(group["t"].iloc[0])
+            if t * 365 < SURFACE_MIN_DAYS:
+                continue
+            forward = spot * math.exp((rate - dividend_yield) * t)
+            k = np.log(group["strike"].to_numpy() / forward)
+            otm = np.where(k < 0, group["type"].to_numpy() == "put", group["type"].to_numpy() == "call")
+            usable = otm & np.isfinite(group["iv"].to_numpy())
+            if usable.sum() < SURFACE_MIN_CONTRACTS:
+                continue
+            order = np.argsort(k[usable])
+            smile = np.interp(k_grid, k[usable][order], group["iv"].to_numpy()[usable][order])
+            expiries.append(expiry.date().isoformat())
+            times.append(t)
+            rows.append(smile * smile * t)
+        if not rows:
+            return None
+        # No calendar arbitrage: total variance may not fall with maturity
+        variance = np.maximum.accumulate(np.array(rows), axis=0)
+        return cls(ticker, spot, rate, dividend_yield, expiries, np.array(times),
+                   float(k_grid[0]), SURFACE_K_STEP, variance)
+
+    def _variance(self, t: float, k: float) -> float:
+        x = (k - self.k_min) / self.k_step
+        if x <= 0:
+            i, frac = 0, 0.0
+        elif x >= self._n_k - 1:
+            i, frac = self._n_k - 2, 1.0
+        else:
+            i = int(x)
+            frac = x - i
+
+        def row(j: int) -> float:
+            r = self._rows[j]
+            return r[i] + (r[i + 1] - r[i]) * frac
+
+        times = self._t
+        j = bisect.bisect_left(times, t)
+        if j == 0:
+            # Before the first expiry: that expiry's volatility, scaled to t
+            return row(0) * t / times[0]
+        if j == len(times):
+            return row(j - 1) * t / times[-1]
+        w0, w1 = row(j - 1), row(j)
+        return w0 + (w1 - w0) * (t - times[j - 1]) / (times[j] - times[j - 1])
+
+    def log_moneyness(self, t: float, moneyness: Optional[float] = None, strike: Optional[float] = None) -> float:
+        """ln(K / F) for a strike, or for moneyness given as strike / spot (default 1)"""
+        if strike is None:
+            strike = self.spot * (1.0 if moneyness is None else moneyness)
+        return math.log(strike / self.spot) - (self.rate - self.dividend_yield) * t
+
+    def iv(self, t: float, k: float) -> float:
+        """Implied volatility (fraction) at t years and log forward moneyness k"""
+        t = max(t, 1e-6)
+        return math.sqrt(max(self._variance(t, k), 0.0) / t)
+
+    def atm(self, t: float) -> float:
+        return self.iv(t, 0.0)
+
+    def skew(self, t: float) -> float:
+        return self.iv(t, -SKEW_MONEYNESS) - self.iv(t, SKEW_MONEYNESS)
+
+    def term_structure(self) -> List[Tuple[str, float, float, float]]:
+        """(expiry, years, ATM iv, skew) for each listed expiry"""
+        return [(e, t, self.atm(t), self.skew(t)) for e, t in zip(self.expiries, self._t)]
+
+    def grid(self) -> np.ndarray:
+        """Implied volatilities over the whole grid (maturity x moneyness)"""
+        return np.sqrt(self.variance / self.t[:, None])
+
+    @property
+    def k_grid(self) -> np.ndarray:
+        return self.k_min + self.k_step * np.arange(self._n_k)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.variance.nbytes + self.t.nbytes)
@@ -0,0 +1,134 @@
+"""
+Realized volatility engine
+
+NumPy implementations of the common realized-volatility estimators computed
+over 2-D (ticker x time) OHLC arrays in one pass. Missing bars are NaN; each
+return is measured against the previous available close, so gaps do not drop
+observations. Results are daily volatilities as fractions; use ``annualize``
+for the percentage figures reported by the API.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from coldstart import lazy_import
+
+np = lazy_import("numpy")
+
+TRADING_DAYS = 252
+# Same minimum as the original single-ticker path: more than 5 bars
+MIN_BARS = 6
+# RiskMetrics decay for daily data
+EWMA_LAMBDA = 0.94
+
+ESTIMATORS = (
+    "close_to_close",
+    "log",
+    "parkinson",
+    "garman_klass",
+    "rogers_satchell",
+    "yang_zhang",
+    "ewma",
+)
+
+_LN2 = math.log(2.0)
+
+def _as_2d(values) -> np.ndarray:
+    return np.atleast_2d(np.asarray(values, dtype=float))
+
+def _previous_close(close: np.ndarray) -> np.ndarray:
+    """Last available close strictly before each observation (NaN if none)"""
+    steps = np.arange(close.shape[-1])
+    index = np.where(np.isnan(close), 0, steps)
+    np.maximum.accumulate(index, axis=-1, out=index)
+    filled = np.take_along_axis(close, index, axis=-1)
+    previous = np.full_like(close, np.nan)
+    previous[:, 1:] = filled[:, :-1]
+    return previous
+
+def _nanmean(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    counts = np.sum(~np.isnan(x), axis=-1)
+    sums = np.nansum(x, axis=-1)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan), counts
+
+def _nanvar(x: np.ndarray, ddof: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    mean, counts = _nanmean(x)
+    squares = np.nansum((x - mean[:, None]) ** 2, axis=-1)
+    dof = counts - ddof
+    return np.where(dof > 0, squares / np.maximum(dof, 1), np.nan), counts
+
+def _ewma_var(returns: np.ndarray, decay: float) -> np.ndarray:
+    """Zero-mean exponentially weighted variance, newest observation weighted most"""
+    steps = returns.shape[-1]
+    weights = decay ** np.arange(steps - 1, -1, -1, dtype=float)
+    mask = ~np.isnan(returns)
+    weighted = np.where(mask, weights * returns ** 2, 0.0).sum(axis=-1)
+    total = np.where(mask, weights, 0.0).sum(axis=-1)
+    return np.where(total > 0, weighted / np.where(total > 0, total, 1.0), np.nan)
+
+def estimate_volatility(open_, high, low, close,
+                        estimators: Iterable[str] = ESTIMATORS,
+                        min_bars: int = MIN_BARS,
+                        ewma_lambda: float = EWMA_LAMBDA) -> Dict[str, np.ndarray]:
+    """Daily volatility per ticker for each requested estimator.
+
+    Inputs are (ticker x time) arrays (1-D arrays are treated as one ticker).
+    Tickers with fewer than ``min_bars`` closes get NaN.
+    """
+    estimators = tuple(estimators)
+    unknown = set(estimators) - set(ESTIMATORS)
+    if unknown:
+        raise ValueError(f"Unknown volatility estimator(s): {', '.join(sorted(unknown))}")
+
+    o, h, l, c = (_as_2d(x) for x in (open_, high, low, close))
+    enough = np.sum(~np.isnan(c), axis=-1) >= min_bars
+    results: Dict[str, np.ndarray] = {}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prev_c = _previous_close(c)
+        log_ret = np.log(c / prev_c)
+        needs_range = {"parkinson", "garman_klass", "rogers_satchell", "yang_zhang"} & set(estimators)
+        if needs_range:
+            hl = np.log(h / l)
+            co = np.log(c / o)
+        if {"rogers_satchell", "yang_zhang"} & set(estimators):
+            rs_terms = np.log(h / c) * np.log(h / o) + np.log(l / c) * np.log(l / o)
+            rs_var, _ = _nanmean(rs_terms)
+
+        for name in estimators:
+            if name == "close_to_close":
+                var, _ = _nanvar(c / prev_c - 1)
+            elif name == "log":
+                var, _ = _nanvar(log_ret)
+            elif name == "parkinson":
+                var = _nanmean(hl ** 2)[0] / (4 * _LN2)
+            elif name == "garman_klass":
+                var = _nanmean(0.5 * hl ** 2 - (2 * _LN2 - 1) * co ** 2)[0]
+            elif name == "rogers_satchell":
+                var = rs_var
+            elif name == "yang_zhang":
+                overnight_var, n = _nanvar(np.log(o / prev_c))
+                open_close_var, _ = _nanvar(co)
+                n = np.maximum(n, 2)
+                k = 0.34 / (1.34 + (n + 1) / (n - 1))
+                var = overnight_var + k * open_close_var + (1 - k) * rs_var
+            else:  # ewma
+                var = _ewma_var(log_ret, ewma_lambda)
+
+            results[name] = np.where(enough, np.sqrt(np.clip(var, 0.0, None)), np.nan)
+    return results
+
+def annualize(daily_volatility: np.ndarray, trading_days: int = TRADING_DAYS) -> np.ndarray:
+    """Daily volatility fraction to annualized percentage"""
+    return daily_volatility * math.sqrt(trading_days) * 100
+
+def frames_to_arrays(frames, tickers: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, ...]:
+    """(open, high, low, close) as (ticker x time) arrays from {field: DataFrame(dates x tickers)}"""
+    def pick(field: str) -> np.ndarray:
+        frame = frames[field]
+        if tickers is not None:
+            frame = frame.reindex(index=frames["Close"].index, columns=list(tickers))
+        return frame.to_numpy(dtype=float).T
+
+    return tuple(pick(field) for field in ("Open", "High", "Low", "Close"))